@@ -8,8 +8,12 @@ import io
 import csv
 import json
 import random
+import hashlib
+import contextvars
+import time as _time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta, time
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 
 import streamlit as st
 
@@ -29,13 +33,9 @@ def _json_default(o):
         return list(o)
     return str(o)
 
-def _brace_escape(s: str) -> str:
-    # f-string 안에 JSON 스키마를 그대로 넣을 때 중괄호 이스케이프
-    return s.replace("{", "{{").replace("}", "}}")
-
 def _esc(s: Any) -> str:
     s = str(s or "")
-    return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
+    return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;").replace('"',"&quot;").replace("'","&#x27;")
 
 # ===============================
 # API 키
@@ -43,12 +43,23 @@ def _esc(s: Any) -> str:
 def load_api_key():
     key = None
     if hasattr(st, "secrets"):
-        key = st.secrets.get("GEMINI_API_KEY", None)
+        try:
+            key = st.secrets.get("GEMINI_API_KEY", None)
+        except Exception:
+            key = None  # secrets.toml 없음 → 환경변수로
     if not key:
         key = os.environ.get("GEMINI_API_KEY")
     return key
 
-API_KEY = load_api_key()
+# IDEAMAKER_FAKE_LLM=1 → 로컬 가짜 클라이언트(fake_gemini.py) 사용 (부하 테스트/오프라인)
+FAKE_LLM = os.environ.get("IDEAMAKER_FAKE_LLM", "").strip() not in {"", "0", "false"}
+# 기록/재생 트랜스포트(llm_transport.py)
+#   IDEAMAKER_LLM_RECORD=cassette.jsonl → 모든 호출을 카세트에 기록
+#   IDEAMAKER_LLM_REPLAY=cassette.jsonl → 카세트 오프라인 재생 (IDEAMAKER_LLM_REPLAY_SCALE=지연 배율)
+LLM_RECORD_PATH = os.environ.get("IDEAMAKER_LLM_RECORD", "").strip()
+LLM_REPLAY_PATH = os.environ.get("IDEAMAKER_LLM_REPLAY", "").strip()
+
+API_KEY = load_api_key() or ("fake" if FAKE_LLM or LLM_REPLAY_PATH else None)
 if not API_KEY:
     st.error("❌ GEMINI_API_KEY가 없습니다. 환경변수 또는 .streamlit/secrets.toml/.env에 설정하세요.")
     st.stop()
@@ -61,15 +72,94 @@ from google.genai import types
 
 @st.cache_resource(show_spinner=False)
 def get_client(api_key: str):
-    return genai.Client(api_key=api_key)
+    if LLM_REPLAY_PATH:
+        from llm_transport import ReplayClient
+        fallback = None
+        if FAKE_LLM:   # 카세트 미스는 가짜 클라이언트로 채움
+            from fake_gemini import client_from_env
+            fallback = client_from_env()
+        return ReplayClient(LLM_REPLAY_PATH, latency_scale=float(os.environ.get("IDEAMAKER_LLM_REPLAY_SCALE", "1.0") or 1.0),
+                            fallback=fallback)
+    if FAKE_LLM:
+        from fake_gemini import client_from_env
+        inner = client_from_env()
+    else:
+        inner = genai.Client(api_key=api_key)
+    if LLM_RECORD_PATH:
+        from llm_transport import RecordingClient
+        return RecordingClient(inner, LLM_RECORD_PATH)
+    return inner
 
 client = get_client(API_KEY)
 
+# 단계별 모델 라우팅 (IDEAMAKER_ROUTES=라우트 설정 JSON 경로로 덮어쓰기 가능)
+from llm_router import ModelRouter, Route, load_stage_config
+
+@st.cache_resource(show_spinner=False)
+def get_router() -> ModelRouter:
+    return ModelRouter(load_stage_config(os.environ.get("IDEAMAKER_ROUTES")))
+
+router = get_router()
+
+# 전역 수락 제어: 분당 요청 한도 + 동시 실행 상한 + 대화형 우선 + 사용자별 공정 큐잉
+#   IDEAMAKER_RPM / IDEAMAKER_BURST / IDEAMAKER_MAX_INFLIGHT / IDEAMAKER_QUEUE_TIMEOUT
+from llm_scheduler import BACKGROUND, BULK, AdmissionScheduler, AdmissionTimeout, admission, admission_listener, admission_user
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler() -> AdmissionScheduler:
+    return AdmissionScheduler.from_env()
+
+scheduler = get_scheduler()
+
+# 사용자 × 일자별 토큰 집계 + 예산 기반 절약 모드 (token_budget.py)
+#   IDEAMAKER_TOKEN_BUDGET=일일 토큰(기본 0=무제한) / IDEAMAKER_TOKEN_BUDGETS=사용자별 한도 JSON / IDEAMAKER_TOKEN_LEDGER=저장 경로
+#   사용자별 한도는 인증 또는 신뢰 헤더(IDEAMAKER_USER_HEADER)가 있어야 의미 있음 — 미식별 방문자는 공용 버킷(한도 면제)
+from token_budget import NORMAL as NORMAL_MODE, SHARED_USER, DegradeMode, TokenLedger, estimate_usage, usage_tokens
+
+@st.cache_resource(show_spinner=False)
+def get_ledger() -> TokenLedger:
+    return TokenLedger.from_env()   # 캐시 워머(__warmer__)는 집계만, 한도 없음
+
+ledger = get_ledger()
+
+def budget_mode() -> DegradeMode:
+    return ledger.mode(admission_user.get())
+
+# 실행 마감 + 지연 SLO 컨트롤러 (최근 지연으로 n_req/출력 상한/thinking 결정, 마감 시 스트리밍 중단)
+#   IDEAMAKER_DEADLINE_S=실행 마감(초, 기본 0=끔) / IDEAMAKER_RESEARCH_SHARE=리서치 몫
+#   켜면 리서치 출력과 카드 수(n_req)가 남은 시간에 맞춰 줄어듦 → 완료 표시에 잘린 개수/사유 표시
+from slo_controller import SloController, complete_array_items, run_deadline
+
+@st.cache_resource(show_spinner=False)
+def get_slo() -> SloController:
+    return SloController.from_env()
+
+slo = get_slo()
+
+# 정적 프롬프트 프리픽스 (system_instruction 으로 고정 → implicit 캐싱, 적중분은 usage 의 cached 토큰으로 집계)
+from prompt_cache import PromptParts
+
+# 세션 간 공유 결과 캐시 (리서치 윈도우/연간 캘린더) — 캐시 워머가 미리 채움
+from cache_warmer import CacheWarmer, SharedResultCache, WarmConfig, research_cache_key, year_cache_key
+RESEARCH_CACHE_TTL_S = 12 * 3600
+YEAR_CACHE_TTL_S = 7 * 24 * 3600
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache() -> SharedResultCache:
+    return SharedResultCache()
+
+shared_cache = get_shared_cache()
+
 # ===============================
 # 상수/데이터
 # ===============================
+# 이벤트/카드 스키마는 llm_schemas 단일 정의(응답 스키마 + 로컬 검증기)에서 공유
+from llm_schemas import (
+    CARD_CAPTIONS_LIST_SCHEMA, CHANNELS, EVENT_CATEGORIES, EVENT_LIST_SCHEMA, IDEA_CARD_FIELDS, IDEA_CARD_LIST_SCHEMA,
+    IDEA_CARD_OBJECT_SCHEMA, PLATFORM_RULES, caption_len, validate_caption_sets, validate_card, validate_cards, validate_events,
+)
+
 DEFAULT_COUNTRY = "대한민국"
-CHANNELS = ["Instagram", "Facebook", "X(Twitter)"]   # 축소
 GOALS = [
     "Social Buzz Making(재미/기믹)",
     "Engagement 생성(CTA)",
@@ -77,10 +167,6 @@ GOALS = [
     "제품 인지도/구매의향 상승",
     "제품 프로모션"
 ]
-EVENT_CATEGORIES = [
-    "Commercial", "Cultural", "PublicHoliday", "WeatherEnv",
-    "School", "Religion", "MediaEnt", "Sports", "Gimmick", "WorldDays"
-]
 CAT_COLORS = {
     "Commercial":   "#FED7AA",
     "Cultural":     "#FBCFE8",
@@ -113,36 +199,30 @@ WORLD_DAYS_DB: Dict[int, List[Tuple[int, str]]] = {
     12: [(3, "세계 장애인의 날"), (5, "세계 자원봉사의 날"), (11, "세계 산의 날"), (14, "원숭이Day(기믹)")]
 }
 
-RESEARCH_EVENT_SCHEMA = """
-{
-  "category": "string",
-  "name": "string",
-  "date": "YYYY-MM-DD or null",
-  "note": "why relevant (1-2 lines; 명절은 '연휴 시작~끝' 포함 권장)",
-  "confidence": 0.0,
-  "specific_confidence": 0.0,
-  "sources": ["간단 키워드 또는 URL"]
-}
-""".strip()
+# 날짜 인덱스 (국가별 정렬 배열; 연간 캘린더/월드데이 윈도우 질의용)
+from event_index import EventIndex, month_histogram, window_mask
+WORLD_DAYS_KEY = "__world__"   # 국가 무관 고정 기념일
 
-IDEA_CARD_SCHEMA = """
-{
-  "id": "string",
-  "title": "string",
-  "image_concept": "string (개념적·구체; 텍스트만)",
-  "copy_draft": "string (구형 호환; 없으면 무시)",
-  "copy_draft_ko": "string (한국어 캡션)",
-  "copy_draft_local": "string (현지어 캡션; 나라가 한국이면 생략 가능)",
-  "recommended_channels": ["Instagram","Facebook","X(Twitter)"],
-  "fit_goals": ["..."],
-  "targeted_events": [{"category":"string","name":"string","date":"YYYY-MM-DD or null","note":"string"}],
-  "rationale": "string (이벤트 적합 이유; 구체요소 포함)",
-  "expected_impact": "string",
-  "specific_entities": ["구체명1","구체명2"],
-  "specificity_confidence": 0.0,
-  "confidence": 0.0
-}
-""".strip()
+@st.cache_resource(show_spinner=False)
+def get_event_index() -> EventIndex:
+    return EventIndex(EVENT_CATEGORIES)
+
+event_index = get_event_index()
+
+def _world_day_events(year: int) -> List[Dict[str, Any]]:
+    out = []
+    for m, items in WORLD_DAYS_DB.items():
+        for day, nm in items:
+            out.append({"category":"WorldDays","name":nm,"date":date(year, m, day).isoformat(),
+                        "note":"고정 국제 기념일","confidence":0.9,"specific_confidence":0.95,"sources":[f"WorldDays {nm}"]})
+    return out
+
+def world_days_between(start: date, end: date) -> List[Dict[str, Any]]:
+    """[start, end] 구간 월드데이(날짜순). 연도 경계를 넘는 구간도 해당 연도를 지연 적재."""
+    for y in range(start.year, end.year + 1):
+        if not event_index.count(WORLD_DAYS_KEY, date(y, 1, 1), date(y, 12, 31)):
+            event_index.add_events(WORLD_DAYS_KEY, _world_day_events(y), replace=(date(y, 1, 1), date(y, 12, 31)))
+    return event_index.query(WORLD_DAYS_KEY, start, end)
 
 # 언어/타임존
 LANG_BY_COUNTRY = {
@@ -230,75 +310,107 @@ def _parse_json_from_text(text: str):
                 pass
     return None
 
-def call_gemini_json(prompt: str, model: str="gemini-2.5-flash", temperature: float=0.5, thinking_off: bool=True):
+def _extract_text(resp) -> str:
+    return getattr(resp, "text", "") or (resp.candidates[0].content.parts[0].text if getattr(resp, "candidates", None) else "")
+
+def _stream_until(model: str, contents: Any, cfg: Any, cutoff_at: float, prompt_text: str = "") -> Tuple[str, Any, bool]:
+    """(누적 텍스트, 사용량, 마감으로 중단했는지). 청크 사이에서만 중단 가능(첫 토큰 대기는 끊지 않음).
+    사용량은 마지막 청크에만 오므로, 중간에 끊으면 프롬프트 + 받은 출력 글자 수로 추정해 집계."""
+    parts: List[str] = []; usage = None; cut = False
+    stream = client.models.generate_content_stream(model=model, contents=contents, config=cfg)
     try:
-        cfg = types.GenerateContentConfig(
-            temperature=temperature,
-            thinking_config=types.ThinkingConfig(thinking_budget=0) if thinking_off else None
-        )
-        resp = client.models.generate_content(model=model, contents=prompt, config=cfg)
-        text = getattr(resp, "text", "") or (resp.candidates[0].content.parts[0].text if getattr(resp, "candidates", None) else "")
+        for chunk in stream:
+            parts.append(getattr(chunk, "text", "") or "")
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if _time.monotonic() >= cutoff_at:
+                cut = True; break
+    finally:
+        close = getattr(stream, "close", None)
+        if close: close()
+    text = "".join(parts)
+    if usage is None and cut:
+        usage = estimate_usage(prompt_text, text)
+    return text, usage, cut
+
+def call_gemini_json(prompt: Union[str, PromptParts], model: str="gemini-2.5-flash", temperature: float=0.5,
+                     thinking_off: bool=True, stage: Optional[str]=None, response_schema: Optional[Dict[str, Any]]=None,
+                     info: Optional[Dict[str, Any]]=None):
+    # stage 가 주어지면 라우터가 모델/thinking/출력 상한을 정하고, 실패 시 다음 라우트로 1회 폴백
+    # response_schema 가 있으면 JSON 모드(응답 스키마 강제)로 요청
+    # PromptParts 면 프리픽스는 system_instruction 으로, 서픽스만 contents 로 보냄
+    # 실행 마감(run_deadline)이 있으면 출력 상한/thinking 은 SLO 컨트롤러가 남은 시간으로 정하고,
+    # 스트리밍으로 받다가 마감 시각에 끊어 완결된 배열 원소만 사용 (info["truncated"]=True)
+    routes = router.plan(stage, default_model=model) if stage else [Route(model, 0 if thinking_off else None)]
+    mode = budget_mode()
+    if not mode.allow_llm:
+        return None, "오늘의 토큰 예산을 모두 사용했습니다. (내일 초기화 또는 관리자에게 한도 상향 요청)"
+    dl = run_deadline.get()
+    last_err = None
+    for route in routes[:2]:
+        if dl and dl.remaining(stage) <= slo.reserve_s:
+            dl.note("deadline_skip")
+            return None, last_err or "마감 시간 안에 처리하지 못했습니다."
+        t0 = _time.perf_counter()
+        cut = False
+        try:
+            contents, system = prompt, None
+            if isinstance(prompt, PromptParts):
+                contents, system = prompt.suffix, prompt.prefix
+            with scheduler.slot(stage or "-", timeout_s=max(0.1, dl.remaining(stage)) if dl else None):
+                t0 = _time.perf_counter()   # 라우터 지연은 대기열 시간 제외
+                max_out = int(route.max_output_tokens * mode.output_scale) if route.max_output_tokens else None
+                thinking, cutoff_at = route.thinking_budget, None
+                if dl:   # 대기열을 지난 뒤의 남은 시간으로 계획
+                    plan = slo.plan_call(stage or "-", dl, max_out, thinking)
+                    max_out, thinking, cutoff_at = plan.max_output_tokens, plan.thinking_budget, plan.cutoff_at
+                cfg = types.GenerateContentConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_out,
+                    thinking_config=types.ThinkingConfig(thinking_budget=thinking) if thinking is not None else None,
+                    system_instruction=system,
+                    response_mime_type="application/json" if response_schema else None,
+                    response_schema=response_schema,
+                )
+                if cutoff_at is None:
+                    resp = client.models.generate_content(model=route.model, contents=contents, config=cfg)
+                    text, usage = _extract_text(resp), getattr(resp, "usage_metadata", None)
+                else:
+                    text, usage, cut = _stream_until(route.model, contents, cfg, cutoff_at,
+                                                     prompt.text if isinstance(prompt, PromptParts) else str(prompt))
+        except AdmissionTimeout as e:
+            if dl: dl.note("admission_timeout")
+            return None, f"요청이 많아 처리하지 못했습니다: {e}"
+        except Exception as e:
+            if stage: router.record(stage, route, _time.perf_counter() - t0, ok=False)
+            last_err = f"LLM 호출 오류: {e}"
+            continue
+        latency = _time.perf_counter() - t0
         data = _parse_json_from_text(text)
+        truncated = False
+        if data is None and (response_schema or {}).get("type") == "ARRAY":
+            items = complete_array_items(text)   # 마감/출력 상한으로 끊긴 배열 → 완결된 원소만
+            if items: data, truncated = items, True
+        if usage is not None: ledger.record(admission_user.get(), stage, usage)
+        if stage: router.record(stage, route, latency, ok=data is not None, usage=usage)
+        if stage and usage is not None and data is not None and not cut and not truncated:
+            slo.observe(stage, latency, usage_tokens(usage)["output_tokens"], n_items=len(data) if isinstance(data, list) else 0)
+        if dl and (cut or truncated): dl.note("cutoff")
+        if info is not None: info["truncated"] = cut or truncated
         if data is None:
-            return None, "LLM JSON 파싱 실패"
+            last_err = "LLM JSON 파싱 실패"
+            if cut: return None, "마감 시간 안에 완결된 결과를 받지 못했습니다."
+            continue
         return data, None
-    except Exception as e:
-        return None, f"LLM 호출 오류: {e}"
+    return None, last_err
 
 # ===============================
 # 리서치/생성
 # ===============================
-def normalize_event_context(raw: Any) -> Dict[str, List[Dict[str, Any]]]:
-    if raw is None: return {}
-    if isinstance(raw, dict) and len(raw) == 1 and next(iter(raw.keys())) in {"data","result","payload","LocalEvents","events"}:
-        raw = raw[next(iter(raw.keys()))]
-    if isinstance(raw, dict):
-        out: Dict[str, List[Dict[str, Any]]] = {}
-        for k, arr in raw.items():
-            if k in EVENT_CATEGORIES and isinstance(arr, list):
-                out[k] = [x for x in arr if isinstance(x, dict)]
-        if out: return out
-        if isinstance(raw.get("events"), list): raw = raw["events"]
-    if isinstance(raw, list):
-        out: Dict[str, List[Dict[str, Any]]] = {}
-        for it in raw:
-            if isinstance(it, dict):
-                cat = it.get("category","")
-                if cat in EVENT_CATEGORIES:
-                    out.setdefault(cat, []).append(it)
-        return out
-    return {}
-
-def _flatten_events(any_ctx: Any) -> List[Dict[str, Any]]:
-    flat: List[Dict[str, Any]] = []
-    if isinstance(any_ctx, dict):
-        if isinstance(any_ctx.get("events"), list):
-            for e in any_ctx["events"]:
-                if isinstance(e, dict):
-                    if "category" not in e: e["category"] = "WorldDays"
-                    flat.append(e)
-        else:
-            for cat, arr in any_ctx.items():
-                if isinstance(arr, list):
-                    for e in arr:
-                        if isinstance(e, dict):
-                            if "category" not in e: e = {"category": cat, **e}
-                            flat.append(e)
-    elif isinstance(any_ctx, list):
-        for e in any_ctx:
-            if isinstance(e, dict):
-                if "category" not in e: e["category"] = "WorldDays"
-                flat.append(e)
-    return flat
-
-def research_local_events_with_llm(target_day: date, country: str, window_days: int,
-                                   model: str, temperature: float, thinking_off: bool,
-                                   max_per_category: int=3) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
-    start_date = (target_day - timedelta(days=window_days)).isoformat()
-    end_date   = (target_day + timedelta(days=window_days)).isoformat()
-    prompt = f"""
-당신은 {country} 시장 소셜마케팅 리서처다.
-{country}에서 {start_date}~{end_date} (±{window_days}일)에 소셜 포스팅에 유용한 '로컬 이벤트'를 제시하라.
+# 프롬프트 = 고정 프리픽스(지시문 + 스키마, 캐시 대상) + 호출별 입력 서픽스.
+# 가변 값(국가/날짜/브랜드 등)은 프리픽스에 넣지 않는다 — 넣으면 프리픽스 캐시가 깨진다.
+RESEARCH_PROMPT_PREFIX = f"""
+당신은 입력 국가 시장의 소셜마케팅 리서처다.
+입력의 국가/기간에 소셜 포스팅에 유용한 '로컬 이벤트'를 제시하라.
 카테고리 {EVENT_CATEGORIES} 중 **신뢰도 낮은 카테고리는 생략** 가능.
 
 필수 체크:
@@ -311,35 +423,81 @@ def research_local_events_with_llm(target_day: date, country: str, window_days:
 - 명절/공휴일은 '연휴 시작~끝'
 - 콘서트/방문은 아티스트/장소
 
-반환(JSON; dict of lists 또는 events 배열). 각 이벤트 스키마:
-{_brace_escape(RESEARCH_EVENT_SCHEMA)}
-"""
-    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off)
+반환: 이벤트 JSON 배열(응답 스키마 준수). date 는 YYYY-MM-DD, 모르면 null.
+""".strip()
+
+CARDS_PROMPT_PREFIX = """
+당신은 입력 국가의 소셜 마케팅 전문가다.
+입력의 **브랜드/제품(또는 카테고리)**의 USP/페인포인트/대표 사용 시나리오를 간단 요약한 뒤,
+로컬 이벤트와 전략적으로 매칭하여 *아이디어 카드*를 입력의 '생성 개수'만큼 정확히 생성하라.
+- 이벤트 인사이트 ↔ 제품 USP를 설득력 있게 연결.
+- 이미지는 텍스트 컨셉만(구도/피사체/소품/라이팅/색감까지).
+- 캡션은 실제 소셜 톤(멘션/해시태그 허용).
+- 캡션 언어는 입력의 '캡션 언어'를 따른다.
+
+반환: 카드 JSON 배열, 생성 개수만큼(응답 스키마 준수).
+""".strip()
+
+REFINE_PROMPT_PREFIX = """
+당신은 입력 국가의 소셜 카피/아이디어 디렉터다.
+입력의 '기존 카드'를 사용자의 지시에 맞춰 **작게 수정**하되, 이벤트 타깃팅의 정합성을 유지하고
+응답 스키마를 그대로 따르라(필드 누락 금지). JSON 오브젝트 1개만 반환.
+""".strip()
+
+def research_local_events_with_llm(target_day: date, country: str, window_days: int,
+                                   model: str, temperature: float, thinking_off: bool,
+                                   max_per_category: int=3,
+                                   categories: Optional[List[str]]=None,
+                                   use_cache: bool=True, stage: str="research") -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
+    ckey = research_cache_key(country, target_day, window_days, max_per_category, categories)
+    hit = shared_cache.get(ckey) if use_cache else None
+    if hit is not None:
+        return hit, None
+    if budget_mode().research_cache_only:   # 예산 절약: 새 리서치 없이 로컬 인덱스(연간 캘린더/월드데이)로
+        return research_from_index(target_day, country, window_days, max_per_category, categories)
+    dl = run_deadline.get()
+    if dl and not slo.research_fits(dl, stage):
+        idx, ierr = research_from_index(target_day, country, window_days, max_per_category, categories)
+        if not ierr:   # 리서치 몫 안에 끝나지 않을 것 → 저장된 이벤트로 (없으면 그대로 LLM 시도)
+            dl.note("research_fallback")
+            return idx, None
+
+    start_date = (target_day - timedelta(days=window_days)).isoformat()
+    end_date   = (target_day + timedelta(days=window_days)).isoformat()
+    prompt = PromptParts("research", RESEARCH_PROMPT_PREFIX, f"""
+[입력]
+- 국가: {country}
+- 기간: {start_date}~{end_date} (대상일 {target_day.isoformat()} ±{window_days}일)
+""".strip() + (f"\n- 카테고리 한정: {', '.join(categories)}" if categories else ""))
+    info: Dict[str, Any] = {}
+    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off,
+                                stage=stage, response_schema=EVENT_LIST_SCHEMA, info=info)
+    events, _ = validate_events(raw) if not err else ([], None)   # 날짜/카테고리/신뢰도는 검증기에서 정규화됨
+    if not events and dl:   # 마감으로 끊김/실패 → 저장된 이벤트로
+        idx, ierr = research_from_index(target_day, country, window_days, max_per_category, categories)
+        if not ierr:
+            dl.note("research_fallback")
+            return idx, None
     if err: return {}, err
-    data = normalize_event_context(raw)
-    if not isinstance(data, dict) or not data:
+    if not events:
         return {}, "리서치 결과 형식 오류"
 
     out: Dict[str, List[Dict[str, Any]]] = {}
-    for cat, items in data.items():
-        if cat not in EVENT_CATEGORIES or not isinstance(items, list): continue
-        pruned = []
-        for it in items:
-            d = it.get("date")
-            try:
-                if d:
-                    dd = datetime.fromisoformat(d).date()
-                    if abs((dd - target_day).days) <= window_days:
-                        pruned.append(it)
-                else:
-                    if len(pruned) < 1:
-                        pruned.append(it)
-            except Exception:
-                pass
-            if len(pruned) >= max_per_category: break
-        if pruned: out[cat] = pruned
+    in_window = window_mask([it["date"] for it in events], target_day, window_days)
+    for it, ok in zip(events, in_window):
+        if categories and it["category"] not in categories: continue
+        pruned = out.setdefault(it["category"], [])
+        if len(pruned) >= max_per_category: continue
+        if it["date"]:
+            if ok:
+                pruned.append(it)
+        elif not pruned:
+            pruned.append(it)   # 날짜 미정 이벤트는 카테고리 첫 항목일 때만
+    out = {cat: arr for cat, arr in out.items() if arr}
 
     if not out: return {}, "기간 내 적합한 이벤트를 찾지 못했습니다."
+    if not info.get("truncated"):   # 마감으로 끊긴 부분 결과는 공유 캐시에 넣지 않음
+        shared_cache.put(ckey, out, ttl_s=RESEARCH_CACHE_TTL_S)
     return out, None
 
 def _avg(xs):
@@ -362,131 +520,371 @@ def _score_card(card: Dict[str, Any], ctx: Dict[str, Any]) -> float:
     density_bonus = min(0.2, ic_len / 600.0)
     return round(max(0.0, min(1.0, 0.55*ev_conf + 0.3*max(ev_spec, card_spec) + density_bonus)), 4)
 
+def research_from_index(target_day: date, country: str, window_days: int, max_per_category: int=3,
+                        categories: Optional[List[str]]=None) -> Tuple[Dict[str, List[Dict[str, Any]]], Optional[str]]:
+    """LLM 호출 없는 리서치: 생성해 둔 연간 캘린더가 있으면 그 창을, 없으면 월드데이를 사용."""
+    start, end = target_day - timedelta(days=window_days), target_day + timedelta(days=window_days)
+    rows = event_index.query(country, start, end, categories) or world_days_between(start, end)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for e in rows:
+        if categories and e["category"] not in categories: continue
+        arr = out.setdefault(e["category"], [])
+        if len(arr) < max_per_category: arr.append(e)
+    if not out: return {}, "절약 모드: 저장된 이벤트가 없어 리서치를 생략했습니다."
+    return {cat: out[cat] for cat in EVENT_CATEGORIES if cat in out}, None
+
+def compact_event_context(ctx: Dict[str, List[Dict[str, Any]]], mode: DegradeMode) -> Dict[str, List[Dict[str, Any]]]:
+    """카드 프롬프트용 컨텍스트 축약(카테고리별 상위 N개, 메모 길이 제한, 출처 제거)."""
+    if mode is NORMAL_MODE: return ctx
+    out = {}
+    for cat, arr in ctx.items():
+        top = sorted(arr, key=lambda e: e.get("confidence", 0.0), reverse=True)[:mode.context_per_category]
+        out[cat] = [{k: (v[:mode.note_chars] if k == "note" and mode.note_chars and isinstance(v, str) else v)
+                     for k, v in e.items() if k != "sources"} for e in top]
+    return out
+
+def _needs_local_caption(country: str) -> bool:
+    return country not in {"대한민국","Korea","South Korea","Republic of Korea"} and detect_local_language(country)[1] != "Korean"
+
 def generate_idea_cards_with_llm(target_day: date, channels: List[str], goals: List[str], brand: str,
                                  country: str, event_context: Dict[str, Any], n_cards: int, model: str,
-                                 temperature: float, thinking_off: bool) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+                                 temperature: float, thinking_off: bool, oversample: int=3) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     if not event_context:
         return [], "이벤트 컨텍스트가 비어 있습니다."
-    n_req = min(12, max(n_cards, n_cards + 3))
-    local_lang_kor, local_lang_eng = detect_local_language(country)
-    bilingual_needed = (country not in {"대한민국","Korea","South Korea","Republic of Korea"} and local_lang_eng != "Korean")
+    mode = budget_mode()   # 예산 근접 시 후보 여유분/카드 수/컨텍스트 축소
+    n_cards = min(n_cards, mode.max_cards)
+    n_req = min(12, max(n_cards, n_cards + min(oversample, mode.oversample)))
+    dl = run_deadline.get()
+    if dl:   # 남은 시간 안에 생성 가능한 만큼만 요청
+        n_req = slo.plan_items("cards", dl, n_req)
+        n_cards = min(n_cards, n_req)
+        dl.note("n_req", n_req)
+    local_lang_kor, _ = detect_local_language(country)
+    bilingual_needed = _needs_local_caption(country)
     bilingual_note = (
-        f"- 캡션은 **이중언어**로 작성: `copy_draft_ko`(한국어) + `copy_draft_local`({local_lang_kor}).\n"
+        f"  **이중언어**로 작성: `copy_draft_ko`(한국어) + `copy_draft_local`({local_lang_kor}).\n"
         if bilingual_needed else
-        "- 한국 대상이면 `copy_draft_ko`만 작성(또는 copy_draft 호환).\n"
+        "  한국 대상이므로 `copy_draft_ko`만 작성(또는 copy_draft 호환).\n"
     )
 
-    prompt = f"""
-당신은 {country}의 소셜 마케팅 전문가다.
-아래 **브랜드/제품(또는 카테고리)**의 USP/페인포인트/대표 사용 시나리오를 간단 요약한 뒤,
-로컬 이벤트와 전략적으로 매칭하여 *아이디어 카드*를 정확히 {n_req}개 생성하라.
-- 이벤트 인사이트 ↔ 제품 USP를 설득력 있게 연결.
-- 이미지는 텍스트 컨셉만(구도/피사체/소품/라이팅/색감까지).
-- 캡션은 실제 소셜 톤(멘션/해시태그 허용).
-{bilingual_note}
-입력:
+    prompt = PromptParts("cards", CARDS_PROMPT_PREFIX, f"""
+[입력]
 - 대상일: {target_day.isoformat()}
 - 국가: {country}
 - 브랜드/제품/카테고리: {brand or 'N/A'}
 - 채널 후보: {", ".join(channels) if channels else "N/A"}
 - 목표: {", ".join(goals) if goals else "N/A"}
-
-로컬 이벤트 컨텍스트(±7일):
-{json.dumps(event_context, ensure_ascii=False, indent=2)}
-
-반환(JSON 배열, 정확히 {n_req}개):
-{_brace_escape(IDEA_CARD_SCHEMA)}
-"""
-    ideas, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off)
+- 캡션 언어:
+{bilingual_note}- 생성 개수: 정확히 {n_req}개
+
+[로컬 이벤트 컨텍스트(±7일)]
+{json.dumps(compact_event_context(event_context, mode), ensure_ascii=False, indent=2 if mode is NORMAL_MODE else None)}
+""".strip())
+    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off,
+                                stage="cards", response_schema=IDEA_CARD_LIST_SCHEMA)
     if err: return [], err
-    if not isinstance(ideas, list) or not ideas:
+    ideas, _ = validate_cards(raw)   # 불량 카드는 개별 제외, id/캡션 필드는 검증기에서 보정
+    if not ideas:
         return [], "아이디어 생성 결과가 비어 있거나 형식이 아닙니다."
 
-    for i, it in enumerate(ideas, 1):
-        it.setdefault("id", f"card_{i}")
-        it["specificity_confidence"] = float(it.get("specificity_confidence", 0.0) or 0.0)
+    for it in ideas:
         it["confidence"] = _score_card(it, event_context)
-        if "copy_draft_ko" not in it and "copy_draft" in it:
-            it["copy_draft_ko"] = it.get("copy_draft","")
 
     ideas_sorted = sorted(ideas, key=lambda x: x.get("confidence", 0.0), reverse=True)[:n_cards]
     return ideas_sorted, None
 
+def fallback_cards(events: List[Dict[str, Any]], brand: str, channels: List[str], goals: List[str],
+                   n_cards: int, seed: int) -> List[Dict[str, Any]]:
+    """LLM 카드 생성 실패 시 규칙 기반 카드(이벤트 표본 1개당 1장)."""
+    rng = random.Random(seed + len(events))
+    sampled = rng.sample(events, k=min(n_cards, len(events)))
+    return [{
+        "id": f"fb_{i}",
+        "title": f"[{e['name']}] 타깃 아이디어",
+        "image_concept": f"{e['name']} 현장과 {brand} 연관 소품/상황을 배치한 합성 컨셉.",
+        "copy_draft_ko": f"{e['name']} 현장감을 살린 캡션. {brand}의 사용 순간을 포착하고 CTA 유도. #로컬이벤트",
+        "copy_draft_local": "",
+        "recommended_channels": channels[:3] or ["Instagram", "X(Twitter)"],
+        "fit_goals": goals[:2] if goals else [],
+        "targeted_events": [{"category": e["category"], "name": e["name"], "date": e.get("date"), "note": e.get("note","")}],
+        "rationale": f"±7일 로컬 이벤트 '{e['name']}'와 {brand}의 USP 연결.",
+        "expected_impact": "로컬 적합성으로 도달/ER 향상.",
+        "specificity_confidence": float(e.get("specific_confidence", 0.3) or 0.3),
+        "confidence": float(e.get("confidence", 0.5) or 0.5),
+    } for i, e in enumerate(sampled, 1)]
+
 def refine_card_with_llm(base_card: Dict[str, Any], instruction: str, country: str,
                          model: str, temperature: float) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-    prompt = f"""
-당신은 {country}의 소셜 카피/아이디어 디렉터다.
-다음 '기존 카드'를 사용자의 지시에 맞춰 **작게 수정**하되, 이벤트 타깃팅의 정합성을 유지하고
-스키마를 그대로 따르라(필드 누락 금지). JSON 오브젝트 1개만 반환.
+    prompt = PromptParts("refine", REFINE_PROMPT_PREFIX, f"""
+[국가]
+{country}
 
 [지시]
 {instruction}
 
 [기존 카드(JSON)]
-{json.dumps(base_card, ensure_ascii=False, indent=2)}
-
-[반환 스키마]
-{_brace_escape(IDEA_CARD_SCHEMA)}
-"""
-    data, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=True)
+{json.dumps({k: base_card[k] for k in IDEA_CARD_FIELDS if k in base_card}, ensure_ascii=False, indent=2)}
+""".strip())
+    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=True,
+                                stage="refine", response_schema=IDEA_CARD_OBJECT_SCHEMA)
     if err:
         return None, err
-    if not isinstance(data, dict):
+    data = validate_card(raw)
+    if data is None:
         return None, "수정 결과 형식 오류"
+    data["id"] = base_card.get("id") or data["id"]   # 모달/버튼 key 가 카드 id 에 묶여 있음
     return data, None
 
 # ===============================
-# 연간 이벤트 생성/파일화
+# 플랫폼별 캡션 변형 (카드 전체 1회 호출, 카드 해시별 캐시)
 # ===============================
-YEAR_EVENTS_PROMPT_TEMPLATE = """
-당신은 {country} 시장의 **연간 마케팅 캘린더** 작성자다.
-연도: {year}, 국가: {country}.
-카테고리: {categories}
-월별 **최소 10개 이상** 이벤트를 JSON 배열로 생성하라(부족 시 WorldDays/스포츠/문화로 보강).
-반환 스키마:
-{schema}
+CAPTION_CACHE_TTL_S = 7 * 24 * 3600
+_PLATFORM_RULE_LINES = "\n".join(
+    f"- {ch}: 최대 {r['max_chars']}자, 해시태그 최대 {r['max_hashtags']}개 — {r['style']}" for ch, r in PLATFORM_RULES.items()
+)
+CAPTIONS_PROMPT_PREFIX = f"""
+당신은 소셜 채널 **플랫폼별 캡션** 에디터다.
+입력의 카드마다 `channels` 에 있는 플랫폼 각각의 캡션 변형을 작성하라(목록에 없는 플랫폼은 작성 금지).
+플랫폼 규칙(본문 + 해시태그 합산 글자 수):
+{_PLATFORM_RULE_LINES}
+- 카드의 핵심 메시지/타깃 이벤트/CTA 는 유지하고, 플랫폼 톤에 맞게 길이와 구성만 조정
+- 본문에는 해시태그를 넣지 말고 hashtags 에 # 없이 단어로만
+- caption_local 은 입력의 현지어가 있을 때만 그 언어로, 없으면 빈 문자열
+반환: 카드별 {{card_id, variants}} JSON 배열(응답 스키마 준수).
 """.strip()
 
-def generate_year_events_with_llm(year: int, country: str, model: str, temperature: float, thinking_off: bool) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    prompt = YEAR_EVENTS_PROMPT_TEMPLATE.format(
-        year=year, country=country, categories=", ".join(EVENT_CATEGORIES),
-        schema=_brace_escape(RESEARCH_EVENT_SCHEMA)
+def card_caption_hash(card: Dict[str, Any], country: str) -> str:
+    basis = {k: card.get(k) for k in ("title", "image_concept", "copy_draft_ko", "copy_draft_local", "recommended_channels")}
+    return hashlib.sha1(json.dumps([basis, country], ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def generate_caption_variants_with_llm(cards: List[Dict[str, Any]], country: str, model: str,
+                                       temperature: float) -> Tuple[Dict[str, Dict[str, Dict[str, str]]], Optional[str]]:
+    """({card_id: {channel: {"ko", "local"}}}, 오류). 캐시에 없는 카드만 한 번의 요청으로 묶어 생성."""
+    out: Dict[str, Dict[str, Dict[str, str]]] = {}
+    todo: List[Tuple[Dict[str, Any], str]] = []
+    for c in cards:
+        h = card_caption_hash(c, country)
+        hit = shared_cache.get(("captions", h))
+        if hit is not None: out[c["id"]] = hit
+        else: todo.append((c, h))
+    if not todo:
+        return out, None
+
+    allowed = {c["id"]: list(c.get("recommended_channels") or CHANNELS) for c, _ in todo}
+    payload = [{"card_id": c["id"], "title": c.get("title", ""), "copy_draft_ko": c.get("copy_draft_ko", ""),
+                "copy_draft_local": c.get("copy_draft_local", ""), "channels": allowed[c["id"]]} for c, _ in todo]
+    local_lang = detect_local_language(country)[0] if _needs_local_caption(country) else None
+    prompt = PromptParts("captions", CAPTIONS_PROMPT_PREFIX, f"""
+[국가] {country}
+[현지어] {local_lang or "없음(한국 대상)"}
+[카드]
+{json.dumps(payload, ensure_ascii=False)}
+""".strip())
+    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=True,
+                                stage="captions", response_schema=CARD_CAPTIONS_LIST_SCHEMA)
+    if err:
+        return out, err
+    sets, _ = validate_caption_sets(raw, allowed)   # 글자 수/해시태그 수는 검증기에서 플랫폼 규칙에 맞춤
+    for c, h in todo:
+        if c["id"] in sets:
+            out[c["id"]] = sets[c["id"]]
+            shared_cache.put(("captions", h), sets[c["id"]], ttl_s=CAPTION_CACHE_TTL_S)
+    if not any(c["id"] in sets for c, _ in todo):
+        return out, "캡션 변형 결과가 비어 있거나 형식이 아닙니다."
+    return out, None
+
+# ===============================
+# 카테고리 파이프라인 (리서치 → 카드 생성, 그룹별 병렬)
+# ===============================
+# 그룹마다 리서치가 끝나는 즉시 해당 그룹 카드 생성을 시작 → 전체 지연 ≈ max(그룹) (합이 아님)
+PIPELINED_GENERATION = os.environ.get("IDEAMAKER_PIPELINED", "1").strip() not in {"", "0", "false"}
+CATEGORY_GROUPS: List[List[str]] = [
+    ["PublicHoliday", "Religion", "Cultural"],
+    ["Commercial", "School", "WeatherEnv"],
+    ["Sports", "MediaEnt"],
+    ["WorldDays", "Gimmick"],
+]
+
+def research_and_generate_pipelined(target_day: date, country: str, window_days: int, channels: List[str],
+                                    goals: List[str], brand: str, n_cards: int, model: str,
+                                    research_temperature: float, card_temperature: float, thinking_off: bool,
+                                    max_per_category: int=3, groups: Optional[List[List[str]]]=None,
+                                    on_progress=None, on_queue=None) -> Tuple[Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]], Optional[str], Optional[str]]:
+    """(event_context, cards, 리서치 오류, 카드 오류). 일부 그룹 실패는 건너뛰고 나머지로 진행."""
+    groups = groups or CATEGORY_GROUPS
+    per_group = max(2, -(-n_cards // len(groups)) + 1)   # 그룹별 후보 수(최종 순위용 여유 1장)
+
+    def _shard(cats: List[str]):
+        admission_listener.set(None)   # 작업 스레드에서는 UI 갱신 불가 → 대기 순번은 아래 루프에서 폴링
+        evs, err = research_local_events_with_llm(
+            target_day=target_day, country=country, window_days=window_days, model=model,
+            temperature=research_temperature, thinking_off=thinking_off,
+            max_per_category=max_per_category, categories=cats
+        )
+        if err: return {}, [], err, None
+        cards, cerr = generate_idea_cards_with_llm(
+            target_day=target_day, channels=channels, goals=goals, brand=brand, country=country,
+            event_context=evs, n_cards=per_group, model=model, temperature=card_temperature,
+            thinking_off=thinking_off, oversample=1
+        )
+        return evs, cards, None, cerr
+
+    ctx: Dict[str, List[Dict[str, Any]]] = {}
+    all_cards: List[Dict[str, Any]] = []
+    research_errs: List[str] = []; card_errs: List[str] = []
+    with ThreadPoolExecutor(max_workers=len(groups)) as ex:
+        # 작업마다 컨텍스트 복사(수락 제어의 사용자 식별 전달)
+        futs = {ex.submit(contextvars.copy_context().run, _shard, cats): gi for gi, cats in enumerate(groups, 1)}
+        pending = set(futs); done = 0; last_pos = 0
+        while pending:
+            finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if on_queue:
+                q = scheduler.queue_status()
+                if q["position"] != last_pos:
+                    last_pos = q["position"]; on_queue(last_pos, q["waited_s"])
+            for fut in finished:
+                done += 1
+                gi = futs[fut]
+                try:
+                    evs, cards, rerr, cerr = fut.result()
+                except Exception as e:
+                    evs, cards, rerr, cerr = {}, [], f"그룹 {gi} 실패: {e}", None
+                if rerr: research_errs.append(rerr)
+                if cerr: card_errs.append(cerr)
+                ctx.update(evs)
+                for c in cards:
+                    c["id"] = f"g{gi}_{c['id']}"   # 그룹 간 id 충돌 방지
+                    all_cards.append(c)
+                if on_progress: on_progress(done, len(groups))
+
+    if not ctx:
+        return {}, [], (research_errs[0] if research_errs else "기간 내 적합한 이벤트를 찾지 못했습니다."), None
+    ctx = {cat: ctx[cat] for cat in EVENT_CATEGORIES if cat in ctx}
+    for c in all_cards:
+        c["confidence"] = _score_card(c, ctx)   # 전체 컨텍스트 기준으로 재채점 후 통합 순위
+    ranked = sorted(all_cards, key=lambda x: x.get("confidence", 0.0), reverse=True)[:n_cards]
+    if not ranked:
+        return ctx, [], None, (card_errs[0] if card_errs else "아이디어 생성 결과가 비어 있습니다.")
+    return ctx, ranked, None, None
+
+# ===============================
+# 기간 캠페인 (리서치 1회 → 일자별 이벤트 배정 → 일자별 카드 병렬 생성)
+# ===============================
+from campaign_planner import (
+    MAX_CAMPAIGN_DAYS, assign_events, build_campaign_file, campaign_days, day_label, summarize as summarize_campaign,
+    sweep_per_category, sweep_window,
+)
+CAMPAIGN_WORKERS = int(os.environ.get("IDEAMAKER_CAMPAIGN_WORKERS", "4"))
+
+def campaign_events(start: date, end: date, country: str, model: str) -> Tuple[List[Dict[str, Any]], str, Optional[str]]:
+    """(기간 내 이벤트, 출처, 오류). 해당 연도 캘린더가 인덱스에 있으면 LLM 없이 재사용.
+    기간 밖은 리서치하지 않음 — 배정 단계에서 버려질 날짜에 출력 토큰을 쓰지 않도록."""
+    if all(event_index.count(country, date(y, 1, 1), date(y, 12, 31)) for y in range(start.year, end.year + 1)):
+        return event_index.query(country, start, end), "year_calendar", None
+    source = "index" if budget_mode().research_cache_only else "sweep"
+    center, wdays = sweep_window(start, end)
+    ctx, err = research_local_events_with_llm(
+        target_day=center, country=country, window_days=wdays, model=model, temperature=0.35,
+        thinking_off=True, max_per_category=sweep_per_category(len(campaign_days(start, end))), stage="sweep"
     )
-    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off)
+    return [e for arr in ctx.values() for e in arr], source, err
+
+def plan_campaign(start: date, end: date, country: str, channels: List[str], goals: List[str], brand: str,
+                  cards_per_day: int, model: str, temperature: float, max_per_day: Optional[int]=None,
+                  on_progress=None, on_queue=None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """(캠페인 결과, 오류). 일자별 카드 생성 실패는 규칙 기반 카드로 대체하고 계속 진행."""
+    days = campaign_days(start, end)
+    events, source, err = campaign_events(start, end, country, model)
+    if err or not events:
+        return {}, err or "기간 내 이벤트를 찾지 못했습니다."
+    # 기본은 일자별 이벤트 수 = 카드 수 → 배정된 이벤트는 모두 한 번씩 카드로 제안됨
+    assigned, stats = assign_events(events, days, window_days=7, max_per_day=max_per_day or cards_per_day)
+
+    def _day(d: date, evs: List[Dict[str, Any]]):
+        admission_listener.set(None)   # 작업 스레드에서는 UI 갱신 불가
+        ctx: Dict[str, List[Dict[str, Any]]] = {}
+        for e in evs: ctx.setdefault(e["category"], []).append(e)
+        cards, cerr = generate_idea_cards_with_llm(
+            target_day=d, channels=channels, goals=goals, brand=brand, country=country, event_context=ctx,
+            n_cards=cards_per_day, model=model, temperature=temperature, thinking_off=True, oversample=1
+        )
+        if cerr or not cards:
+            cards = fallback_cards(evs, brand, channels, goals, cards_per_day, seed=d.toordinal())
+        return ctx, cards, cerr
+
+    todo = [(d, evs) for d, evs in assigned.items() if evs]
+    results: Dict[date, Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[str]]] = {}
+    # 대량 작업: 다른 사용자의 대화형 요청보다 뒤로(BULK) — 작업마다 컨텍스트 복사
+    with admission(priority=BULK), ThreadPoolExecutor(max_workers=max(1, CAMPAIGN_WORKERS)) as ex:
+        futs = {ex.submit(contextvars.copy_context().run, _day, d, evs): d for d, evs in todo}
+        pending = set(futs); last_pos = 0
+        while pending:
+            finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if on_queue:
+                q = scheduler.queue_status()
+                if q["position"] != last_pos:
+                    last_pos = q["position"]; on_queue(last_pos, q["waited_s"])
+            for fut in finished:
+                d = futs[fut]
+                try:
+                    results[d] = fut.result()
+                except Exception as e:
+                    results[d] = ({}, fallback_cards(assigned[d], brand, channels, goals, cards_per_day, seed=d.toordinal()), str(e))
+                if on_progress: on_progress(len(results), len(todo))
+
+    out_days = []
+    for d in days:
+        ctx, cards, cerr = results.get(d, ({}, [], None))
+        for c in cards:
+            c["id"] = f"d{d:%m%d}_{c['id']}"   # 일자 간 id 충돌 방지
+        out_days.append({"date": d.isoformat(), "events": assigned[d], "event_context": ctx,
+                         "cards": cards, "error": cerr})
+    return {"start": start.isoformat(), "end": end.isoformat(), "country": country, "brand": brand,
+            "channels": channels, "source": source, "card_calls": len(todo), "stats": stats,
+            "days": out_days}, None
+
+# ===============================
+# 연간 이벤트 생성/파일화
+# ===============================
+YEAR_EVENTS_PROMPT_PREFIX = f"""
+당신은 입력 국가 시장의 **연간 마케팅 캘린더** 작성자다.
+입력의 연도/국가에 대해 아래 카테고리로 월별 **최소 10개 이상** 이벤트를 JSON 배열로 생성하라(부족 시 WorldDays/스포츠/문화로 보강).
+카테고리: {", ".join(EVENT_CATEGORIES)}
+반환: 이벤트 JSON 배열(응답 스키마 준수).
+""".strip()
+
+def generate_year_events_with_llm(year: int, country: str, model: str, temperature: float, thinking_off: bool,
+                                  use_cache: bool=True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    ckey = year_cache_key(country, year)
+    hit = shared_cache.get(ckey) if use_cache else None
+    if hit is not None:
+        return hit, None
+    prompt = PromptParts("year", YEAR_EVENTS_PROMPT_PREFIX, f"연도: {year}, 국가: {country}.")
+    raw, err = call_gemini_json(prompt, model=model, temperature=temperature, thinking_off=thinking_off,
+                                stage="year", response_schema=EVENT_LIST_SCHEMA)
     if err: return [], err
-    flat = _flatten_events(raw)
+    flat, _ = validate_events(raw)
     if not flat: return [], "연간 이벤트 결과가 비어 있습니다."
     flat = _ensure_month_minimum(flat, year, min_per_month=10)
 
-    def _key(e):
-        d = e.get("date")
-        try: return (0, datetime.fromisoformat(d).date()) if d else (1, date(year, 12, 31))
-        except Exception: return (1, date(year, 12, 31))
-    flat.sort(key=_key)
+    flat.sort(key=lambda e: (0, e["date"]) if e.get("date") else (1, ""))
+    shared_cache.put(ckey, flat, ttl_s=YEAR_CACHE_TTL_S)
+    event_index.add_events(country, flat, replace=(date(year, 1, 1), date(year, 12, 31)))
     return flat, None
 
 def _ensure_month_minimum(events: List[Dict[str, Any]], year: int, min_per_month: int=10) -> List[Dict[str, Any]]:
-    by_month: Dict[int, List[Dict[str, Any]]] = {m: [] for m in range(1, 13)}
-    seen = set()
-    for e in events:
-        d = e.get("date"); m = 0
-        if d:
-            try: m = datetime.fromisoformat(d).month
-            except Exception: m = 0
-        if 1 <= m <= 12: by_month[m].append(e)
-        seen.add((e.get("name",""), e.get("date","")))
+    counts = month_histogram([e.get("date") for e in events], year)
+    seen = {(e.get("name",""), e.get("date","")) for e in events}
     padded: List[Dict[str, Any]] = events[:]
     for m in range(1, 13):
-        cur = by_month[m]
-        if len(cur) >= min_per_month: continue
-        candidates = WORLD_DAYS_DB.get(m, [])
-        for day, nm in candidates:
-            if len(cur) >= min_per_month: break
-            dstr = f"{year}-{m:02d}-{day:02d}"
-            key = (nm, dstr)
+        if counts[m - 1] >= min_per_month: continue
+        m_end = (date(year, m + 1, 1) if m < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+        for ev in world_days_between(date(year, m, 1), m_end):
+            if counts[m - 1] >= min_per_month: break
+            key = (ev["name"], ev["date"])
             if key in seen: continue
-            ev = {"category":"WorldDays","name":nm,"date":dstr,"note":"고정 국제 기념일(월별 보강)","confidence":0.9,"specific_confidence":0.95,"sources":[f"WorldDays {nm}"]}
-            padded.append(ev); by_month[m].append(ev); seen.add(key)
+            ev["note"] = "고정 국제 기념일(월별 보강)"
+            padded.append(ev); counts[m - 1] += 1; seen.add(key)
     return padded
 
 def build_year_events_file(year_events: List[Dict[str, Any]], year: int) -> Tuple[bytes, str, str]:
@@ -510,6 +908,34 @@ def build_year_events_file(year_events: List[Dict[str, Any]], year: int) -> Tupl
         cw.writerows(rows)
         return bio.getvalue().encode("utf-8-sig"), f"marketing_events_{year}.csv", "text/csv"
 
+# ===============================
+# 캐시 워머 (서버 프로세스 첫 스크립트 실행 시 시작, 이후 주기적으로 재워밍)
+# ===============================
+# IDEAMAKER_WARM=1 로 활성화. 국가/일수/예산/주기는 cache_warmer.WarmConfig.from_env 참조.
+# 워머 호출은 최하위 등급(BACKGROUND)으로 수락 제어 — 사용자 요청을 밀어내지 않음
+def _warm_research(t):
+    with admission(user="__warmer__", priority=BACKGROUND):
+        return research_local_events_with_llm(
+            target_day=t.day, country=t.country, window_days=7, model="gemini-2.5-flash",
+            temperature=0.35, thinking_off=True, max_per_category=3,
+            categories=list(t.categories) if t.categories else None, use_cache=False
+        )
+
+def _warm_year(t):
+    with admission(user="__warmer__", priority=BACKGROUND):
+        return generate_year_events_with_llm(t.year, country=t.country, model="gemini-2.5-flash",
+                                             temperature=0.35, thinking_off=True, use_cache=False)
+
+@st.cache_resource(show_spinner=False)
+def get_cache_warmer() -> CacheWarmer:
+    # 워밍 키가 실제 요청 키와 같아야 함: 파이프라인 모드면 카테고리 그룹 단위로 워밍
+    w = CacheWarmer(shared_cache, WarmConfig.from_env(), _warm_research, _warm_year,
+                    category_groups=CATEGORY_GROUPS if PIPELINED_GENERATION else None)
+    w.start()
+    return w
+
+cache_warmer = get_cache_warmer()
+
 # ===============================
 # 스타일 + 모달
 # ===============================
@@ -543,9 +969,9 @@ button[data-testid="baseButton-secondary"]:hover{background:#FECACA !important;
 .spost .concept-inner{ background:#FFFFFF; border:1.5px dashed #CBD5E1; border-radius:10px; padding:12px; }
 .spost .concept-inner pre{ white-space:pre-wrap; word-break:break-word; margin:0; font-size:13.5px; line-height:1.5; font-family: inherit; color:#6B7280; font-style: italic; max-height:120px; overflow:auto; }
 
-/* 이미지 생성하기 — 박스 '내' 우하단 텍스트 링크 */
-.concept-link { position:absolute; right:12px; bottom:8px; font-size:12px; color:#2563EB; text-decoration:none; }
-.concept-link:hover { text-decoration:underline; }
+/* 비주얼 소싱 결과 썸네일 */
+.visual-row{ display:flex; gap:6px; margin:0 0 8px 0; }
+.visual-row img{ width:64px; height:64px; border-radius:8px; border:1px solid #E5E7EB; object-fit:cover; }
 
 .capline{ margin:8px 0 0 0; display:-webkit-box; -webkit-line-clamp:4; -webkit-box-orient:vertical; overflow:hidden; }
 .small-btn-row{display:flex; gap:8px; margin-top:auto;}
@@ -559,17 +985,14 @@ button[data-testid="baseButton-secondary"]:hover{background:#FECACA !important;
 st.set_page_config(page_title="Social Marcom Ideamaker", layout="wide")
 st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
-# 쿼리파라미터로 '이미지 생성하기' 클릭 감지 → 토스트 표시 후 파라미터 제거
-try:
-    qp = st.query_params
-    if "img" in qp:
-        st.toast("Visual Sourcing Agent 연계가 필요합니다.", icon="❗")
-        try:
-            del st.query_params["img"]
-        except Exception:
-            st.query_params.clear()
-except Exception:
-    pass
+# 비주얼 소싱 큐 ('이미지 생성하기' → 카드 image_concept 를 백엔드에 비동기 전달, 결과는 카드에 반영)
+from visual_sourcing import VisualSourcingQueue, backend_from_env
+
+@st.cache_resource(show_spinner=False)
+def get_visual_queue() -> VisualSourcingQueue:
+    return VisualSourcingQueue(backend_from_env(), workers=int(os.environ.get("IDEAMAKER_VISUAL_WORKERS", "2")))
+
+visual_queue = get_visual_queue()
 
 # ===============================
 # UI — 헤더
@@ -591,9 +1014,37 @@ with st.form("input_form"):
         # [모델] 삭제됨 → 내부 디폴트 사용
         # [창의성] 삭제됨 → 내부 디폴트 사용
         st.markdown("&nbsp;", unsafe_allow_html=True)
-        st.markdown("&nbsp;", unsafe_allow_html=True)
+        budget_slot = st.empty()   # 오늘 남은 토큰 예산 (스크립트 끝에서 채움)
     submitted = st.form_submit_button("LLM 리서치 & 아이디어 생성")
 
+# 사용자 식별 — 인증된 출처만 신뢰
+#   1) Streamlit 인증(st.user / st.experimental_user) 이메일
+#   2) 배포 프록시가 넣는 헤더 (IDEAMAKER_USER_HEADER, 예: X-Forwarded-Email)
+#   3) 없으면 공용 버킷 하나 — 세션마다 새 id 를 주면 새로고침만으로 일일 한도가 초기화됨
+#      공용 버킷은 한도 면제(집계만). 공정 큐잉은 세션 단위("__shared__:<세션>")로 유지
+#   IDEAMAKER_TRUST_QUERY_USER=1 은 로컬 개발/부하 테스트 전용(?user= 를 그대로 신뢰)
+USER_HEADER = os.environ.get("IDEAMAKER_USER_HEADER", "").strip()
+TRUST_QUERY_USER = os.environ.get("IDEAMAKER_TRUST_QUERY_USER", "").strip() not in {"", "0", "false"}
+ADMIN_USERS = {u.strip() for u in os.environ.get("IDEAMAKER_ADMIN_USERS", "").split(",") if u.strip()}
+
+def resolve_user_id() -> str:
+    u = getattr(st, "user", None) or getattr(st, "experimental_user", None)
+    try:
+        email = u.get("email") if u is not None else None
+    except Exception:
+        email = None
+    if email and email != "test@example.com":   # 구버전 로컬 실행 기본값 제외
+        return str(email)
+    if USER_HEADER:
+        try:
+            v = st.context.headers.get(USER_HEADER)
+        except Exception:
+            v = None
+        if v: return str(v).strip()
+    if TRUST_QUERY_USER and st.query_params.get("user"):
+        return str(st.query_params.get("user"))
+    return SHARED_USER
+
 # 세션 상태
 ss = st.session_state
 ss.setdefault("event_context", {})
@@ -603,6 +1054,26 @@ ss.setdefault("last_error", None)
 ss.setdefault("year_events_cache", {})
 ss.setdefault("modal_type", None)          # "preview" | "publish" | "edit" | None
 ss.setdefault("modal_card_id", None)
+ss["user_id"] = resolve_user_id()   # 토큰 예산 단위
+ss.setdefault("queue_sid", hashlib.sha1(os.urandom(8)).hexdigest()[:8])
+# 공정 큐잉 단위 — 미식별 방문자끼리도 한 줄로 합쳐지지 않게 세션별(집계는 ledger_user 로 공용 버킷에 합산)
+admission_user.set(f"{SHARED_USER}:{ss['queue_sid']}" if ss["user_id"] == SHARED_USER else ss["user_id"])
+IS_ADMIN = ss["user_id"] in ADMIN_USERS
+
+def _render_budget(slot):
+    b = ledger.status(ss["user_id"])
+    if b["budget"] <= 0: return
+    label = {"normal": "", "lean": " · 절약 모드", "minimal": " · 최소 모드(캐시 리서치)", "exhausted": " · 한도 소진"}[b["mode"]]
+    slot.caption(f"오늘 남은 토큰: {b['remaining']:,} / {b['budget']:,}{label}")
+
+_render_budget(budget_slot)
+
+def _queue_listener(status, label: str):
+    # 수락 대기 중이면 순번 표시, 실행이 시작되면(pos=0) 원래 문구로 복귀
+    def _cb(pos: int, waited: float):
+        status.update(label=label if pos == 0 else f"{label} · ⏳ 요청이 많아 대기 중 ({pos}번째, {waited:.0f}초)",
+                      state="running")
+    return _cb
 
 # ===============================
 # 실행 — 리서치 & 카드 생성
@@ -616,28 +1087,46 @@ if submitted:
     # 삭제된 목표 옵션 대신, 모든 목표를 포괄적으로 사용
     goals = GOALS[:]  # 전체 목표 사용
 
-    # 삭제된 모델/창의성 옵션 대신 고정값 사용
+    # 삭제된 모델/창의성 옵션 대신 고정값 사용 (실제 모델은 단계별 라우터가 결정; 여기 값은 미설정 단계용 기본값)
     model = "gemini-2.5-flash"
     creativity = 0.60
 
-    with st.status("🤖 AI가 해당 국가의 주요 Event를 리서치 및 정리하고 있어요.", state="running") as s:
-        events, err1 = research_local_events_with_llm(
-            target_day=target_day, country=country, window_days=7,
-            model=model, temperature=0.35, thinking_off=True, max_per_category=3
-        )
+    status_label = "🤖 AI가 해당 국가의 주요 Event를 리서치 및 정리하고 있어요."
+    # 실행 1회 = 마감 1개: 블록을 나가면(오류로 중단돼도) 마감 준수 여부가 SLO 지표에 기록됨
+    with st.status(status_label, state="running") as s, slo.run("submit") as run:
+        if PIPELINED_GENERATION:
+            progress_label = [status_label]   # 진행 문구(대기 표시 후 복귀용)
+            def _on_progress(done: int, total: int):
+                progress_label[0] = f"🤖 카테고리별 리서치 → 아이디어 카드 생성 중… ({done}/{total} 그룹 완료)"
+                s.update(label=progress_label[0], state="running")
+            events, cards, err1, err2 = research_and_generate_pipelined(
+                target_day=target_day, country=country, window_days=7, channels=channels, goals=goals,
+                brand=brand, n_cards=n_cards, model=model, research_temperature=0.35,
+                card_temperature=creativity, thinking_off=True, max_per_category=3, on_progress=_on_progress,
+                on_queue=lambda pos, waited: _queue_listener(s, progress_label[0])(pos, waited)
+            )
+        else:
+            with admission(listener=_queue_listener(s, status_label)):
+                events, err1 = research_local_events_with_llm(
+                    target_day=target_day, country=country, window_days=7,
+                    model=model, temperature=0.35, thinking_off=True, max_per_category=3
+                )
         if err1:
             ss.event_context = {}
             ss.last_error = f"리서치 실패: {err1}"
             s.update(label="❌ 리서치 실패", state="error")
             st.error(ss.last_error); st.stop()
         ss.event_context = events
-        s.update(label="✅ 리서치 완료, 아이디어 카드 생성 중. 조금만 더 기다려 주세요.", state="running")
 
-        cards, err2 = generate_idea_cards_with_llm(
-            target_day=target_day, channels=channels, goals=goals, brand=brand, country=country,
-            event_context=ss.event_context, n_cards=n_cards,
-            model=model, temperature=creativity, thinking_off=True
-        )
+        if not PIPELINED_GENERATION:
+            status_label = "✅ 리서치 완료, 아이디어 카드 생성 중. 조금만 더 기다려 주세요."
+            s.update(label=status_label, state="running")
+            with admission(listener=_queue_listener(s, status_label)):
+                cards, err2 = generate_idea_cards_with_llm(
+                    target_day=target_day, channels=channels, goals=goals, brand=brand, country=country,
+                    event_context=ss.event_context, n_cards=n_cards,
+                    model=model, temperature=creativity, thinking_off=True
+                )
         if err2:
             flat = []
             for cat, arr in ss.event_context.items():
@@ -647,29 +1136,22 @@ if submitted:
                 ss.last_error = f"아이디어 생성 실패: {err2}"
                 s.update(label="❌ 아이디어 생성 실패", state="error")
                 st.error(ss.last_error); st.stop()
-            rng = random.Random(target_day.toordinal() + len(flat))
-            sampled = rng.sample(flat, k=min(n_cards, len(flat)))
-            cards = [{
-                "id": f"fb_{i}",
-                "title": f"[{e['name']}] 타깃 아이디어",
-                "image_concept": f"{e['name']} 현장과 {brand} 연관 소품/상황을 배치한 합성 컨셉.",
-                "copy_draft_ko": f"{e['name']} 현장감을 살린 캡션. {brand}의 사용 순간을 포착하고 CTA 유도. #로컬이벤트",
-                "copy_draft_local": "",
-                "recommended_channels": channels[:3] or ["Instagram", "X(Twitter)"],
-                "fit_goals": goals[:2] if goals else [],
-                "targeted_events": [{"category": e["category"], "name": e["name"], "date": e.get("date"), "note": e.get("note","")}],
-                "rationale": f"±7일 로컬 이벤트 '{e['name']}'와 {brand}의 USP 연결.",
-                "expected_impact": "로컬 적합성으로 도달/ER 향상.",
-                "specificity_confidence": float(e.get("specific_confidence", 0.3) or 0.3),
-                "confidence": float(e.get("confidence", 0.5) or 0.5),
-            } for i, e in enumerate(sampled, 1)]
+            cards = fallback_cards(flat, brand, channels, goals, n_cards, seed=target_day.toordinal())
+            if run: run.note("rule_based_cards")
 
         ss.idea_cards = cards
         ss.inputs_snapshot = {
             "brand": brand, "target_day": target_day.isoformat(), "channels": channels, "goals": goals,
             "model": model, "creativity": creativity, "country": country
         }
-        s.update(label=f"✅ 아이디어 {len(cards)}개 생성 완료", state="complete")
+        done_label = f"✅ 아이디어 {len(cards)}개 생성 완료"
+        if run:
+            run.set(cards=len(cards))
+            done_label += f" · {run.elapsed():.1f}초 / 마감 {run.budget_s:.0f}초"
+            if len(cards) < n_cards: done_label += f" · ⏱️ 요청 {n_cards}개 중 {len(cards)}개만 생성"
+            if run.events.get("cutoff"): done_label += " · ⏱️ 마감으로 응답 일부(리서치/카드)가 잘림"
+            if run.events.get("research_fallback"): done_label += " · 리서치 일부는 저장된 이벤트로 대체"
+        s.update(label=done_label, state="complete")
         st.toast("아이디어 생성이 완료되었습니다.", icon="✅")
 
 # ===============================
@@ -681,14 +1163,10 @@ def _ensure_min_five(ctx: Dict[str, List[Dict[str, Any]]], tgt_day: date) -> Dic
     total = sum(len(v) for v in ctx.values())
     if total >= 5:
         return ctx
-    month = tgt_day.month
-    add = []
-    for day, nm in WORLD_DAYS_DB.get(month, []):
-        dstr = date(tgt_day.year, month, day).isoformat()
-        if abs((date.fromisoformat(dstr) - tgt_day).days) <= 7:
-            add.append({"category":"WorldDays","name":nm,"date":dstr,"note":"월별 고정 국제 기념일","confidence":0.9,"specific_confidence":0.95})
-        if total + len(add) >= 5:
-            break
+    # ±7일 창 (월/연도 경계를 넘는 날짜 포함)
+    add = world_days_between(tgt_day - timedelta(days=7), tgt_day + timedelta(days=7))[:5 - total]
+    for ev in add:
+        ev["note"] = "월별 고정 국제 기념일"; ev.pop("sources", None)
     if add:
         ctx = dict(ctx)
         ctx.setdefault("WorldDays", []).extend(add)
@@ -743,6 +1221,25 @@ def _format_time_for_header(d: date) -> str:
 if ss.get("idea_cards"):
     st.subheader("아이디어 카드")
     cards = ss["idea_cards"]; per_row = 3
+    cap_c1, cap_c2 = st.columns([1, 3])
+    with cap_c1:
+        gen_captions = st.button("📝 플랫폼별 캡션 일괄 생성", key="gen_captions", use_container_width=True)
+    if gen_captions:
+        cap_label = "📝 카드 전체의 플랫폼별 캡션 생성 중…"
+        with st.status(cap_label, state="running") as cs, admission(listener=_queue_listener(cs, cap_label)):
+            variants, cerr = generate_caption_variants_with_llm(
+                cards, ss.get("inputs_snapshot", {}).get("country", DEFAULT_COUNTRY),
+                ss.get("inputs_snapshot", {}).get("model", "gemini-2.5-flash"), temperature=0.5
+            )
+            for c in cards:
+                if c["id"] in variants: c["caption_variants"] = variants[c["id"]]
+            if cerr and not variants:
+                cs.update(label=f"❌ 캡션 생성 실패: {cerr}", state="error")
+            else:
+                cs.update(label=f"✅ 플랫폼별 캡션 {len(variants)}/{len(cards)}개 카드 준비 (발행 설정에서 선택)", state="complete")
+    with cap_c2:
+        n_var = sum(1 for c in cards if c.get("caption_variants"))
+        if n_var: st.caption(f"플랫폼 맞춤 캡션: {n_var}/{len(cards)}개 카드")
     local_lang_kor, _ = detect_local_language(ss.get("inputs_snapshot", {}).get("country", DEFAULT_COUNTRY))
 
     def pills_html(evs):
@@ -754,6 +1251,44 @@ if ss.get("idea_cards"):
             parts.append(f"<span class='pill' style='background:{color}'>{_esc(label)}</span>")
         return "<div class='pills'>" + "".join(parts) + "</div>"
 
+    def _visual_key(card: Dict[str, Any]) -> str:
+        # 카드 id 는 실행/수정 간 재사용됨(g3_card_4 등) → 내용 해시까지 묶어야 다른 카드의 결과가 붙지 않음
+        snap = ss.get("inputs_snapshot", {})
+        basis = json.dumps([snap.get("brand", ""), snap.get("country", ""), card.get("image_concept", "")], ensure_ascii=False)
+        return f"{card['id']}:{hashlib.sha1(basis.encode('utf-8')).hexdigest()[:12]}"
+
+    def _request_visual(card_id: str):
+        # 버튼 콜백: 페이지 이동 없이 세션 안에서 작업만 큐에 넣음
+        card = next((c for c in ss.get("idea_cards", []) if c["id"] == card_id), None)
+        if card is None: return
+        snap = ss.get("inputs_snapshot", {})
+        ss.setdefault("visual_jobs", {})[_visual_key(card)] = visual_queue.submit(
+            card_id, card.get("image_concept", ""), ss["user_id"],
+            brand=snap.get("brand", ""), country=snap.get("country", DEFAULT_COUNTRY))
+        card.pop("visual_assets", None)
+        st.toast("이미지 컨셉을 비주얼 소싱에 전달했습니다.", icon="🖼️")
+
+    def _visual_panel(card_id: str, polling: bool):
+        card = next((c for c in ss.get("idea_cards", []) if c["id"] == card_id), None)
+        if card is None: return
+        job_id = ss.get("visual_jobs", {}).get(_visual_key(card))
+        job = visual_queue.get(job_id) if job_id else None
+        if job is None: return
+        if job.pending:
+            pos = visual_queue.position(job_id)
+            st.caption("🖼️ 비주얼 소싱 중…" + (f" (대기 {pos}번째)" if pos else ""))
+            return
+        if job.status == "error":
+            st.caption(f"❗ 비주얼 소싱 실패: {job.error}")
+        elif card.get("visual_assets") != job.assets:
+            card["visual_assets"] = job.assets
+            # 폴링(조각 재실행) 중 완료 → 1회만 전체 갱신해 폴링 중단. 전체 실행 중이면 그대로 그림
+            # (여기서 재실행하면 이번 실행을 일으킨 버튼 클릭이 사라짐)
+            if polling: st.rerun()
+        if card.get("visual_assets"):
+            thumbs = "".join(f'<img src="{_esc(a["url"])}" title="{_esc(a.get("title",""))}"/>' for a in card["visual_assets"][:4])
+            st.markdown(f"<div class='visual-row'>{thumbs}</div>", unsafe_allow_html=True)
+
     for i in range(0, len(cards), per_row):
         row_cards = cards[i:i+per_row]
         cols = st.columns(per_row)
@@ -768,9 +1303,6 @@ if ss.get("idea_cards"):
                 cap_ko_html = f"<p class='capline'><b>KR</b> · {_esc(ko_caption)}</p>" if ko_caption else ""
                 cap_local_html = f"<p class='capline'><b>{_esc(local_lang_kor)}</b> · {_esc(local_caption)}</p>" if local_caption else ""
 
-                # 이미지 컨셉 박스 '내'에 텍스트 링크 삽입 (href=쿼리파라미터)
-                img_link_html = f'<a class="concept-link" href="?img={_esc(card["id"])}">이미지 생성하기</a>'
-
                 st.markdown(f"""
                 <div class="spost">
                   <div class="sp-header">
@@ -789,7 +1321,6 @@ if ss.get("idea_cards"):
                         <pre>[이미지 컨셉]
 {_esc(card.get('image_concept',''))}</pre>
                       </div>
-                      {img_link_html}
                     </div>
                     {cap_ko_html}{cap_local_html}
                     <div class="small-btn-row">
@@ -800,8 +1331,17 @@ if ss.get("idea_cards"):
                 </div>
                 """, unsafe_allow_html=True)
 
-                # 하단 액션: (미리보기 제거) 수정하기 / 발행하기
-                b1, b2 = st.columns(2)
+                # 비주얼 소싱 진행/결과 (대기 중에만 이 영역만 주기적으로 갱신)
+                job_id = ss.get("visual_jobs", {}).get(_visual_key(card))
+                job = visual_queue.get(job_id) if job_id else None
+                polling = bool(job and job.pending)
+                st.fragment(run_every=2 if polling else None)(_visual_panel)(card["id"], polling)
+
+                # 하단 액션: 이미지 생성하기(세션 내 콜백) / 수정하기 / 발행하기
+                b0, b1, b2 = st.columns(3)
+                with b0:
+                    st.button("이미지 생성", key=f"img_{card['id']}", use_container_width=True,
+                              on_click=_request_visual, args=(card["id"],))
                 with b1:
                     if st.button("수정하기", key=f"edit_{card['id']}", type="secondary", use_container_width=True):
                         ss["modal_type"] = "edit"
@@ -823,7 +1363,7 @@ def render_edit_modal(card: Dict[str, Any]):
         col_apply, col_cancel = st.columns([1,1])
         with col_apply:
             if st.button("미세 조정 적용", type="primary", use_container_width=True):
-                with st.status("✍️ 수정 반영 중…", state="running"):
+                with st.status("✍️ 수정 반영 중…", state="running") as rs, admission(listener=_queue_listener(rs, "✍️ 수정 반영 중…")):
                     new_card, err = refine_card_with_llm(
                         card, instr,
                         st.session_state.get("inputs_snapshot", {}).get("country", DEFAULT_COUNTRY),
@@ -854,9 +1394,10 @@ def render_publish_modal(card: Dict[str, Any]):
     with st.container(border=True):
         st.subheader("📤 소셜 포스트 발행 설정")
         P_PLATFORMS = ["Instagram", "Facebook", "X(Twitter)"]
+        rec = (card.get("recommended_channels") or ["Instagram"])[0]
         pc1, pc2, pc3 = st.columns([1.2, 1, 1])
         with pc1:
-            platform = st.selectbox("플랫폼", P_PLATFORMS, index=0, key="pub_platform")
+            platform = st.selectbox("플랫폼", P_PLATFORMS, index=P_PLATFORMS.index(rec) if rec in P_PLATFORMS else 0, key="pub_platform")
             use_local = st.checkbox("현지어 캡션 사용", value=bool(card.get("copy_draft_local")), key="pub_use_local")
         with pc2:
             sched_date = st.date_input("게시 날짜", value=date.fromisoformat(st.session_state.get("inputs_snapshot",{}).get("target_day", date.today().isoformat())), key="pub_date")
@@ -871,9 +1412,21 @@ def render_publish_modal(card: Dict[str, Any]):
             )
             st.caption(f"현재 선택: 현지 {sched_time.strftime('%H:%M')} → KST {kst_equivalent(sched_time, local_tz, sched_date)}")
 
-        cap = (card.get("copy_draft_local") if use_local and card.get("copy_draft_local") else card.get("copy_draft_ko")) or ""
+        variant = (card.get("caption_variants") or {}).get(platform)
+        cap_src = st.radio("캡션 버전", ["플랫폼 맞춤", "기본"], horizontal=True, key="pub_cap_src") if variant else "기본"
+        if cap_src == "플랫폼 맞춤":
+            cap = (variant["local"] if use_local and variant.get("local") else variant["ko"]) or ""
+        else:
+            cap = (card.get("copy_draft_local") if use_local and card.get("copy_draft_local") else card.get("copy_draft_ko")) or ""
         st.markdown("**게시 캡션 미리보기**")
         st.text_area(" ", value=cap, height=140, label_visibility="collapsed")
+        rule = PLATFORM_RULES.get(platform, {})
+        max_chars = rule.get("max_chars")
+        if max_chars:
+            n = caption_len(cap, platform)
+            note = f"{n} / {max_chars}자" + (" (가중: 한글·이모지 2, URL 23)" if rule.get("weighted") else "")
+            if n > max_chars: note += " — 플랫폼 글자 수 초과 ('📝 플랫폼별 캡션 일괄 생성' 사용)"
+            st.caption(note)
 
         cbt1, cbt2, cbt3 = st.columns([1,1,1])
         with cbt1:
@@ -958,6 +1511,84 @@ if ss.get("modal_type") in {"preview", "publish", "edit"} and ss.get("modal_card
         elif ss["modal_type"] == "edit":
             render_edit_modal(the_card)
 
+# ===============================
+# 섹션: 기간 캠페인 플래너 (리서치 1회 + 일자별 카드)
+# ===============================
+st.markdown("<br>", unsafe_allow_html=True)
+st.markdown('<div style="font-size:0.95rem; font-weight:400;">📆 기간 캠페인 플래너 (브랜드/국가/채널은 위 입력값 사용)</div>', unsafe_allow_html=True)
+ss.setdefault("campaign_plan", {})
+k1, k2, k3, k4 = st.columns([1,1,1,2])
+with k1:
+    camp_start = st.date_input("시작일", value=target_day, key="camp_start")
+with k2:
+    camp_end = st.date_input("종료일", value=target_day + timedelta(days=13), key="camp_end")
+with k3:
+    camp_per_day = st.number_input("일별 카드 수", min_value=1, max_value=3, value=1, step=1, key="camp_per_day")
+with k4:
+    st.markdown("&nbsp;", unsafe_allow_html=True)
+    camp_clicked = st.button("기간 캠페인 기획", type="secondary", key="camp_go")
+
+if camp_clicked:
+    snap = ss.get("inputs_snapshot", {})
+    camp_brand = brand.strip() or snap.get("brand", "")
+    n_days = (camp_end - camp_start).days + 1
+    if not camp_brand:
+        st.error("브랜드와 제품명 또는 카테고리를 입력해주세요")
+    elif n_days < 1 or n_days > MAX_CAMPAIGN_DAYS:
+        st.error(f"기간은 1~{MAX_CAMPAIGN_DAYS}일로 지정해주세요.")
+    else:
+        camp_label = f"📆 {n_days}일 캠페인 기획 중… (기간 리서치 1회 → 일자별 카드)"
+        with st.status(camp_label, state="running") as s4:
+            camp_progress = [camp_label]
+            def _on_camp_progress(done: int, total: int):
+                camp_progress[0] = f"📆 일자별 카드 생성 중… ({done}/{total}일 완료)"
+                s4.update(label=camp_progress[0], state="running")
+            with admission(listener=_queue_listener(s4, camp_label)):   # 리서치 단계 대기 표시
+                plan, cerr = plan_campaign(
+                    camp_start, camp_end, country=country or snap.get("country", DEFAULT_COUNTRY),
+                    channels=channels or snap.get("channels", []), goals=GOALS[:], brand=camp_brand,
+                    cards_per_day=int(camp_per_day), model="gemini-2.5-flash", temperature=0.60,
+                    on_progress=_on_camp_progress,
+                    on_queue=lambda pos, waited: _queue_listener(s4, camp_progress[0])(pos, waited)
+                )
+            if cerr:
+                s4.update(label=f"❌ 캠페인 기획 실패: {cerr}", state="error")
+                st.error(f"캠페인 기획 실패: {cerr}")
+            else:
+                ss.campaign_plan = plan
+                n_cards_total = sum(len(d["cards"]) for d in plan["days"])
+                s4.update(label=f"✅ {n_days}일 캠페인 · 카드 {n_cards_total}개 생성 완료", state="complete")
+                st.toast("기간 캠페인 기획이 완료되었습니다.", icon="✅")
+
+def _open_campaign_day(i: int):
+    # 일자별 카드를 위 아이디어 카드 섹션으로 불러와 편집/발행/이미지 기능 재사용
+    plan = ss["campaign_plan"]; day = plan["days"][i]
+    ss.idea_cards = [dict(c) for c in day["cards"]]
+    ss.event_context = {cat: list(arr) for cat, arr in day["event_context"].items()}
+    ss.inputs_snapshot = {**ss.get("inputs_snapshot", {}), "brand": plan["brand"], "country": plan["country"],
+                          "channels": plan["channels"], "target_day": day["date"]}
+
+camp_plan = ss.get("campaign_plan")
+if camp_plan:
+    st.caption(summarize_campaign(camp_plan))
+    idle = []
+    for i, day in enumerate(camp_plan["days"]):
+        d = date.fromisoformat(day["date"])
+        if not day["cards"]:
+            idle.append(day_label(d)); continue
+        names = ", ".join(e["name"] for e in day["events"])
+        with st.expander(f"{day_label(d)} · 🎯 {names} · 카드 {len(day['cards'])}", expanded=False):
+            for c in day["cards"]:
+                st.markdown(f"**{c.get('title','')}** · {', '.join(c.get('recommended_channels', []) or [])}")
+                st.caption(c.get("copy_draft_ko", ""))
+            if day.get("error"):
+                st.caption(f"⚠️ LLM 생성 실패로 규칙 기반 카드 사용: {day['error']}")
+            st.button("이 날짜 카드 열기 (편집/발행)", key=f"camp_open_{i}", on_click=_open_campaign_day, args=(i,))
+    if idle:
+        st.caption(f"배정된 이벤트 없음(상시 콘텐츠 권장): {', '.join(idle)}")
+    blob, fname, mime = build_campaign_file(camp_plan)
+    st.download_button("캠페인 일정 다운로드 (CSV)", data=blob, file_name=fname, mime=mime, key="camp_dl")
+
 # ===============================
 # 섹션: 연간 이벤트 캘린더 (타이틀 축소 + 버튼 secondary)
 # ===============================
@@ -971,12 +1602,13 @@ with c2:
 
 if gen_clicked:
     with st.status("🗂️ 연간 이벤트 생성 중…", state="running") as s3:
-        rows, err = generate_year_events_with_llm(
-            int(year),
-            country=st.session_state.get("inputs_snapshot",{}).get("country", DEFAULT_COUNTRY),
-            model=st.session_state.get("inputs_snapshot",{}).get("model","gemini-2.5-flash"),
-            temperature=0.35, thinking_off=True
-        )
+        with admission(listener=_queue_listener(s3, "🗂️ 연간 이벤트 생성 중…")):
+            rows, err = generate_year_events_with_llm(
+                int(year),
+                country=st.session_state.get("inputs_snapshot",{}).get("country", DEFAULT_COUNTRY),
+                model=st.session_state.get("inputs_snapshot",{}).get("model","gemini-2.5-flash"),
+                temperature=0.35, thinking_off=True
+            )
         if err or not rows:
             s3.update(label=f"❌ 연간 이벤트 생성 실패: {err or '결과 없음'}", state="error")
             st.error(f"연간 이벤트 생성 실패: {err or '결과 없음'}")
@@ -994,3 +1626,37 @@ if cached:
         file_name=cached["name"],
         mime=cached["mime"]
     )
+
+# ===============================
+# 섹션: 운영 지표 (라우팅 등)
+# ===============================
+_render_budget(budget_slot)   # 이번 실행 사용량 반영
+ledger.flush(force=True)
+
+with st.expander("⚙️ 운영 지표", expanded=False):
+    if IS_ADMIN:   # 사용자 id/사용량/작업 소유자는 관리자(IDEAMAKER_ADMIN_USERS)에게만
+        st.markdown("**비주얼 소싱 큐**")
+        st.json(visual_queue.snapshot(), expanded=False)
+        st.markdown("**토큰 사용량 (오늘, 사용자별 · 관리자 리포트: `python token_budget.py`)**")
+        st.json(ledger.report(), expanded=False)
+    else:
+        st.markdown("**토큰 사용량 (오늘, 내 사용량)**")
+        st.json(ledger.status(ss["user_id"]), expanded=False)
+    st.markdown("**실행 마감 SLO (달성률 / 단계별 지연 모델)**")
+    st.json(slo.snapshot(), expanded=False)
+    st.markdown("**수락 제어 (대기열 / 단계별 대기 시간)**")
+    st.json(scheduler.snapshot(), expanded=False)
+    st.markdown("**모델 라우팅 (단계별 지연 p95 / 오류율 / 비용)**")
+    st.json(router.snapshot(), expanded=False)
+    st.markdown("**공유 캐시 / 워머 (커버리지·신선도)**")
+    st.json({"cache_entries": len(shared_cache), **shared_cache.stats,
+             "warmer": cache_warmer.coverage()}, expanded=False)
+    st.markdown("**이벤트 날짜 인덱스**")
+    st.json({"events": len(event_index), "bytes": event_index.nbytes,
+             "countries": {c: [d.isoformat() for d in event_index.span(c) or ()] for c in event_index.countries()}},
+            expanded=False)
+    if LLM_REPLAY_PATH or LLM_RECORD_PATH:
+        st.markdown("**LLM 기록/재생**")
+        st.json({"mode": "replay" if LLM_REPLAY_PATH else "record",
+                 "cassette": LLM_REPLAY_PATH or LLM_RECORD_PATH,
+                 **getattr(client, "stats", {}), "recorded": getattr(client, "recorded", None)}, expanded=False)
@@ -0,0 +1,221 @@
+# cache_warmer.py
+# -----------------------------------------------------------------------------
+# 프로세스 공유 결과 캐시 + 시작 시/주기적 캐시 워머
+#   - SharedResultCache: 세션 간 공유되는 TTL 캐시(리서치 윈도우/연간 캘린더)
+#   - CacheWarmer: 인기 국가 × 향후 N일 ±7일 리서치, 연간 캘린더를 백그라운드로 미리 계산
+#     (호출 예산 내에서만, UI 비차단) + 커버리지/신선도 보고
+# -----------------------------------------------------------------------------
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# ===============================
+# 캐시 키
+# ===============================
+def research_cache_key(country: str, target_day: date, window_days: int, max_per_category: int,
+                       categories: Optional[Sequence[str]] = None) -> Tuple:
+    return ("research", (country or "").strip(), target_day.isoformat(), window_days, max_per_category,
+            tuple(categories or ()))
+
+def year_cache_key(country: str, year: int) -> Tuple:
+    return ("year", (country or "").strip(), int(year))
+
+# ===============================
+# 공유 캐시
+# ===============================
+@dataclass
+class _Entry:
+    value: Any
+    created_at: float
+    expires_at: float
+
+class SharedResultCache:
+    """스레드 안전 TTL + LRU 캐시. get 은 깊은 복사본을 반환(호출측 변경이 캐시를 오염시키지 않도록)."""
+
+    def __init__(self, max_entries: int = 5000, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "puts": 0}
+
+    # 조회 관찰 훅 (key, hit) — 부하 테스트가 흐름/단계별 캐시 적중을 따로 집계할 때만 설정
+    observer: Optional[Callable[[Tuple, bool], None]] = None
+
+    def get(self, key: Tuple) -> Any:
+        now = self._clock()
+        with self._lock:
+            ent = self._data.get(key)
+            hit = ent is not None and ent.expires_at > now
+            if not hit:
+                if ent is not None: del self._data[key]
+                self.stats["misses"] += 1
+                value = None
+            else:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                value = copy.deepcopy(ent.value)
+        obs = SharedResultCache.observer   # 클래스 속성(프로세스 전체) — 인스턴스 바인딩 없이 호출
+        if obs is not None:
+            obs(key, hit)
+        return value
+
+    def put(self, key: Tuple, value: Any, ttl_s: float) -> None:
+        now = self._clock()
+        with self._lock:
+            self._data[key] = _Entry(copy.deepcopy(value), now, now + ttl_s)
+            self._data.move_to_end(key)
+            self.stats["puts"] += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def entry_age(self, key: Tuple) -> Optional[Tuple[float, float]]:
+        """(경과 초, 남은 초). 없거나 만료면 None."""
+        now = self._clock()
+        with self._lock:
+            ent = self._data.get(key)
+            if ent is None or ent.expires_at <= now: return None
+            return now - ent.created_at, ent.expires_at - now
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+# ===============================
+# 워머
+# ===============================
+def _env_list(name: str, default: str) -> List[str]:
+    return [x.strip() for x in os.environ.get(name, default).split(",") if x.strip()]
+
+@dataclass
+class WarmConfig:
+    enabled: bool = False
+    countries: List[str] = field(default_factory=lambda: ["대한민국", "United States", "Japan"])
+    days_ahead: int = 7                # 오늘부터 N일의 대상일
+    window_days: int = 7
+    max_per_category: int = 3
+    include_year: bool = True          # 연간 캘린더
+    years: List[int] = field(default_factory=list)   # 비우면 올해
+    budget_calls: int = 60             # 1회 워밍 사이클당 최대 LLM 호출
+    interval_s: float = 6 * 3600       # 재워밍 주기
+    pace_s: float = 0.5                # 호출 간 간격(쿼터 분산)
+
+    @classmethod
+    def from_env(cls) -> "WarmConfig":
+        d = cls()
+        return cls(
+            enabled=os.environ.get("IDEAMAKER_WARM", "0").strip() not in {"", "0", "false"},
+            countries=_env_list("IDEAMAKER_WARM_COUNTRIES", ",".join(d.countries)),
+            days_ahead=int(os.environ.get("IDEAMAKER_WARM_DAYS", d.days_ahead)),
+            include_year=os.environ.get("IDEAMAKER_WARM_YEAR", "1").strip() not in {"", "0", "false"},
+            years=[int(y) for y in _env_list("IDEAMAKER_WARM_YEARS", "")],
+            budget_calls=int(os.environ.get("IDEAMAKER_WARM_BUDGET", d.budget_calls)),
+            interval_s=float(os.environ.get("IDEAMAKER_WARM_INTERVAL", d.interval_s)),
+            pace_s=float(os.environ.get("IDEAMAKER_WARM_PACE", d.pace_s)),
+        )
+
+@dataclass(frozen=True)
+class WarmTask:
+    kind: str                              # "research" | "year"
+    country: str
+    day: Optional[date] = None
+    year: Optional[int] = None
+    categories: Optional[Tuple[str, ...]] = None
+
+class CacheWarmer:
+    def __init__(self, cache: SharedResultCache, config: WarmConfig,
+                 research_fn: Callable[..., Any], year_fn: Callable[..., Any],
+                 category_groups: Optional[List[List[str]]] = None, today_fn: Callable[[], date] = date.today):
+        self.cache = cache
+        self.config = config
+        self.research_fn = research_fn     # (task) -> 결과(내부에서 캐시에 저장)
+        self.year_fn = year_fn
+        self.category_groups = category_groups
+        self.today_fn = today_fn
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Dict[str, Any] = {}
+
+    def _key(self, t: WarmTask) -> Tuple:
+        if t.kind == "year":
+            return year_cache_key(t.country, t.year)
+        return research_cache_key(t.country, t.day, self.config.window_days, self.config.max_per_category, t.categories)
+
+    def plan(self, today: Optional[date] = None) -> List[WarmTask]:
+        today = today or self.today_fn()
+        shards = [tuple(g) for g in self.category_groups] if self.category_groups else [None]
+        days = [today + timedelta(days=i) for i in range(self.config.days_ahead)]
+        # 가치 순: 오늘 리서치 → 연간 캘린더(국가당 1회로 1년 전체·기간 캠페인·로컬 폴백을 덮음) → 이후 날짜
+        # 국가 순서(인기순) 유지. 연간을 날짜 뒤에 두면 기본 예산(60)이 날짜 리서치에서 소진돼 연간이 영영 안 데워짐
+        research = lambda ds: [WarmTask("research", c, day=d, categories=s)
+                               for d in ds for c in self.config.countries for s in shards]
+        tasks: List[WarmTask] = research(days[:1])
+        if self.config.include_year:
+            for y in (self.config.years or [today.year]):
+                tasks.extend(WarmTask("year", c, year=y) for c in self.config.countries)
+        return tasks + research(days[1:])
+
+    def _needs_refresh(self, t: WarmTask) -> bool:
+        age = self.cache.entry_age(self._key(t))
+        return age is None or age[1] < self.config.interval_s   # 다음 사이클 전에 만료되면 갱신
+
+    def run_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        t0 = time.time()
+        calls = ok = failed = 0
+        for t in self.plan(today):
+            if self._stop.is_set() or calls >= self.config.budget_calls: break
+            if not self._needs_refresh(t): continue
+            calls += 1
+            try:
+                _, err = self.research_fn(t) if t.kind == "research" else self.year_fn(t)
+                if err: failed += 1
+                else:   ok += 1
+            except Exception:
+                failed += 1
+            if self.config.pace_s > 0:
+                self._stop.wait(self.config.pace_s)
+        self.last_run = {"started_at": t0, "duration_s": round(time.time() - t0, 2),
+                         "calls": calls, "ok": ok, "failed": failed,
+                         "budget_exhausted": calls >= self.config.budget_calls}
+        return self.last_run
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.config.interval_s)
+
+    def start(self) -> bool:
+        if not self.config.enabled or (self._thread and self._thread.is_alive()):
+            return False
+        self._thread = threading.Thread(target=self._loop, name="ideamaker-cache-warmer", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def coverage(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """첫 사용자가 만날 상태: 대상 중 신선한 캐시 비율과 경과 시간."""
+        tasks = self.plan(today)
+        ages = [self.cache.entry_age(self._key(t)) for t in tasks]
+        fresh = [a for a in ages if a is not None]
+        by_kind: Dict[str, List[int]] = {}
+        for t, a in zip(tasks, ages):
+            k = by_kind.setdefault(t.kind, [0, 0]); k[1] += 1
+            if a is not None: k[0] += 1
+        return {
+            "enabled": self.config.enabled,
+            "targets": len(tasks),
+            "fresh": len(fresh),
+            "coverage": round(len(fresh) / len(tasks), 3) if tasks else 1.0,
+            "by_kind": {k: f"{v[0]}/{v[1]}" for k, v in by_kind.items()},
+            "max_age_s": int(max((a[0] for a in fresh), default=0)),
+            "min_ttl_left_s": int(min((a[1] for a in fresh), default=0)),
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,108 @@
+# campaign_planner.py
+# -----------------------------------------------------------------------------
+# 기간 캠페인 플래너 (날짜 범위 → 일자별 아이디어 카드)
+#   - 리서치는 기간 전체를 한 번에(또는 연간 캘린더 인덱스 재사용) → 일자별 ±창은 로컬에서 슬라이딩
+#   - 이벤트 → 게시일 배정: 이벤트마다 ±창 안에서 가장 가까운 날 하나에만(일자별 상한)
+#     → 같은 명절/기념일을 매일 반복 제안하지 않음
+#   - LLM 호출 수 = 리서치 1 + 이벤트가 배정된 일수 (기간에 비례, 일수 × 창 크기와 무관)
+# -----------------------------------------------------------------------------
+
+import csv
+import io
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAX_CAMPAIGN_DAYS = 62
+WEEKDAYS_KO = ["월", "화", "수", "목", "금", "토", "일"]
+
+def campaign_days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def sweep_window(start: date, end: date, pad_days: int = 0) -> Tuple[date, int]:
+    """기간 전체(+앞뒤 pad)를 덮는 리서치 창 (중심일, ±일수).
+    기본 pad 0 — 기간 밖 이벤트는 배정에서 버려지므로 앞뒤를 더 리서치해도 비용(출력 토큰)만 늘어남."""
+    span = (end - start).days
+    return start + timedelta(days=span // 2), (span - span // 2) + pad_days
+
+def sweep_per_category(n_days: int) -> int:
+    """기간 리서치의 카테고리별 이벤트 상한 — 주당 2건 정도, 3~12."""
+    return max(3, min(12, 2 * -(-n_days // 7) + 1))
+
+def event_key(e: Dict[str, Any]) -> Tuple[str, str]:
+    return ((e.get("name") or "").strip().lower(), e.get("category") or "")
+
+def _event_day(e: Dict[str, Any]) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(e.get("date") or "")[:10])
+    except ValueError:
+        return None
+
+def assign_events(events: Sequence[Dict[str, Any]], days: Sequence[date], window_days: int = 7,
+                  max_per_day: int = 3) -> Tuple[Dict[date, List[Dict[str, Any]]], Dict[str, int]]:
+    """이벤트별 게시일 1일 배정 → ({일자: [이벤트]}, 통계).
+    기간 [시작, 끝] 밖 이벤트(창 경계/모델이 벗어난 날짜)는 제외 — 첫날/마지막 날로 당겨 붙이지 않음.
+    신뢰도 높은 이벤트부터, 이벤트 날짜에서 가까운 날(동률이면 이전 날 = 사전 티저) 중 여유 있는 날.
+    같은 이름·카테고리(여러 날짜로 잡힌 연휴 등)는 기간 안 가장 이른 항목 하나만. 날짜 없는 이벤트는 제외."""
+    plan: Dict[date, List[Dict[str, Any]]] = {d: [] for d in days}
+    stats = {"events": len(events), "undated": 0, "out_of_range": 0, "duplicates": 0, "assigned": 0, "overflow": 0}
+    if not days:
+        return plan, stats
+    first, last = days[0], days[-1]
+
+    dated: List[Tuple[date, Dict[str, Any]]] = []
+    for e in events:
+        ed = _event_day(e)
+        if ed is None: stats["undated"] += 1
+        elif not first <= ed <= last: stats["out_of_range"] += 1
+        else: dated.append((ed, e))
+
+    uniq: Dict[Tuple[str, str], Tuple[date, Dict[str, Any]]] = {}
+    for ed, e in sorted(dated, key=lambda x: x[0]):
+        k = event_key(e)
+        if k in uniq: stats["duplicates"] += 1
+        else: uniq[k] = (ed, e)
+
+    ranked = sorted(uniq.values(), key=lambda x: (-float(x[1].get("confidence", 0.0) or 0.0), x[0]))
+    for ed, e in ranked:
+        slot = None
+        for off in range(window_days + 1):
+            for d in (ed - timedelta(days=off), ed + timedelta(days=off)) if off else (ed,):
+                if first <= d <= last and len(plan[d]) < max_per_day:
+                    slot = d; break
+            if slot: break
+        if slot is None:
+            stats["overflow"] += 1   # 창 안 날짜가 모두 찼음
+            continue
+        plan[slot].append(e); stats["assigned"] += 1
+    for d in plan:
+        plan[d].sort(key=lambda e: e["date"])
+    return plan, stats
+
+def day_label(d: date) -> str:
+    return f"{d.month}/{d.day} ({WEEKDAYS_KO[d.weekday()]})"
+
+def build_campaign_file(plan: Dict[str, Any]) -> Tuple[bytes, str, str]:
+    """캠페인 결과 → CSV (일자 × 카드 1행)."""
+    cols = ["date", "weekday", "events", "title", "recommended_channels", "copy_draft_ko", "copy_draft_local",
+            "image_concept", "confidence"]
+    bio = io.StringIO()
+    cw = csv.writer(bio)
+    cw.writerow(cols)
+    for day in plan.get("days", []):
+        d = date.fromisoformat(day["date"])
+        evs = " / ".join(e.get("name", "") for e in day.get("events", []))
+        for c in day.get("cards", []) or [{}]:
+            if not c and not evs: continue
+            cw.writerow([day["date"], WEEKDAYS_KO[d.weekday()], evs, c.get("title", ""),
+                         ", ".join(c.get("recommended_channels", []) or []), c.get("copy_draft_ko", ""),
+                         c.get("copy_draft_local", ""), c.get("image_concept", ""), c.get("confidence", "")])
+    name = f"campaign_{plan.get('start', '')}_{plan.get('end', '')}.csv"
+    return bio.getvalue().encode("utf-8-sig"), name, "text/csv"
+
+def summarize(plan: Dict[str, Any]) -> Optional[str]:
+    if not plan or not plan.get("days"): return None
+    src = {"year_calendar": "연간 캘린더 재사용", "sweep": "기간 리서치 1회", "index": "저장된 이벤트(절약 모드)"}
+    s = plan.get("stats", {})
+    return (f"{plan['start']} ~ {plan['end']} · 리서치: {src.get(plan.get('source'), plan.get('source'))} · "
+            f"카드 생성 호출 {plan.get('card_calls', 0)}회 · 이벤트 배정 {s.get('assigned', 0)}건"
+            f" (기간 밖 {s.get('out_of_range', 0)}건·중복 {s.get('duplicates', 0)}건 제외, 창 초과 {s.get('overflow', 0)}건)")
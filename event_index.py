@@ -0,0 +1,169 @@
+# event_index.py
+# -----------------------------------------------------------------------------
+# 배열 기반 이벤트 날짜 인덱스 (국가별)
+#   - 날짜(datetime64[D] → int32 일수), 카테고리 코드(uint8), 신뢰도(float32) 열을 날짜순 정렬 보관
+#   - searchsorted(이분 탐색) 범위 질의 + 카테고리 마스크를 한 번에 처리
+#   - 월별 건수는 bincount 로 계산
+#   여러 해 × 여러 국가도 숫자 열은 이벤트당 ~13B (수만 건이면 1MB 미만)
+# -----------------------------------------------------------------------------
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+
+def _day(d: date) -> int:
+    return d.toordinal() - _EPOCH_ORD
+
+def _from_day(n: int) -> date:
+    return date.fromordinal(int(n) + _EPOCH_ORD)
+
+def parse_days(dates: Sequence[Optional[str]]) -> np.ndarray:
+    """ISO 날짜 문자열 목록 → int32 일수 배열 (None/형식 오류는 -2**31). 벡터 파싱."""
+    out = np.full(len(dates), np.iinfo(np.int32).min, dtype=np.int32)
+    idx = [i for i, d in enumerate(dates) if d]
+    if not idx:
+        return out
+    raw = np.array([str(dates[i])[:10] for i in idx])
+    try:
+        out[idx] = raw.astype("datetime64[D]").astype(np.int64).astype(np.int32)
+    except ValueError:
+        for i in idx:   # 형식 오류가 섞인 경우에만 개별 파싱
+            try: out[i] = np.datetime64(str(dates[i])[:10], "D").astype(np.int64)
+            except ValueError: pass
+    return out
+
+NO_DATE = np.iinfo(np.int32).min
+
+def window_mask(dates: Sequence[Optional[str]], center: date, window_days: int) -> np.ndarray:
+    """center ±window_days 안에 드는 항목 마스크 (날짜 없는 항목은 False)."""
+    days = parse_days(dates)
+    c = _day(center)
+    return (days != NO_DATE) & (np.abs(days.astype(np.int64) - c) <= window_days)
+
+def _months_of(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+
+def month_histogram(dates: Sequence[Optional[str]], year: int) -> np.ndarray:
+    """날짜 문자열 목록의 해당 연도 월별 건수 (길이 12, index 0 = 1월). 인덱스 없이 일회성 집계용."""
+    days = parse_days(dates)
+    days = days[(days >= _day(date(year, 1, 1))) & (days <= _day(date(year, 12, 31)))]
+    return np.bincount(_months_of(days), minlength=12)
+
+@dataclass(frozen=True)
+class _Columns:
+    day: np.ndarray          # int32, 오름차순
+    cat: np.ndarray          # uint8 카테고리 코드
+    conf: np.ndarray         # float32
+    spec: np.ndarray         # float32
+    payload: Tuple[Dict[str, Any], ...]   # 행별 원본(이름/메모/출처) — 결과 materialize 용
+
+    @property
+    def nbytes(self) -> int:
+        return self.day.nbytes + self.cat.nbytes + self.conf.nbytes + self.spec.nbytes
+
+_EMPTY = _Columns(np.empty(0, np.int32), np.empty(0, np.uint8), np.empty(0, np.float32),
+                  np.empty(0, np.float32), ())
+
+class EventIndex:
+    def __init__(self, categories: Sequence[str]):
+        self.categories = list(categories)
+        self._code = {c: i for i, c in enumerate(self.categories)}
+        self._lock = threading.Lock()
+        self._by_country: Dict[str, _Columns] = {}
+
+    # ---- 쓰기 ----
+    def add_events(self, country: str, events: Sequence[Dict[str, Any]],
+                   replace: Optional[Tuple[date, date]] = None) -> int:
+        """날짜 있는 이벤트를 추가(날짜 없는 항목은 제외). replace=(start, end) 면 그 구간 기존 행을 먼저 제거."""
+        days = parse_days([e.get("date") for e in events])
+        keep = [i for i in range(len(events))
+                if days[i] != NO_DATE and events[i].get("category") in self._code]
+        new = _Columns(
+            day=days[keep],
+            cat=np.array([self._code[events[i]["category"]] for i in keep], dtype=np.uint8),
+            conf=np.array([float(events[i].get("confidence", 0.0) or 0.0) for i in keep], dtype=np.float32),
+            spec=np.array([float(events[i].get("specific_confidence", 0.0) or 0.0) for i in keep], dtype=np.float32),
+            payload=tuple(events[i] for i in keep),
+        )
+        key = (country or "").strip()
+        with self._lock:
+            cur = self._by_country.get(key, _EMPTY)
+            if replace is not None and len(cur.day):
+                lo = int(np.searchsorted(cur.day, _day(replace[0]), side="left"))
+                hi = int(np.searchsorted(cur.day, _day(replace[1]), side="right"))
+                m = np.ones(len(cur.day), dtype=bool); m[lo:hi] = False
+                cur = _Columns(cur.day[m], cur.cat[m], cur.conf[m], cur.spec[m],
+                               tuple(p for p, k in zip(cur.payload, m) if k))
+            day = np.concatenate([cur.day, new.day])
+            order = np.argsort(day, kind="stable")
+            payload = cur.payload + new.payload
+            self._by_country[key] = _Columns(
+                day=day[order],
+                cat=np.concatenate([cur.cat, new.cat])[order],
+                conf=np.concatenate([cur.conf, new.conf])[order],
+                spec=np.concatenate([cur.spec, new.spec])[order],
+                payload=tuple(payload[i] for i in order),
+            )
+        return len(keep)
+
+    # ---- 읽기 ----
+    def _cols(self, country: str) -> _Columns:
+        with self._lock:
+            return self._by_country.get((country or "").strip(), _EMPTY)
+
+    def _range(self, cols: _Columns, start: date, end: date, categories: Optional[Sequence[str]],
+               min_confidence: float) -> Tuple[int, np.ndarray]:
+        lo = int(np.searchsorted(cols.day, _day(start), side="left"))
+        hi = max(lo, int(np.searchsorted(cols.day, _day(end), side="right")))   # start > end → 빈 구간
+        mask = np.ones(hi - lo, dtype=bool)
+        if categories:
+            lut = np.zeros(max(len(self.categories), 1), dtype=bool)
+            lut[[self._code[c] for c in categories if c in self._code]] = True
+            mask &= lut[cols.cat[lo:hi]]
+        if min_confidence > 0:
+            mask &= cols.conf[lo:hi] >= min_confidence
+        return lo, mask
+
+    def count(self, country: str, start: date, end: date, categories: Optional[Sequence[str]] = None,
+              min_confidence: float = 0.0) -> int:
+        cols = self._cols(country)
+        _, mask = self._range(cols, start, end, categories, min_confidence)
+        return int(mask.sum())
+
+    def query(self, country: str, start: date, end: date, categories: Optional[Sequence[str]] = None,
+              min_confidence: float = 0.0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """[start, end] 구간 이벤트(날짜순). 결과는 원본 dict 의 얕은 복사본."""
+        cols = self._cols(country)
+        lo, mask = self._range(cols, start, end, categories, min_confidence)
+        rows = lo + np.flatnonzero(mask)
+        if limit is not None: rows = rows[:limit]
+        return [dict(cols.payload[i]) for i in rows]
+
+    def month_counts(self, country: str, year: int, categories: Optional[Sequence[str]] = None) -> np.ndarray:
+        """해당 연도 월별 건수 (길이 12, index 0 = 1월)."""
+        cols = self._cols(country)
+        lo, mask = self._range(cols, date(year, 1, 1), date(year, 12, 31), categories, 0.0)
+        days = cols.day[lo:lo + len(mask)][mask]
+        return np.bincount(_months_of(days), minlength=12)
+
+    def span(self, country: str) -> Optional[Tuple[date, date]]:
+        cols = self._cols(country)
+        return (_from_day(cols.day[0]), _from_day(cols.day[-1])) if len(cols.day) else None
+
+    def countries(self) -> List[str]:
+        with self._lock:
+            return list(self._by_country)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(c.day) for c in self._by_country.values())
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(c.nbytes for c in self._by_country.values())
@@ -0,0 +1,244 @@
+# fake_gemini.py
+# -----------------------------------------------------------------------------
+# 로컬 가짜 Gemini 클라이언트 — 부하 테스트/오프라인 개발용
+#   - google.genai.Client 와 같은 모양: client.models.generate_content(_stream)(model=, contents=, config=)
+#   - 프롬프트 종류(리서치/카드/수정/연간)를 감지해 스키마에 맞는 JSON 텍스트를 생성
+#   - 모델별 지연 프로파일(TTFT + 입력 prefill + 토큰 처리량, 로그정규 지터)로 sleep
+# -----------------------------------------------------------------------------
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from llm_types import TextResponse, UsageMetadata
+
+# ===============================
+# 지연 프로파일
+# ===============================
+@dataclass(frozen=True)
+class LatencyProfile:
+    ttft_s: float          # 첫 토큰까지 중앙값(초)
+    tokens_per_s: float    # 출력 토큰 처리량
+    sigma: float = 0.35    # 로그정규 지터
+    error_rate: float = 0.0
+    prefill_tokens_per_s: float = 8000.0   # 입력 토큰 처리량(prefill)
+
+LATENCY_PROFILES: Dict[str, LatencyProfile] = {
+    "gemini-2.5-flash":      LatencyProfile(ttft_s=0.6,  tokens_per_s=180.0),
+    "gemini-2.5-flash-lite": LatencyProfile(ttft_s=0.35, tokens_per_s=320.0, sigma=0.25),
+    "gemini-2.5-pro":        LatencyProfile(ttft_s=2.0,  tokens_per_s=70.0,  sigma=0.45),
+}
+DEFAULT_PROFILE = LATENCY_PROFILES["gemini-2.5-flash"]
+
+def _approx_tokens(s: str) -> int:
+    return max(1, len(s or "") // 4)
+
+# ===============================
+# 프롬프트별 가짜 출력
+# ===============================
+_CATS = ["Commercial", "Cultural", "PublicHoliday", "WeatherEnv", "School",
+         "Religion", "MediaEnt", "Sports", "Gimmick", "WorldDays"]
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _fake_event(rng: random.Random, cat: str, d: Optional[date], i: int) -> Dict[str, Any]:
+    return {
+        "category": cat,
+        "name": f"{cat} 이벤트 {i}",
+        "date": d.isoformat() if d else None,
+        "note": f"{cat} 관련 로컬 이벤트(가짜 데이터)",
+        "confidence": round(rng.uniform(0.4, 0.95), 2),
+        "specific_confidence": round(rng.uniform(0.3, 0.9), 2),
+        "sources": [f"fake:{cat}"],
+    }
+
+def _fake_research(rng: random.Random, prompt: str) -> Any:
+    dates = [date.fromisoformat(x) for x in _DATE_RE.findall(prompt)[:2]]
+    if len(dates) < 2:
+        dates = [date.today() - timedelta(days=7), date.today() + timedelta(days=7)]
+    start, end = min(dates), max(dates)
+    span = max(0, (end - start).days)
+    m = re.search(r"카테고리 한정:\s*(.+)", prompt)
+    scope = m.group(1) if m else prompt
+    cats = [c for c in _CATS if c in scope] or _CATS
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for cat in cats:
+        n = rng.randint(1, 3)
+        out[cat] = [_fake_event(rng, cat, start + timedelta(days=rng.randint(0, span)), i) for i in range(1, n + 1)]
+    return out
+
+def _fake_card(rng: random.Random, i: int, evs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ev = rng.choice(evs) if evs else {"category": "WorldDays", "name": "세계 고양이의 날", "date": None}
+    return {
+        "id": f"card_{i}",
+        "title": f"[{ev['name']}] 아이디어 {i}",
+        "image_concept": "자연광이 드는 거실, 제품을 중심으로 한 45도 구도, 따뜻한 파스텔 톤. " * rng.randint(1, 3),
+        "copy_draft_ko": f"{ev['name']}에 딱 맞는 순간! 지금 확인해보세요 #로컬이벤트 #{i}",
+        "copy_draft_local": f"Perfect moment for {ev['name']}! #local #{i}",
+        "recommended_channels": rng.sample(["Instagram", "Facebook", "X(Twitter)"], k=rng.randint(1, 3)),
+        "fit_goals": ["Engagement 생성(CTA)"],
+        "targeted_events": [{"category": ev.get("category", "WorldDays"), "name": ev["name"],
+                             "date": ev.get("date"), "note": ""}],
+        "rationale": "이벤트 인사이트와 제품 USP 연결(가짜 데이터)",
+        "expected_impact": "도달/ER 향상",
+        "specific_entities": [ev["name"]],
+        "specificity_confidence": round(rng.uniform(0.3, 0.9), 2),
+        "confidence": 0.0,
+    }
+
+def _events_in_prompt(prompt: str) -> List[Dict[str, Any]]:
+    evs: List[Dict[str, Any]] = []
+    for m in re.finditer(r'"name":\s*"([^"]+)"', prompt):
+        evs.append({"name": m.group(1)})
+    cats = re.findall(r'"category":\s*"([^"]+)"', prompt)
+    dates = re.findall(r'"date":\s*"?([0-9-]{10}|null)"?', prompt)
+    for i, e in enumerate(evs):
+        e["category"] = cats[i] if i < len(cats) and cats[i] in _CATS else "WorldDays"
+        e["date"] = dates[i] if i < len(dates) and dates[i] != "null" else None
+    return [e for e in evs if not e["name"].startswith("string")]
+
+def _fake_cards(rng: random.Random, prompt: str) -> Any:
+    m = re.search(r"정확히\s*(\d+)\s*개", prompt)
+    n = int(m.group(1)) if m else 6
+    evs = _events_in_prompt(prompt)
+    return [_fake_card(rng, i, evs) for i in range(1, n + 1)]
+
+def _fake_refine(rng: random.Random, prompt: str) -> Any:
+    card = _fake_card(rng, 1, _events_in_prompt(prompt))
+    m = re.search(r'"id":\s*"([^"]+)"', prompt)
+    if m: card["id"] = m.group(1)
+    card["title"] += " (수정)"
+    return card
+
+def _fake_year(rng: random.Random, prompt: str) -> Any:
+    m = re.search(r"연도:\s*(\d{4})", prompt)
+    year = int(m.group(1)) if m else date.today().year
+    out = []
+    for month in range(1, 13):
+        for i in range(rng.randint(6, 12)):
+            d = date(year, month, rng.randint(1, 28))
+            out.append(_fake_event(rng, rng.choice(_CATS), d, month * 100 + i))
+    return out
+
+def _fake_captions(rng: random.Random, prompt: str) -> Any:
+    try:
+        cards = json.loads(prompt[prompt.index("[카드]") + len("[카드]"):].strip())
+    except Exception:
+        return []
+    local = "[현지어] 없음" not in prompt
+    out = []
+    for c in cards:
+        variants = []
+        for ch in c.get("channels") or ["Instagram"]:
+            n = {"X(Twitter)": 1, "Facebook": 2}.get(ch, 4)
+            body = " ".join([f"{c.get('title', '')} — {ch} 버전."] + ["지금 참여하고 혜택을 받아보세요."] * n)
+            variants.append({"channel": ch, "caption_ko": body, "caption_local": f"[local] {body}" if local else "",
+                             "hashtags": [f"tag{i}" for i in range(rng.randint(1, 8))]})
+        out.append({"card_id": c.get("card_id", ""), "variants": variants})
+    return out
+
+def fake_output_for_prompt(prompt: str, rng: random.Random, json_mode: bool = False) -> str:
+    if "연간 마케팅 캘린더" in prompt:
+        data = _fake_year(rng, prompt)
+    elif "플랫폼별 캡션" in prompt:
+        data = _fake_captions(rng, prompt)
+    elif "아이디어 디렉터" in prompt:
+        data = _fake_refine(rng, prompt)
+    elif "아이디어 카드" in prompt:
+        data = _fake_cards(rng, prompt)
+    else:
+        data = _fake_research(rng, prompt)
+        if json_mode:   # 응답 스키마(이벤트 배열) 모드에서는 평탄화된 배열
+            data = [e for arr in data.values() for e in arr]
+    return json.dumps(data, ensure_ascii=False)
+
+# ===============================
+# 클라이언트
+# ===============================
+class FakeModels:
+    def __init__(self, owner: "FakeClient"):
+        self._owner = owner
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> TextResponse:
+        return self._owner._generate(model, contents, config)
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[TextResponse]:
+        return self._owner._generate_stream(model, contents, config)
+
+class FakeClient:
+    """genai.Client 대용. latency_scale=0 이면 sleep 없이 즉시 응답."""
+
+    def __init__(self, profiles: Optional[Dict[str, LatencyProfile]] = None,
+                 latency_scale: float = 1.0, seed: Optional[int] = None):
+        self.profiles = dict(LATENCY_PROFILES if profiles is None else profiles)
+        self.latency_scale = latency_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.models = FakeModels(self)
+
+    def _child_rng(self) -> random.Random:
+        with self._lock:
+            self.calls += 1
+            return random.Random(self._rng.random())
+
+    def sample_latency(self, model: str, out_tokens: int, rng: random.Random, in_tokens: int = 0) -> float:
+        p = self.profiles.get(model, DEFAULT_PROFILE)
+        base = p.ttft_s + in_tokens / max(1.0, p.prefill_tokens_per_s) + out_tokens / max(1.0, p.tokens_per_s)
+        return base * math.exp(rng.gauss(0.0, p.sigma)) * self.latency_scale
+
+    def _prepare(self, model: str, contents: Any, config: Any) -> Tuple[str, UsageMetadata, float, float, random.Random]:
+        """(출력 텍스트, 사용량, 전체 지연, 첫 토큰 지연, rng)"""
+        rng = self._child_rng()
+        body = contents if isinstance(contents, str) else json.dumps(contents, ensure_ascii=False, default=str)
+        system = str(getattr(config, "system_instruction", "") or "")
+        prompt = f"{system}\n\n{body}" if system else body
+        text = fake_output_for_prompt(prompt, rng, json_mode=getattr(config, "response_schema", None) is not None)
+        cap = getattr(config, "max_output_tokens", None)
+        if cap and _approx_tokens(text) > cap:
+            text = text[:cap * 4]   # 출력 상한 도달(실제 API 처럼 JSON 이 중간에 끊김)
+        out_tokens = _approx_tokens(text)
+        in_tokens = _approx_tokens(prompt)
+        delay = self.sample_latency(model, out_tokens, rng, in_tokens=in_tokens)
+        p = self.profiles.get(model, DEFAULT_PROFILE)
+        base = p.ttft_s + in_tokens / max(1.0, p.prefill_tokens_per_s) + out_tokens / max(1.0, p.tokens_per_s)
+        first = delay * (base - out_tokens / max(1.0, p.tokens_per_s)) / base if base > 0 else 0.0
+        usage = UsageMetadata(in_tokens, out_tokens, in_tokens + out_tokens)
+        return text, usage, delay, first, rng
+
+    def _maybe_fail(self, model: str, rng: random.Random):
+        p = self.profiles.get(model, DEFAULT_PROFILE)
+        if p.error_rate and rng.random() < p.error_rate:
+            raise RuntimeError(f"fake {model}: 503 UNAVAILABLE")
+
+    def _generate(self, model: str, contents: Any, config: Any) -> TextResponse:
+        text, usage, delay, _, rng = self._prepare(model, contents, config)
+        if delay > 0:
+            time.sleep(delay)
+        self._maybe_fail(model, rng)
+        return TextResponse(text=text, usage_metadata=usage, model_version=model)
+
+    def _generate_stream(self, model: str, contents: Any, config: Any,
+                         chunk_chars: int = 200) -> Iterator[TextResponse]:
+        """첫 토큰 지연 후 chunk_chars 단위로 나눠 전달. 사용량은 마지막 청크에만(실제 API 와 같음)."""
+        text, usage, delay, first, rng = self._prepare(model, contents, config)
+        if first > 0:
+            time.sleep(first)
+        self._maybe_fail(model, rng)
+        parts = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+        per = (delay - first) / len(parts)
+        for i, part in enumerate(parts):
+            if per > 0:
+                time.sleep(per)
+            yield TextResponse(text=part, usage_metadata=usage if i == len(parts) - 1 else None, model_version=model)
+
+def client_from_env() -> FakeClient:
+    scale = float(os.environ.get("IDEAMAKER_FAKE_LATENCY_SCALE", "1.0") or 1.0)
+    seed = os.environ.get("IDEAMAKER_FAKE_SEED")
+    return FakeClient(latency_scale=scale, seed=int(seed) if seed else None)
@@ -0,0 +1,191 @@
+# llm_router.py
+# -----------------------------------------------------------------------------
+# 파이프라인 단계별 모델 라우팅 (research / sweep / cards / refine / captions / year)
+#   - 단계마다 라우트 목록(모델, thinking 예산, 최대 출력 토큰)과 지연 SLO 설정
+#   - 라우트별 관측 지연/오류율/비용 집계
+#   - 최근 p95 가 SLO 를 넘거나 오류율이 높으면 cooldown 동안 강등 → 다음 라우트로 폴백
+# -----------------------------------------------------------------------------
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# USD / 1M tokens (입력, 출력)
+MODEL_PRICES_PER_M: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash":      (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro":        (1.25, 10.00),
+}
+CACHED_INPUT_PRICE_RATIO = 0.25   # 캐시 적중 입력 토큰 과금 비율
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    thinking_budget: Optional[int] = 0        # 0=끔, None=모델 기본값
+    max_output_tokens: Optional[int] = None
+
+@dataclass
+class StageConfig:
+    slo_p95_s: float
+    routes: List[Route]
+
+DEFAULT_STAGES: Dict[str, StageConfig] = {
+    "research": StageConfig(slo_p95_s=12.0, routes=[
+        Route("gemini-2.5-flash", 0, 4096),
+        Route("gemini-2.5-flash-lite", 0, 4096),
+    ]),
+    "sweep": StageConfig(slo_p95_s=40.0, routes=[    # 기간 캠페인: 기간 전체 리서치 1회(출력이 김)
+        Route("gemini-2.5-flash", 0, 16384),
+        Route("gemini-2.5-flash-lite", 0, 16384),
+    ]),
+    "cards": StageConfig(slo_p95_s=25.0, routes=[
+        Route("gemini-2.5-flash", 0, 8192),
+        Route("gemini-2.5-flash-lite", 0, 8192),
+    ]),
+    "refine": StageConfig(slo_p95_s=8.0, routes=[
+        Route("gemini-2.5-flash", 0, 2048),
+        Route("gemini-2.5-flash-lite", 0, 2048),
+    ]),
+    "captions": StageConfig(slo_p95_s=20.0, routes=[
+        Route("gemini-2.5-flash", 0, 8192),
+        Route("gemini-2.5-flash-lite", 0, 8192),
+    ]),
+    "year": StageConfig(slo_p95_s=60.0, routes=[
+        Route("gemini-2.5-flash", 0, 16384),
+        Route("gemini-2.5-flash-lite", 0, 16384),
+    ]),
+}
+
+def load_stage_config(path: Optional[str]) -> Dict[str, StageConfig]:
+    """JSON 파일로 단계 설정 덮어쓰기. 형식:
+    {"cards": {"slo_p95_s": 20, "routes": [{"model": "...", "thinking_budget": 0, "max_output_tokens": 8192}]}}
+    """
+    stages = dict(DEFAULT_STAGES)
+    if not path:
+        return stages
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except Exception:
+        return stages
+    for name, cfg in (raw or {}).items():
+        try:
+            routes = [Route(**r) for r in cfg["routes"]]
+            if routes:
+                stages[name] = StageConfig(slo_p95_s=float(cfg.get("slo_p95_s", 30.0)), routes=routes)
+        except Exception:
+            continue
+    return stages
+
+# ===============================
+# 라우트 통계
+# ===============================
+def _p95(xs) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))] if xs else 0.0
+
+@dataclass
+class RouteStats:
+    window: int = 20
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+    calls: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    demoted_until: float = 0.0
+    demoted_p95: float = 0.0         # 강등 시점 p95 — 창을 비운 뒤에도 순서 결정에 사용
+
+    def add(self, latency_s: float, ok: bool):
+        self.calls += 1
+        if not ok: self.errors += 1
+        self.latencies.append(latency_s); self.outcomes.append(ok)
+        while len(self.latencies) > self.window: self.latencies.popleft()
+        while len(self.outcomes) > self.window: self.outcomes.popleft()
+
+    @property
+    def p95(self) -> float:
+        return _p95(self.latencies)
+
+    @property
+    def rank_p95(self) -> float:
+        """강등 라우트 정렬 키: 강등 후 새 관측이 강등 시점보다 좋아도 그 값 아래로는 내려가지 않음."""
+        return max(self.p95, self.demoted_p95)
+
+    @property
+    def error_rate(self) -> float:
+        return (1.0 - sum(self.outcomes) / len(self.outcomes)) if self.outcomes else 0.0
+
+# ===============================
+# 라우터
+# ===============================
+class ModelRouter:
+    def __init__(self, stages: Optional[Dict[str, StageConfig]] = None, window: int = 20,
+                 min_samples: int = 5, max_error_rate: float = 0.3, cooldown_s: float = 120.0,
+                 clock=time.monotonic):
+        self.stages = stages if stages is not None else dict(DEFAULT_STAGES)
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, Route], RouteStats] = {}
+
+    def _get(self, stage: str, route: Route) -> RouteStats:
+        key = (stage, route)
+        if key not in self._stats:
+            self._stats[key] = RouteStats(window=self.window)
+        return self._stats[key]
+
+    def plan(self, stage: str, default_model: str = "gemini-2.5-flash") -> List[Route]:
+        """시도 순서대로 라우트 반환. 강등되지 않은 라우트 우선(설정 순서), 강등 라우트는 강등 시점 p95 낮은 순."""
+        cfg = self.stages.get(stage)
+        if not cfg:
+            return [Route(default_model)]
+        now = self._clock()
+        with self._lock:
+            healthy = [r for r in cfg.routes if self._get(stage, r).demoted_until <= now]
+            demoted = sorted((r for r in cfg.routes if r not in healthy), key=lambda r: self._get(stage, r).rank_p95)
+        return healthy + demoted
+
+    def record(self, stage: str, route: Route, latency_s: float, ok: bool, usage: Any = None):
+        cfg = self.stages.get(stage)
+        with self._lock:
+            st_ = self._get(stage, route)
+            st_.add(latency_s, ok)
+            if usage is not None:
+                tin = int(getattr(usage, "prompt_token_count", 0) or 0)
+                tout = int(getattr(usage, "candidates_token_count", 0) or 0) + int(getattr(usage, "thoughts_token_count", 0) or 0)
+                tcached = min(tin, int(getattr(usage, "cached_content_token_count", 0) or 0))
+                st_.input_tokens += tin; st_.output_tokens += tout; st_.cached_tokens += tcached
+                pin, pout = MODEL_PRICES_PER_M.get(route.model, (0.0, 0.0))
+                st_.cost_usd += ((tin - tcached) * pin + tcached * pin * CACHED_INPUT_PRICE_RATIO + tout * pout) / 1e6
+            if cfg and len(st_.latencies) >= self.min_samples:
+                if st_.p95 > cfg.slo_p95_s or st_.error_rate > self.max_error_rate:
+                    st_.demoted_until = self._clock() + self.cooldown_s
+                    # 강등 후 복귀 시 예전 관측값에 다시 끌려가지 않도록 창 초기화(정렬용 p95 만 보존, 오류 강등은 최후순위)
+                    st_.demoted_p95 = st_.p95 if st_.error_rate <= self.max_error_rate else float("inf")
+                    st_.latencies.clear(); st_.outcomes.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        now = self._clock()
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for (stage, route), s in self._stats.items():
+                out.setdefault(stage, []).append({
+                    **asdict(route),
+                    "calls": s.calls, "errors": s.errors,
+                    "p95_s": round(s.p95, 3), "error_rate": round(s.error_rate, 3),
+                    "input_tokens": s.input_tokens, "output_tokens": s.output_tokens,
+                    "cached_tokens": s.cached_tokens,
+                    "cost_usd": round(s.cost_usd, 6),
+                    "demoted": s.demoted_until > now,
+                    "demoted_p95_s": round(s.demoted_p95, 3) if s.demoted_p95 != float("inf") else None,
+                })
+        return out
@@ -0,0 +1,255 @@
+# llm_scheduler.py
+# -----------------------------------------------------------------------------
+# Gemini 호출 전역 수락 제어 (프로세스 공유 클라이언트 앞단)
+#   - 토큰 버킷: 분당 요청 한도(쿼터) + 순간 버스트
+#   - 동시 실행 상한(in-flight)
+#   - 우선순위 등급: 대화형(refine/cards) > 리서치 > 대량(연간 캘린더/배치/워머)
+#   - 등급 안에서는 사용자별 공정 큐잉(start-time fair queuing; 단계별 비용 가중)
+#   - 대기 순번 콜백(st.status 표시용) + 단계별 대기 시간 지표
+# 호출자 정보(사용자/등급/콜백)는 contextvars 로 전달 — 함수 시그니처를 넓히지 않음.
+# -----------------------------------------------------------------------------
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# 단계 → (우선순위 등급[작을수록 먼저], 비용 가중)
+INTERACTIVE, RESEARCH, BULK, BACKGROUND = 0, 1, 2, 3
+PRIORITY_NAMES = {INTERACTIVE: "interactive", RESEARCH: "research", BULK: "bulk", BACKGROUND: "background"}
+DEFAULT_STAGE_CLASSES: Dict[str, Tuple[int, float]] = {
+    "refine":   (INTERACTIVE, 1.0),
+    "cards":    (INTERACTIVE, 1.0),
+    "captions": (INTERACTIVE, 2.0),   # 카드 전체를 한 번에 처리
+    "research": (RESEARCH, 1.0),
+    "sweep":    (RESEARCH, 3.0),   # 기간 캠페인 리서치(기간 전체 1회)
+    "year":     (BULK, 4.0),      # 출력이 길어 슬롯을 오래 점유
+}
+
+# 호출 컨텍스트
+admission_user: contextvars.ContextVar[str] = contextvars.ContextVar("admission_user", default="anon")
+admission_priority: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("admission_priority", default=None)
+admission_listener: contextvars.ContextVar[Optional[Callable[[int, float], None]]] = \
+    contextvars.ContextVar("admission_listener", default=None)
+
+@contextmanager
+def admission(user: Optional[str] = None, priority: Optional[int] = None,
+              listener: Optional[Callable[[int, float], None]] = None):
+    """이 블록 안의 호출에 사용자/등급 강제/대기 콜백(position, waited_s)을 지정."""
+    tokens = []
+    if user is not None: tokens.append((admission_user, admission_user.set(user)))
+    if priority is not None: tokens.append((admission_priority, admission_priority.set(priority)))
+    if listener is not None: tokens.append((admission_listener, admission_listener.set(listener)))
+    try:
+        yield
+    finally:
+        for var, tok in reversed(tokens):
+            var.reset(tok)
+
+class AdmissionTimeout(RuntimeError):
+    pass
+
+# ===============================
+# 토큰 버킷
+# ===============================
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: float, clock=time.monotonic):
+        self.rate = rate_per_s
+        self.capacity = max(1.0, burst)
+        self._clock = clock
+        self.tokens = self.capacity
+        self._t = clock()
+
+    def try_take(self) -> float:
+        """토큰 1개 소비 시 0, 부족하면 다음 토큰까지 남은 초. rate<=0 은 무제한."""
+        if self.rate <= 0: return 0.0
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+# ===============================
+# 스케줄러
+# ===============================
+@dataclass
+class _Ticket:
+    user: str
+    stage: str
+    priority: int
+    tag: float
+    seq: int
+    enqueued_at: float
+
+    @property
+    def order(self) -> Tuple[int, float, int]:
+        return (self.priority, self.tag, self.seq)
+
+@dataclass
+class _StageWaits:
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=500))
+    admitted: int = 0
+    timeouts: int = 0
+
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] if xs else 0.0
+
+class AdmissionScheduler:
+    def __init__(self, rpm: float = 300.0, burst: float = 20.0, max_inflight: int = 8,
+                 stage_classes: Optional[Dict[str, Tuple[int, float]]] = None,
+                 default_timeout_s: float = 120.0, clock=time.monotonic):
+        self.rpm = rpm
+        self.max_inflight = max(1, max_inflight)
+        self.stage_classes = stage_classes if stage_classes is not None else dict(DEFAULT_STAGE_CLASSES)
+        self.default_timeout_s = default_timeout_s
+        self._clock = clock
+        self._bucket = TokenBucket(rpm / 60.0, burst, clock=clock)
+        self._cond = threading.Condition()
+        self._queue: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._vtime = 0.0                          # 마지막으로 수락된 티켓의 시작 태그
+        self._finish: Dict[Tuple[int, str], float] = {}   # (등급, 사용자) → 다음 시작 태그
+        self._inflight = 0
+        self._inflight_by_user: Dict[str, int] = {}
+        self._waits: Dict[str, _StageWaits] = {}
+        self.rate_limited = 0                      # 버킷 때문에 기다린 횟수
+
+    @classmethod
+    def from_env(cls) -> "AdmissionScheduler":
+        return cls(
+            rpm=float(os.environ.get("IDEAMAKER_RPM", "300")),
+            burst=float(os.environ.get("IDEAMAKER_BURST", "20")),
+            max_inflight=int(os.environ.get("IDEAMAKER_MAX_INFLIGHT", "8")),
+            default_timeout_s=float(os.environ.get("IDEAMAKER_QUEUE_TIMEOUT", "120")),
+        )
+
+    def _enqueue(self, user: str, stage: str, priority: int, cost: float) -> _Ticket:
+        start = max(self._vtime, self._finish.get((priority, user), 0.0))
+        self._finish[(priority, user)] = start + cost
+        t = _Ticket(user, stage, priority, start, next(self._seq), self._clock())
+        self._queue.append(t)
+        return t
+
+    def _position(self, t: _Ticket) -> int:
+        """1 = 다음 차례."""
+        return 1 + sum(1 for o in self._queue if o.order < t.order)
+
+    def _prune_finish(self):
+        # 대기 티켓이 없고 태그가 가상 시각 이하인 항목은 없는 것과 같음(max(_vtime, 태그) = _vtime)
+        # → 지나간 사용자를 지워 사용자 수만큼 계속 자라지 않게.
+        # 유휴(대기·실행 없음)가 되면 바쁜 구간 종료: 가상 시각을 최대 종료 태그로(SFQ 표준) → 전부 정리
+        if not self._queue and not self._inflight:
+            self._vtime = max(self._vtime, max(self._finish.values(), default=0.0))
+        queued = {(q.priority, q.user) for q in self._queue}
+        for k in [k for k, tag in self._finish.items() if tag <= self._vtime and k not in queued]:
+            del self._finish[k]
+
+    def _try_admit(self, t: _Ticket) -> float:
+        """수락되면 0, 아니면 다시 확인할 때까지의 대기 초."""
+        if self._position(t) != 1 or self._inflight >= self.max_inflight:
+            return 0.5
+        wait = self._bucket.try_take()
+        if wait > 0:
+            self.rate_limited += 1
+            return wait
+        self._queue.remove(t)
+        self._vtime = max(self._vtime, t.tag)
+        self._prune_finish()
+        self._inflight += 1
+        self._inflight_by_user[t.user] = self._inflight_by_user.get(t.user, 0) + 1
+        return 0.0
+
+    @contextmanager
+    def slot(self, stage: str, user: Optional[str] = None, priority: Optional[int] = None,
+             timeout_s: Optional[float] = None):
+        """수락될 때까지 대기 후 블록 실행. 시간 초과 시 AdmissionTimeout."""
+        user = user or admission_user.get()
+        cls_prio, cost = self.stage_classes.get(stage or "", (BULK, 1.0))
+        prio = priority if priority is not None else admission_priority.get()
+        prio = cls_prio if prio is None else max(cls_prio, prio)   # 강제 등급은 낮추기만
+        listener = admission_listener.get()
+        timeout_s = self.default_timeout_s if timeout_s is None else timeout_s
+
+        with self._cond:
+            t = self._enqueue(user, stage, prio, cost)
+            self._cond.notify_all()
+        last_pos = None
+        while True:
+            with self._cond:
+                wait = self._try_admit(t)
+                if wait == 0.0:
+                    break
+                waited = self._clock() - t.enqueued_at
+                if waited >= timeout_s:
+                    self._queue.remove(t)
+                    self._prune_finish()
+                    self._stage_waits(stage).timeouts += 1
+                    self._cond.notify_all()
+                    raise AdmissionTimeout(f"{waited:.0f}초 대기 후에도 차례가 오지 않았습니다.")
+                pos = self._position(t)
+                self._cond.wait(min(wait, 0.5, timeout_s - waited))
+            if listener and pos != last_pos:
+                last_pos = pos
+                try: listener(pos, waited)
+                except Exception: pass
+
+        waited = self._clock() - t.enqueued_at
+        if listener and last_pos is not None:
+            try: listener(0, waited)   # 0 = 대기 종료(실행 시작)
+            except Exception: pass
+        with self._cond:
+            sw = self._stage_waits(stage)
+            sw.waits.append(waited); sw.admitted += 1
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._release(t)
+                self._cond.notify_all()
+
+    def _release(self, t: _Ticket):
+        self._inflight -= 1
+        self._inflight_by_user[t.user] -= 1
+        if not self._inflight_by_user[t.user]: del self._inflight_by_user[t.user]
+        self._prune_finish()
+
+    def _stage_waits(self, stage: str) -> _StageWaits:
+        return self._waits.setdefault(stage or "-", _StageWaits())
+
+    def queue_status(self, user: Optional[str] = None) -> Dict[str, Any]:
+        """사용자 관점 대기 상태: 가장 앞선 내 요청의 순번(없으면 0)."""
+        user = user or admission_user.get()
+        with self._cond:
+            mine = [t for t in self._queue if t.user == user]
+            pos = min((self._position(t) for t in mine), default=0)
+            waited = max((self._clock() - t.enqueued_at for t in mine), default=0.0)
+            return {"position": pos, "queued": len(mine), "waited_s": waited,
+                    "inflight": self._inflight_by_user.get(user, 0)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._cond:
+            by_prio: Dict[str, int] = {}
+            for t in self._queue:
+                k = PRIORITY_NAMES.get(t.priority, str(t.priority))
+                by_prio[k] = by_prio.get(k, 0) + 1
+            return {
+                "rpm": self.rpm, "max_inflight": self.max_inflight,
+                "inflight": self._inflight, "queued": len(self._queue), "queued_by_class": by_prio,
+                "oldest_wait_s": round(max((now - t.enqueued_at for t in self._queue), default=0.0), 3),
+                "rate_limited": self.rate_limited,
+                "wait_by_stage": {
+                    s: {"admitted": w.admitted, "timeouts": w.timeouts,
+                        "p50_s": round(_pct(list(w.waits), 0.50), 3), "p95_s": round(_pct(list(w.waits), 0.95), 3),
+                        "max_s": round(max(w.waits, default=0.0), 3)}
+                    for s, w in self._waits.items()
+                },
+            }
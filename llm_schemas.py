@@ -0,0 +1,355 @@
+# llm_schemas.py
+# -----------------------------------------------------------------------------
+# 이벤트/아이디어 카드 스키마 — 단일 정의에서
+#   1) Gemini 응답 스키마(JSON 모드 response_schema) 생성
+#   2) 로컬 검증기(pydantic-core, 타입 강제 변환) — 불량 항목은 개별 제외
+# -----------------------------------------------------------------------------
+
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+EVENT_CATEGORIES = [
+    "Commercial", "Cultural", "PublicHoliday", "WeatherEnv",
+    "School", "Religion", "MediaEnt", "Sports", "Gimmick", "WorldDays"
+]
+CHANNELS = ["Instagram", "Facebook", "X(Twitter)"]   # 축소
+
+EventCategory = Literal[
+    "Commercial", "Cultural", "PublicHoliday", "WeatherEnv",
+    "School", "Religion", "MediaEnt", "Sports", "Gimmick", "WorldDays"
+]
+Channel = Literal["Instagram", "Facebook", "X(Twitter)"]
+
+_CAT_BY_LOWER = {c.lower(): c for c in EVENT_CATEGORIES}
+_CHANNEL_ALIASES = {
+    "instagram": "Instagram", "ig": "Instagram", "인스타그램": "Instagram",
+    "facebook": "Facebook", "fb": "Facebook", "페이스북": "Facebook",
+    "x": "X(Twitter)", "twitter": "X(Twitter)", "x(twitter)": "X(Twitter)", "x (twitter)": "X(Twitter)", "트위터": "X(Twitter)",
+}
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d")
+
+# 플랫폼별 캡션 규칙 (본문 + 해시태그 합산 글자 수)
+#   weighted: X 가중 길이 — 라틴/기본 기호 1, 그 외(한글·한자·가나·이모지 등) 2, URL 은 길이와 무관하게 23
+PLATFORM_RULES: Dict[str, Dict[str, Any]] = {
+    "Instagram":  {"max_chars": 2200, "max_hashtags": 10, "style": "첫 줄 훅 + 줄바꿈 본문 + 해시태그 5~10개를 끝에 모아서"},
+    "Facebook":   {"max_chars": 500,  "max_hashtags": 3,  "style": "대화체 2~4문장 + 링크/CTA, 해시태그 0~3개"},
+    "X(Twitter)": {"max_chars": 280,  "max_hashtags": 2,  "weighted": True,
+                   "style": "한 문장 훅 + CTA, 해시태그 1~2개, 가중 280자 이내(한글·이모지 2자, URL 23자) → 한글 약 130자"},
+}
+
+# ===============================
+# 캡션 길이 (X 가중 길이)
+# ===============================
+_URL_RE = re.compile(r"https?://\S+", re.IGNORECASE)
+_X_URL_WEIGHT = 23
+_X_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))   # 가중치 1 구간
+
+def _x_char_weight(ch: str) -> int:
+    cp = ord(ch)
+    return 1 if any(lo <= cp <= hi for lo, hi in _X_LIGHT_RANGES) else 2
+
+def _length_units(text: str, weighted: bool) -> Iterable[Tuple[str, int]]:
+    """(조각, 길이) — URL 은 한 조각(자르지 않음), 나머지는 글자 단위."""
+    pos = 0
+    for m in _URL_RE.finditer(text) if weighted else ():
+        for ch in text[pos:m.start()]: yield ch, _x_char_weight(ch)
+        yield m.group(0), _X_URL_WEIGHT
+        pos = m.end()
+    for ch in text[pos:]:
+        yield ch, _x_char_weight(ch) if weighted else 1
+
+def caption_len(text: str, channel: str) -> int:
+    """플랫폼 기준 캡션 길이 (X 는 가중 길이, 그 외 글자 수)."""
+    return sum(n for _, n in _length_units(text or "", PLATFORM_RULES.get(channel, {}).get("weighted", False)))
+
+def _clip(text: str, room: int, weighted: bool) -> str:
+    out: List[str] = []; used = 0
+    for piece, n in _length_units(text, weighted):
+        if used + n > room: break
+        out.append(piece); used += n
+    return "".join(out)
+
+# ===============================
+# 강제 변환 헬퍼
+# ===============================
+def _coerce_date(v: Any) -> Optional[str]:
+    if v is None: return None
+    if isinstance(v, datetime): return v.date().isoformat()
+    if isinstance(v, date): return v.isoformat()
+    s = str(v).strip()
+    if s.lower() in {"", "null", "none", "n/a", "tbd"}: return None
+    for fmt in _DATE_FORMATS:
+        try: return datetime.strptime(s[:10], fmt).date().isoformat()
+        except ValueError: pass
+    raise ValueError(f"invalid date: {s!r}")
+
+def _coerce_unit(v: Any) -> float:
+    if v is None or v == "": return 0.0
+    if isinstance(v, str):
+        s = v.strip()
+        pct = s.endswith("%")
+        x = float(s.rstrip("%"))
+        if pct: x /= 100.0
+    else:
+        x = float(v)
+    if 1.0 < x <= 100.0: x /= 100.0
+    return max(0.0, min(1.0, x))
+
+def _coerce_str_list(v: Any) -> List[str]:
+    if v is None: return []
+    if isinstance(v, str): return [p.strip() for p in v.split(",") if p.strip()]
+    return [str(x) for x in v if x is not None and str(x).strip()]
+
+def _coerce_category(v: Any) -> Any:
+    return _CAT_BY_LOWER.get(str(v or "").strip().lower(), v)
+
+# ===============================
+# 모델
+# ===============================
+class _Base(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+class Event(_Base):
+    category: EventCategory
+    name: str = Field(min_length=1)
+    date: Optional[str] = Field(default=None, description="YYYY-MM-DD 또는 null")
+    note: str = Field(default="", description="why relevant (1-2 lines; 명절은 '연휴 시작~끝' 포함 권장)")
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+    specific_confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+    sources: List[str] = Field(default_factory=list, description="간단 키워드 또는 URL")
+
+    _cat = field_validator("category", mode="before")(_coerce_category)
+    _date = field_validator("date", mode="before")(_coerce_date)
+    _unit = field_validator("confidence", "specific_confidence", mode="before")(_coerce_unit)
+    _src = field_validator("sources", mode="before")(_coerce_str_list)
+
+    @field_validator("note", mode="before")
+    @classmethod
+    def _none_to_empty(cls, v):
+        return "" if v is None else v
+
+class TargetedEvent(_Base):
+    category: EventCategory
+    name: str = Field(min_length=1)
+    date: Optional[str] = Field(default=None, description="YYYY-MM-DD 또는 null")
+    note: str = ""
+
+    _cat = field_validator("category", mode="before")(_coerce_category)
+    _date = field_validator("date", mode="before")(_coerce_date)
+
+    @field_validator("note", mode="before")
+    @classmethod
+    def _none_to_empty(cls, v):
+        return "" if v is None else v
+
+class IdeaCard(_Base):
+    id: str = ""
+    title: str = Field(min_length=1)
+    image_concept: str = Field(description="개념적·구체; 텍스트만(구도/피사체/소품/라이팅/색감)")
+    copy_draft_ko: str = Field(default="", description="한국어 캡션")
+    copy_draft_local: str = Field(default="", description="현지어 캡션; 나라가 한국이면 생략 가능")
+    recommended_channels: List[Channel] = Field(default_factory=list)
+    fit_goals: List[str] = Field(default_factory=list)
+    targeted_events: List[TargetedEvent] = Field(default_factory=list)
+    rationale: str = Field(default="", description="이벤트 적합 이유; 구체요소 포함")
+    expected_impact: str = ""
+    specific_entities: List[str] = Field(default_factory=list, description="구체명")
+    specificity_confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+
+    _unit = field_validator("specificity_confidence", "confidence", mode="before")(_coerce_unit)
+    _lists = field_validator("fit_goals", "specific_entities", mode="before")(_coerce_str_list)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _legacy_copy_draft(cls, v):
+        # 구형 copy_draft → copy_draft_ko
+        if isinstance(v, dict) and not v.get("copy_draft_ko") and v.get("copy_draft"):
+            v = {**v, "copy_draft_ko": v["copy_draft"]}
+        return v
+
+    @field_validator("id", "copy_draft_ko", "copy_draft_local", "rationale", "expected_impact", mode="before")
+    @classmethod
+    def _str_or_empty(cls, v):
+        return "" if v is None else str(v)
+
+    @field_validator("recommended_channels", mode="before")
+    @classmethod
+    def _channels(cls, v):
+        out = []
+        for x in _coerce_str_list(v):
+            ch = _CHANNEL_ALIASES.get(x.strip().lower(), x)
+            if ch in CHANNELS and ch not in out: out.append(ch)
+        return out
+
+    @field_validator("targeted_events", mode="before")
+    @classmethod
+    def _drop_bad_events(cls, v):
+        # 타깃 이벤트 하나가 불량이어도 카드 전체를 버리지 않음
+        return _valid_items(TargetedEvent, v or [])[0]
+
+class CaptionVariant(_Base):
+    channel: Channel
+    caption_ko: str = Field(min_length=1, description="한국어 본문(해시태그 제외)")
+    caption_local: str = Field(default="", description="현지어 본문(해시태그 제외); 한국 대상이면 빈 문자열")
+    hashtags: List[str] = Field(default_factory=list, description="# 없이 단어만")
+
+    @field_validator("channel", mode="before")
+    @classmethod
+    def _channel(cls, v):
+        return _CHANNEL_ALIASES.get(str(v or "").strip().lower(), v)
+
+    @field_validator("caption_local", mode="before")
+    @classmethod
+    def _none_to_empty(cls, v):
+        return "" if v is None else v
+
+    @field_validator("hashtags", mode="before")
+    @classmethod
+    def _tags(cls, v):
+        out = []
+        for t in _coerce_str_list(v if not isinstance(v, str) else v.replace("#", ",").replace(" ", ",")):
+            t = t.strip().lstrip("#").replace(" ", "")
+            if t and t not in out: out.append(t)
+        return out
+
+class CardCaptions(_Base):
+    card_id: str = Field(min_length=1)
+    variants: List[CaptionVariant] = Field(default_factory=list)
+
+    @field_validator("card_id", mode="before")
+    @classmethod
+    def _str(cls, v):
+        return "" if v is None else str(v)
+
+    @field_validator("variants", mode="before")
+    @classmethod
+    def _drop_bad_variants(cls, v):
+        return _valid_items(CaptionVariant, v or [])[0]
+
+# ===============================
+# Gemini 응답 스키마 (OpenAPI 부분집합; default/title 등 미지원 키워드 제거)
+# ===============================
+_KEEP_KEYS = {"type", "description", "enum", "minimum", "maximum", "minLength", "maxLength",
+              "minItems", "maxItems", "nullable"}
+
+def _to_gemini(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _to_gemini(defs[node["$ref"].split("/")[-1]], defs)
+    if "anyOf" in node:
+        opts = [o for o in node["anyOf"] if o.get("type") != "null"]
+        out = _to_gemini(opts[0], defs) if opts else {"type": "string"}
+        if len(opts) < len(node["anyOf"]): out["nullable"] = True
+        if node.get("description"): out["description"] = node["description"]
+        return out
+    out = {k: v for k, v in node.items() if k in _KEEP_KEYS}
+    if "const" in node:
+        out["enum"] = [node["const"]]
+    t = node.get("type")
+    if t == "object":
+        props = node.get("properties", {})
+        out["properties"] = {k: _to_gemini(v, defs) for k, v in props.items()}
+        out["propertyOrdering"] = list(props)
+        if node.get("required"): out["required"] = list(node["required"])
+    elif t == "array" and "items" in node:
+        out["items"] = _to_gemini(node["items"], defs)
+    if "type" in out: out["type"] = out["type"].upper()
+    return out
+
+def gemini_schema(model: Type[BaseModel], as_list: bool = False) -> Dict[str, Any]:
+    js = model.model_json_schema()
+    obj = _to_gemini(js, js.get("$defs", {}))
+    return {"type": "ARRAY", "items": obj} if as_list else obj
+
+EVENT_LIST_SCHEMA = gemini_schema(Event, as_list=True)
+IDEA_CARD_LIST_SCHEMA = gemini_schema(IdeaCard, as_list=True)
+IDEA_CARD_OBJECT_SCHEMA = gemini_schema(IdeaCard)
+CARD_CAPTIONS_LIST_SCHEMA = gemini_schema(CardCaptions, as_list=True)
+# 카드 스키마 필드(허용 목록) — 프롬프트에 카드를 다시 넣을 때 앱 전용 필드(visual_assets/caption_variants 등)는 제외
+IDEA_CARD_FIELDS = tuple(IdeaCard.model_fields)
+
+# ===============================
+# 로컬 검증
+# ===============================
+def _valid_items(model: Type[BaseModel], items: Iterable[Any]) -> Tuple[List[Dict[str, Any]], int]:
+    ok: List[Dict[str, Any]] = []; rejected = 0
+    for it in items:
+        try:
+            ok.append(model.model_validate(it).model_dump())
+        except ValidationError:
+            rejected += 1
+    return ok, rejected
+
+def _raw_event_items(raw: Any) -> List[Any]:
+    # 스키마 모드 응답은 배열. 구형 형태(dict of lists / {"events": [...]} / {"data": ...})도 수용
+    if isinstance(raw, dict) and len(raw) == 1 and next(iter(raw)) in {"data", "result", "payload", "LocalEvents", "events"}:
+        raw = raw[next(iter(raw))]
+    if isinstance(raw, list):
+        return raw
+    if isinstance(raw, dict):
+        items = []
+        for cat, arr in raw.items():
+            if isinstance(arr, list):
+                items.extend({"category": cat, **e} if isinstance(e, dict) and "category" not in e else e for e in arr)
+        return items
+    return []
+
+def validate_events(raw: Any) -> Tuple[List[Dict[str, Any]], int]:
+    """(유효 이벤트 목록, 제외된 항목 수)"""
+    return _valid_items(Event, _raw_event_items(raw))
+
+def validate_cards(raw: Any) -> Tuple[List[Dict[str, Any]], int]:
+    """(유효 카드 목록, 제외된 항목 수). 빈/중복 id 는 card_N 으로 채움(버튼 key 충돌 방지)."""
+    if isinstance(raw, dict):
+        raw = raw.get("cards") or raw.get("ideas") or [raw]
+    cards, rejected = _valid_items(IdeaCard, raw if isinstance(raw, list) else [])
+    seen = set()
+    for i, c in enumerate(cards, 1):
+        if not c["id"] or c["id"] in seen:
+            c["id"] = f"card_{i}"
+            while c["id"] in seen: c["id"] += "_"
+        seen.add(c["id"])
+    return cards, rejected
+
+def validate_card(raw: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(raw, list) and len(raw) == 1: raw = raw[0]
+    ok, _ = _valid_items(IdeaCard, [raw])
+    return ok[0] if ok else None
+
+def fit_caption(body: str, hashtags: List[str], channel: str) -> str:
+    """본문 + 해시태그를 플랫폼 규칙(해시태그 수, 총 길이 — caption_len 기준) 안으로 맞춤.
+    태그는 한도의 1/3 까지, 넘치는 본문은 자름(URL 은 통째로 빼거나 유지)."""
+    rule = PLATFORM_RULES.get(channel, {"max_chars": 2200, "max_hashtags": 10})
+    weighted = rule.get("weighted", False)
+    body = (body or "").strip()
+    tags = [f"#{t}" for t in hashtags[:rule["max_hashtags"]]]
+    sep = "\n\n" if channel == "Instagram" else " "
+    while tags and caption_len(sep + " ".join(tags), channel) > rule["max_chars"] // 3:
+        tags.pop()
+    tail = (sep + " ".join(tags)) if tags else ""
+    room = rule["max_chars"] - caption_len(tail, channel)
+    if caption_len(body, channel) > room:
+        body = _clip(body, max(0, room - caption_len("…", channel)), weighted).rstrip() + "…"
+    return body + tail
+
+def validate_caption_sets(raw: Any, allowed: Dict[str, List[str]]) -> Tuple[Dict[str, Dict[str, Dict[str, str]]], int]:
+    """({card_id: {channel: {"ko", "local"}}}, 제외 수). allowed = {card_id: 허용 채널}; 목록 밖 카드/채널은 제외."""
+    if isinstance(raw, dict):
+        raw = raw.get("cards") or raw.get("captions") or [raw]
+    sets, rejected = _valid_items(CardCaptions, raw if isinstance(raw, list) else [])
+    out: Dict[str, Dict[str, Dict[str, str]]] = {}
+    for cs in sets:
+        chans = allowed.get(cs["card_id"])
+        if chans is None:
+            rejected += 1; continue
+        for v in cs["variants"]:
+            if v["channel"] not in chans:
+                rejected += 1; continue
+            out.setdefault(cs["card_id"], {})[v["channel"]] = {
+                "ko": fit_caption(v["caption_ko"], v["hashtags"], v["channel"]),
+                "local": fit_caption(v["caption_local"], v["hashtags"], v["channel"]) if v["caption_local"] else "",
+            }
+    return out, rejected
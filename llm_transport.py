@@ -0,0 +1,212 @@
+# llm_transport.py
+# -----------------------------------------------------------------------------
+# Gemini 호출 기록/재생 트랜스포트 (get_client 아래에 끼워 넣는 래퍼)
+#   - RecordingClient: 모든 generate_content 요청/응답(프롬프트, 설정, 원문, 지연, 토큰 사용량)을
+#     카세트(JSONL)에 한 줄씩 추가
+#   - ReplayClient: 카세트를 정규화된 프롬프트 해시로 매칭해 오프라인 재생(원래 지연 × 배율)
+#   스트리밍 요청은 청크(첫 요청 기준 도착 시각 + 텍스트)까지 기록 → 재생도 같은 간격의 청크로 전달
+#     (마감 중단 경로를 오프라인에서도 그대로 재현). 소비자가 중간에 끊은 스트림은 partial 로 기록, 재생 제외.
+# -----------------------------------------------------------------------------
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+from llm_types import USAGE_FIELDS, TextResponse, UsageMetadata
+
+_WS_RE = re.compile(r"\s+")
+
+# ===============================
+# 키/직렬화
+# ===============================
+def normalize_prompt(system: Optional[str], contents: Any) -> str:
+    body = contents if isinstance(contents, str) else json.dumps(contents, ensure_ascii=False, sort_keys=True, default=str)
+    return _WS_RE.sub(" ", f"{system or ''}\n{body}").strip()
+
+def prompt_key(system: Optional[str], contents: Any) -> str:
+    return hashlib.sha256(normalize_prompt(system, contents).encode("utf-8")).hexdigest()[:24]
+
+def _dump_config(config: Any) -> Dict[str, Any]:
+    if config is None: return {}
+    try:
+        return config.model_dump(mode="json", exclude_none=True)
+    except Exception:
+        return {"repr": repr(config)}
+
+def _dump_usage(usage: Any) -> Dict[str, int]:
+    return {f: int(getattr(usage, f, 0) or 0) for f in USAGE_FIELDS} if usage is not None else {}
+
+def _system_of(config: Any) -> Optional[str]:
+    return getattr(config, "system_instruction", None)
+
+def _text_of(resp: Any) -> str:
+    try:
+        return getattr(resp, "text", "") or ""
+    except Exception:
+        return ""
+
+class _Models:
+    def __init__(self, fn, stream_fn):
+        self._fn = fn
+        self._stream_fn = stream_fn
+
+    def generate_content(self, model: str, contents: Any, config: Any = None):
+        return self._fn(model, contents, config)
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None):
+        return self._stream_fn(model, contents, config)
+
+# ===============================
+# 기록
+# ===============================
+class RecordingClient:
+    def __init__(self, inner: Any, cassette_path: str):
+        self.inner = inner
+        self.cassette_path = cassette_path
+        self._lock = threading.Lock()
+        self.models = _Models(self._generate, self._stream)
+        self.recorded = 0
+
+    def _write(self, rec: Dict[str, Any]):
+        line = json.dumps(rec, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def _record_head(self, model: str, contents: Any, config: Any) -> Dict[str, Any]:
+        system = _system_of(config)
+        return {
+            "key": prompt_key(system, contents),
+            "model": model,
+            "system_instruction": system,
+            "contents": contents,
+            "config": _dump_config(config),
+            "started_at": time.time(),
+        }
+
+    def _generate(self, model: str, contents: Any, config: Any):
+        rec = self._record_head(model, contents, config)
+        t0 = time.perf_counter()
+        try:
+            resp = self.inner.models.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            rec.update(latency_s=time.perf_counter() - t0, error=str(e))
+            self._write(rec)
+            raise
+        rec.update(latency_s=time.perf_counter() - t0, text=_text_of(resp),
+                   usage=_dump_usage(getattr(resp, "usage_metadata", None)))
+        self._write(rec)
+        return resp
+
+    def _stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        rec = self._record_head(model, contents, config)
+        chunks: List[Dict[str, Any]] = []; usage = None; done = False; stream = None
+        t0 = time.perf_counter()
+        try:
+            stream = self.inner.models.generate_content_stream(model=model, contents=contents, config=config)
+            for chunk in stream:
+                chunks.append({"t": round(time.perf_counter() - t0, 4), "text": _text_of(chunk)})
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield chunk
+            done = True
+        except Exception as e:
+            rec["error"] = str(e)
+            raise
+        finally:   # 정상 종료·오류·소비자 중단(GeneratorExit) 모두 기록
+            close = getattr(stream, "close", None)
+            if close: close()
+            rec.update(latency_s=time.perf_counter() - t0, text="".join(c["text"] for c in chunks),
+                       usage=_dump_usage(usage), chunks=chunks)
+            if not done and "error" not in rec: rec["partial"] = True
+            self._write(rec)
+
+# ===============================
+# 재생
+# ===============================
+class CassetteMiss(RuntimeError):
+    pass
+
+def load_cassette(path: str) -> List[Dict[str, Any]]:
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try: out.append(json.loads(line))
+            except Exception: continue
+    return out
+
+class ReplayClient:
+    """카세트 재생. latency_scale=0 이면 지연 없이, fallback 이 있으면 미스 시 위임."""
+
+    def __init__(self, cassette_path: str, latency_scale: float = 1.0, fallback: Any = None):
+        self.latency_scale = latency_scale
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        for rec in load_cassette(cassette_path):
+            if rec.get("key") and not rec.get("partial"):
+                self._by_key[rec["key"]].append(rec)
+        self.models = _Models(self._generate, self._stream)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _pick(self, key: str, model: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            recs = self._by_key.get(key)
+            if not recs: return None
+            same = [r for r in recs if r.get("model") == model] or recs
+            i = self._cursor[key]; self._cursor[key] += 1
+            return same[i % len(same)]   # 같은 프롬프트 반복 호출은 기록 순서대로 순환
+
+    def _lookup(self, model: str, contents: Any, config: Any) -> Optional[Dict[str, Any]]:
+        key = prompt_key(_system_of(config), contents)
+        rec = self._pick(key, model)
+        with self._lock: self.stats["misses" if rec is None else "hits"] += 1
+        if rec is None and self.fallback is None:
+            raise CassetteMiss(f"cassette miss: {key}")
+        return rec
+
+    def _sleep(self, seconds: float):
+        delay = seconds * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def _usage(rec: Dict[str, Any]) -> UsageMetadata:
+        u = rec.get("usage") or {}
+        return UsageMetadata(**{f: int(u.get(f, 0) or 0) for f in USAGE_FIELDS})
+
+    def _generate(self, model: str, contents: Any, config: Any):
+        rec = self._lookup(model, contents, config)
+        if rec is None:
+            return self.fallback.models.generate_content(model=model, contents=contents, config=config)
+        self._sleep(float(rec.get("latency_s", 0.0) or 0.0))
+        if rec.get("error"):
+            raise RuntimeError(rec["error"])
+        return TextResponse(text=rec.get("text", ""), usage_metadata=self._usage(rec), model_version=rec.get("model", model))
+
+    def _stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        rec = self._lookup(model, contents, config)
+        if rec is None:
+            yield from self.fallback.models.generate_content_stream(model=model, contents=contents, config=config)
+            return
+        # 비스트리밍 기록이면 전체 응답을 마지막에 1청크로. 오류 기록은 받은 청크까지 전달 후 같은 오류
+        chunks = rec.get("chunks")
+        if chunks is None:
+            chunks = [] if rec.get("error") else [{"t": float(rec.get("latency_s", 0.0) or 0.0), "text": rec.get("text", "")}]
+        prev = 0.0
+        for i, c in enumerate(chunks):
+            t = float(c.get("t", 0.0) or 0.0)
+            self._sleep(t - prev); prev = t
+            last = i == len(chunks) - 1 and not rec.get("error")
+            yield TextResponse(text=c.get("text", ""), usage_metadata=self._usage(rec) if last else None,
+                               model_version=rec.get("model", model))
+        if rec.get("error"):
+            self._sleep(float(rec.get("latency_s", 0.0) or 0.0) - prev)
+            raise RuntimeError(rec["error"])
@@ -0,0 +1,25 @@
+# llm_types.py
+# -----------------------------------------------------------------------------
+# genai 응답과 같은 모양(속성명)의 경량 응답 객체
+#   - 가짜 클라이언트(fake_gemini)와 기록/재생 트랜스포트(llm_transport)가 함께 사용
+#   - 호출 코드는 resp.text / resp.usage_metadata.<필드> 만 읽으므로 실제 응답과 바꿔 끼울 수 있음
+# -----------------------------------------------------------------------------
+
+from dataclasses import dataclass, fields
+from typing import Optional
+
+@dataclass
+class UsageMetadata:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+    cached_content_token_count: int = 0
+    thoughts_token_count: int = 0
+
+USAGE_FIELDS = tuple(f.name for f in fields(UsageMetadata))
+
+@dataclass
+class TextResponse:
+    text: str
+    usage_metadata: Optional[UsageMetadata]
+    model_version: str = ""
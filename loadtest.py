@@ -0,0 +1,284 @@
+# loadtest.py
+# -----------------------------------------------------------------------------
+# 동시 세션 부하 테스트 — app.py 실제 흐름을 Streamlit AppTest 로 N개 세션 동시 구동
+#   흐름: 초기 로드 → 폼 제출 → 수정 모달 → 미세 조정 → 이미지 요청 → 발행 모달 → 연간 캘린더 생성
+#   LLM 은 fake_gemini.FakeClient (모델별 지연 분포) 또는 --replay 카세트(실제 기록 응답) 사용 — 쿼터 소모 없음
+#   기본(--cache cold)은 흐름마다 고유 국가 → 리서치/연간 캘린더/이벤트 인덱스가 흐름 간 공유되지 않아
+#   매 단계가 실제 LLM 경로를 탐. --cache shared 는 모든 흐름이 같은 국가(공유 캐시 재사용 측정).
+#   단계별 공유 캐시 적중/조회 수를 지연과 따로 보고(hit=적중/조회).
+#
+# 사용 예:
+#   python loadtest.py --sessions 1,2,4,8,16 --iterations 2 --latency-scale 0.5
+#   python loadtest.py --sessions 8 --json-out bench.json
+#   python loadtest.py --sessions 1,4,8 --replay prod_cassette.jsonl --latency-scale 1.0
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from cache_warmer import SharedResultCache
+from llm_scheduler import admission_user
+from streamlit_compat import patch_apptest_for_threads
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+STEPS = ["initial_load", "submit", "open_edit", "refine", "image_request", "open_publish", "year_calendar", "campaign"]
+
+# ===============================
+# 측정 유틸
+# ===============================
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except Exception:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs: return 0.0
+    xs = sorted(xs)
+    k = (len(xs) - 1) * q
+    lo = int(k); hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+@dataclass
+class LevelResult:
+    sessions: int
+    flows_ok: int = 0
+    flows_failed: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rss_delta_mb: float = 0.0
+    step_latencies: Dict[str, List[float]] = field(default_factory=lambda: {s: [] for s in STEPS})
+    step_errors: Dict[str, int] = field(default_factory=lambda: {s: 0 for s in STEPS})
+    step_cache: Dict[str, List[int]] = field(default_factory=lambda: {s: [0, 0] for s in STEPS})   # [적중, 조회]
+    error_samples: List[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.flows_ok / self.wall_s if self.wall_s else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "sessions": self.sessions,
+            "flows_ok": self.flows_ok,
+            "flows_failed": self.flows_failed,
+            "wall_s": round(self.wall_s, 3),
+            "throughput_flows_per_s": round(self.throughput, 4),
+            "cpu_s_per_session": round(self.cpu_s / max(1, self.sessions), 4),
+            "rss_mb_per_session": round(self.rss_delta_mb / max(1, self.sessions), 2),
+            "error_samples": self.error_samples[:5],
+            "steps": {
+                s: {
+                    "n": len(v),
+                    "errors": self.step_errors[s],
+                    "p50": round(_pct(v, 0.50), 4),
+                    "p95": round(_pct(v, 0.95), 4),
+                    "p99": round(_pct(v, 0.99), 4),
+                    "mean": round(statistics.fmean(v), 4) if v else 0.0,
+                    "cache_hits": self.step_cache[s][0],
+                    "cache_lookups": self.step_cache[s][1],
+                } for s, v in self.step_latencies.items()
+            },
+        }
+
+# ===============================
+# 공유 캐시 적중 집계 (세션별)
+# ===============================
+class CacheProbe:
+    """SharedResultCache 조회를 호출 세션(admission_user — 앱의 작업 스레드까지 전파됨)별로 집계."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_user: Dict[str, List[int]] = {}
+
+    def __call__(self, key, hit: bool):
+        with self._lock:
+            c = self._by_user.setdefault(admission_user.get(), [0, 0])
+            c[0] += int(hit); c[1] += 1
+
+    def counts(self, user: str) -> List[int]:
+        with self._lock:
+            return list(self._by_user.get(user, [0, 0]))
+
+probe = CacheProbe()
+
+# ===============================
+# 세션 1회 흐름
+# ===============================
+class FlowError(Exception):
+    pass
+
+def _first_card_id(at) -> str:
+    cards = at.session_state["idea_cards"] if "idea_cards" in at.session_state else []
+    if not cards:
+        raise FlowError("아이디어 카드 없음")
+    return cards[0]["id"]
+
+def _button_by_label(at, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise FlowError(f"버튼 없음: {label}")
+
+def run_flow(brand: str, year: int, timeout: float, record, user: str, country: str) -> None:
+    from streamlit.testing.v1 import AppTest
+
+    def step(name: str, fn):
+        c0 = probe.counts(user)
+        t0 = time.perf_counter()
+        try:
+            at = fn()
+            if at.exception:
+                raise FlowError(at.exception[0].message)
+            if at.error:
+                raise FlowError(at.error[0].value)
+        except Exception as e:
+            record(name, time.perf_counter() - t0, ok=False, error=f"{name}: {e!r}")
+            raise
+        c1 = probe.counts(user)
+        record(name, time.perf_counter() - t0, ok=True, cache=(c1[0] - c0[0], c1[1] - c0[1]))
+        return at
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.query_params["user"] = user   # 세션별 사용자(IDEAMAKER_TRUST_QUERY_USER) — 캐시 적중 집계 단위
+    step("initial_load", at.run)
+    at.text_input[0].input(brand)
+    next(t for t in at.text_input if t.label == "대상 국가").input(country)
+    step("submit", lambda: at.button[0].click().run())
+    cid = _first_card_id(at)
+    step("open_edit", lambda: at.button(key=f"edit_{cid}").click().run())
+    at.text_area(key=f"instr_{cid}").input("CTA를 더 명확히")
+    step("refine", lambda: _button_by_label(at, "미세 조정 적용").click().run())
+    cid = _first_card_id(at)
+    step("image_request", lambda: at.button(key=f"img_{cid}").click().run())
+    step("open_publish", lambda: at.button(key=f"pub_{cid}").click().run())
+    next(n for n in at.number_input if n.label == "연도").set_value(year)
+    step("year_calendar", lambda: _button_by_label(at, f"{year} 전체 이벤트 생성").click().run())
+    step("campaign", lambda: at.button(key="camp_go").click().run())
+
+# ===============================
+# 동시성 레벨 1개 실행
+# ===============================
+def run_level(sessions: int, iterations: int, year: int, timeout: float, ramp_s: float,
+              cache_mode: str = "cold") -> LevelResult:
+    res = LevelResult(sessions=sessions)
+    lock = threading.Lock()
+
+    def record(name: str, dt: float, ok: bool, error: str = "", cache=(0, 0)):
+        with lock:
+            res.step_cache[name][0] += cache[0]; res.step_cache[name][1] += cache[1]
+            if ok: res.step_latencies[name].append(dt)
+            else:
+                res.step_errors[name] += 1
+                if error: res.error_samples.append(error)
+
+    def worker(idx: int):
+        if ramp_s > 0:
+            time.sleep(ramp_s * idx / max(1, sessions))
+        for it in range(iterations):
+            try:
+                country = f"Loadland-{sessions}-{idx}-{it}" if cache_mode == "cold" else "Loadland"
+                run_flow(f"LoadBrand{idx}-{it}", year, timeout, record, user=f"load-{idx}", country=country)
+                with lock: res.flows_ok += 1
+            except Exception:
+                with lock: res.flows_failed += 1
+
+    rss0 = _rss_mb(); cpu0 = time.process_time(); t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as ex:
+        list(ex.map(worker, range(sessions)))
+    res.wall_s = time.perf_counter() - t0
+    res.cpu_s = time.process_time() - cpu0
+    res.rss_delta_mb = max(0.0, _rss_mb() - rss0)
+    return res
+
+def find_knee(results: List[LevelResult], min_gain: float = 0.10) -> Optional[int]:
+    """처리량 증가율이 min_gain 미만으로 떨어지기 직전의 동시 세션 수."""
+    for prev, cur in zip(results, results[1:]):
+        if prev.throughput <= 0: continue
+        if (cur.throughput - prev.throughput) / prev.throughput < min_gain:
+            return prev.sessions
+    return None
+
+# ===============================
+# CLI
+# ===============================
+def _print_table(results: List[LevelResult]) -> None:
+    print(f"{'sess':>5} {'ok':>4} {'fail':>4} {'flows/s':>8} {'cpu/s':>7} {'rssMB/s':>8}  step p50/p95/p99 (s)")
+    for r in results:
+        s = r.summary()
+        print(f"{r.sessions:>5} {r.flows_ok:>4} {r.flows_failed:>4} {s['throughput_flows_per_s']:>8.3f} "
+              f"{s['cpu_s_per_session']:>7.3f} {s['rss_mb_per_session']:>8.2f}")
+        for name, st_ in s["steps"].items():
+            print(f"{'':>42}{name:<14} {st_['p50']:.3f}/{st_['p95']:.3f}/{st_['p99']:.3f}  err={st_['errors']}"
+                  f"  hit={st_['cache_hits']}/{st_['cache_lookups']}")
+        for e in s["error_samples"]:
+            print(f"{'':>42}! {e[:160]}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Social Marcom Ideamaker 동시 세션 부하 테스트")
+    ap.add_argument("--sessions", default="1,2,4,8", help="동시 세션 수(콤마로 여러 레벨)")
+    ap.add_argument("--iterations", type=int, default=1, help="세션당 흐름 반복 횟수")
+    ap.add_argument("--year", type=int, default=2025)
+    ap.add_argument("--latency-scale", type=float, default=1.0, help="가짜 LLM 지연 배율(0=지연 없음)")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--timeout", type=float, default=120.0, help="AppTest 스크립트 실행 타임아웃(초)")
+    ap.add_argument("--ramp", type=float, default=0.0, help="세션 시작 분산 시간(초)")
+    ap.add_argument("--replay", default=None, help="기록 카세트(JSONL) 재생; 미스는 가짜 클라이언트로 채움")
+    ap.add_argument("--rpm", type=float, default=None, help="수락 제어 분당 요청 한도(IDEAMAKER_RPM; 0=무제한)")
+    ap.add_argument("--max-inflight", type=int, default=None, help="수락 제어 동시 실행 상한(IDEAMAKER_MAX_INFLIGHT)")
+    ap.add_argument("--cache", choices=["cold", "shared"], default="cold",
+                    help="cold=흐름마다 고유 국가(실제 LLM 경로), shared=전 흐름 같은 국가(공유 캐시 재사용)")
+    ap.add_argument("--json-out", default=None)
+    args = ap.parse_args(argv)
+
+    os.environ["IDEAMAKER_FAKE_LLM"] = "1"
+    os.environ["IDEAMAKER_FAKE_LATENCY_SCALE"] = str(args.latency_scale)
+    os.environ["IDEAMAKER_TRUST_QUERY_USER"] = "1"   # 세션마다 다른 사용자로 공정 큐잉/예산 측정
+    # 토큰 집계는 임시 파일로 — 실제 사용자 원장(.ideamaker_usage.json)을 오염시키지 않음
+    ledger_dir = tempfile.mkdtemp(prefix="ideamaker_loadtest_")
+    os.environ["IDEAMAKER_TOKEN_LEDGER"] = os.path.join(ledger_dir, "usage.json")
+    if args.rpm is not None:
+        os.environ["IDEAMAKER_RPM"] = str(args.rpm)
+    if args.max_inflight is not None:
+        os.environ["IDEAMAKER_MAX_INFLIGHT"] = str(args.max_inflight)
+    if args.seed is not None:
+        os.environ["IDEAMAKER_FAKE_SEED"] = str(args.seed)
+    if args.replay:
+        os.environ["IDEAMAKER_LLM_REPLAY"] = os.path.abspath(args.replay)
+        os.environ["IDEAMAKER_LLM_REPLAY_SCALE"] = str(args.latency_scale)
+
+    levels = [int(x) for x in args.sessions.split(",") if x.strip()]
+    patch_apptest_for_threads()
+    try:
+        # 워밍업: import/캐시 리소스 생성 비용이 첫 레벨에 섞이지 않도록 1회 미측정 실행
+        # (cold 모드는 다른 국가라 워밍업 결과가 측정 흐름의 캐시 적중이 되지 않음)
+        SharedResultCache.observer = probe
+        run_flow("Warmup", args.year, args.timeout, lambda *a, **k: None, user="load-warmup",
+                 country="Warmupland" if args.cache == "cold" else "Loadland")
+        results = [run_level(n, args.iterations, args.year, args.timeout, args.ramp, args.cache) for n in levels]
+    finally:
+        shutil.rmtree(ledger_dir, ignore_errors=True)
+    _print_table(results)
+    knee = find_knee(results)
+    print(f"knee(처리량 증가 <10%): {knee if knee is not None else '미도달'}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"cache_mode": args.cache, "levels": [r.summary() for r in results], "knee_sessions": knee},
+                      f, ensure_ascii=False, indent=2)
+    return 0 if all(r.flows_failed == 0 for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
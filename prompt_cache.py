@@ -0,0 +1,26 @@
+# prompt_cache.py
+# -----------------------------------------------------------------------------
+# 정적 프롬프트 프리픽스 분리 (implicit 캐싱용)
+#   - 프롬프트 = 고정 프리픽스(system_instruction) + 작은 가변 서픽스(contents)
+#   - 프리픽스를 요청 맨 앞에 고정 → Gemini implicit 캐싱이 적중하면
+#     usage.cached_content_token_count 로 돌아오고 토큰 장부/라우터 비용에 할인 반영
+#   - explicit cached-content API 는 쓰지 않음: 최소 크기(~1024 토큰)에 비해
+#     단계별 프리픽스(약 100~250 토큰)가 훨씬 작아 생성이 항상 거절됨
+# -----------------------------------------------------------------------------
+
+import hashlib
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class PromptParts:
+    key: str       # 프리픽스 종류(research/cards/refine/year)
+    prefix: str    # 고정 지시문 + 스키마
+    suffix: str    # 호출별 입력
+
+    @property
+    def version(self) -> str:
+        return hashlib.sha1(self.prefix.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.suffix}"
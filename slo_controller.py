@@ -0,0 +1,271 @@
+# slo_controller.py
+# -----------------------------------------------------------------------------
+# 실행 단위 마감 시간(deadline) + 지연 SLO 컨트롤러
+#   - RunDeadline: 실행 시작 시각 + 예산(초). 리서치는 예산의 일부(research_share)까지만 사용
+#     호출 코드에는 contextvars 로 전달(작업 스레드에는 copy_context 로 복사) — 시그니처를 넓히지 않음
+#   - LatencyModel: 단계별 최근 완료 호출 (지연, 출력 토큰, 항목 수) → 지연 ≈ 고정 지연 + 토큰당 초
+#   - SloController: 남은 시간으로 요청 항목 수(n_req)/최대 출력 토큰/thinking 예산 결정,
+#     실행별 마감 준수 여부(달성률) 집계
+#   IDEAMAKER_DEADLINE_S=실행 마감(초, 기본 0=끔) / IDEAMAKER_RESEARCH_SHARE=리서치 몫(0~1)
+#     20초·리서치 0.4 이면 리서치 출력은 약 1000 토큰으로 묶이고 카드 수도 슬라이더 값보다 줄 수 있음
+#     (의도한 트레이드오프일 때만 켤 것)
+# -----------------------------------------------------------------------------
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+RESEARCH_STAGES = {"research", "sweep"}
+
+# ===============================
+# 실행 마감
+# ===============================
+class RunDeadline:
+    def __init__(self, kind: str, budget_s: float, research_share: float = 0.4, clock=time.monotonic):
+        self.kind = kind
+        self.budget_s = budget_s
+        self.research_share = research_share
+        self._clock = clock
+        self.started = clock()
+        self._lock = threading.Lock()
+        self.events: Dict[str, int] = {}        # cutoff / research_fallback / admission_timeout ...
+        self.info: Dict[str, Any] = {}          # n_req, cards 등 실행 요약
+
+    def at(self, stage: Optional[str] = None) -> float:
+        share = self.research_share if stage in RESEARCH_STAGES else 1.0
+        return self.started + self.budget_s * share
+
+    def remaining(self, stage: Optional[str] = None) -> float:
+        return self.at(stage) - self._clock()
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    def note(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + n
+
+    def set(self, **kw: Any) -> None:
+        with self._lock:
+            self.info.update(kw)
+
+run_deadline: contextvars.ContextVar[Optional[RunDeadline]] = contextvars.ContextVar("run_deadline", default=None)
+
+# ===============================
+# JSON 배열 부분 복원 (마감으로 끊긴 스트리밍 출력)
+# ===============================
+_DECODER = json.JSONDecoder()
+
+def complete_array_items(text: str) -> List[Any]:
+    """'[{..}, {..}, {.' 처럼 끊긴 JSON 배열에서 완결된 원소만 반환."""
+    i = (text or "").find("[")
+    if i < 0: return []
+    out: List[Any] = []
+    i += 1
+    n = len(text)
+    while i < n:
+        while i < n and text[i] in " \t\r\n,": i += 1
+        if i >= n or text[i] == "]": break
+        try:
+            item, i = _DECODER.raw_decode(text, i)
+        except ValueError:
+            break
+        out.append(item)
+    return out
+
+# ===============================
+# 지연 모델
+# ===============================
+@dataclass(frozen=True)
+class StagePrior:
+    overhead_s: float          # 첫 토큰 + 입력 처리
+    s_per_token: float         # 출력 토큰당 초
+    tokens_per_item: float     # 항목(카드/이벤트) 1개당 출력 토큰
+
+DEFAULT_PRIORS: Dict[str, StagePrior] = {
+    "research": StagePrior(1.0, 1 / 200, 90.0),
+    "sweep":    StagePrior(1.5, 1 / 200, 90.0),
+    "cards":    StagePrior(1.0, 1 / 200, 380.0),
+    "refine":   StagePrior(0.8, 1 / 200, 380.0),
+}
+_FALLBACK_PRIOR = StagePrior(1.0, 1 / 200, 200.0)
+
+class LatencyModel:
+    """최근 window 개 완료 호출의 최소제곱 직선(지연 = a + b·토큰). 표본이 적거나 기울기가 비정상이면 사전값."""
+
+    def __init__(self, prior: StagePrior, window: int = 50, min_samples: int = 5):
+        self.prior = prior
+        self.min_samples = min_samples
+        self.samples: Deque[Tuple[float, int, int]] = deque(maxlen=window)   # (지연, 출력 토큰, 항목 수)
+
+    def add(self, latency_s: float, output_tokens: int, n_items: int = 0) -> None:
+        self.samples.append((latency_s, output_tokens, n_items))
+
+    def fit(self) -> Tuple[float, float]:
+        xs = [float(t) for _, t, _ in self.samples]; ys = [l for l, _, _ in self.samples]
+        if len(xs) < self.min_samples:
+            return self.prior.overhead_s, self.prior.s_per_token
+        mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+        var = sum((x - mx) ** 2 for x in xs)
+        prior_b = self.prior.s_per_token
+        if mx <= 0 or var / len(xs) < (0.25 * mx) ** 2:
+            b = prior_b   # 출력 길이가 거의 같으면 기울기 추정 불가 → 사전 기울기로 절편만 맞춤
+        else:
+            b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+            b = min(max(b, prior_b / 3), prior_b * 3)   # 지터로 인한 극단값 억제
+        return max(0.0, my - b * mx), b
+
+    def tokens_per_item(self) -> float:
+        rows = [(t, n) for _, t, n in self.samples if n > 0]
+        if len(rows) < self.min_samples:
+            return self.prior.tokens_per_item
+        return sum(t for t, _ in rows) / sum(n for _, n in rows)
+
+    def p95(self) -> float:
+        ys = sorted(l for l, _, _ in self.samples)
+        return ys[min(len(ys) - 1, int(round(0.95 * (len(ys) - 1))))] if ys else 0.0
+
+# ===============================
+# 컨트롤러
+# ===============================
+@dataclass(frozen=True)
+class CallBudget:
+    max_output_tokens: Optional[int]
+    thinking_budget: Optional[int]
+    cutoff_at: float               # 스트리밍 중단 시각(monotonic)
+
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] if xs else 0.0
+
+class SloController:
+    def __init__(self, budget_s: float = 0.0, research_share: float = 0.4, safety: float = 1.25,
+                 min_output_tokens: int = 512, reserve_s: float = 0.5, probe_every: int = 10,
+                 priors: Optional[Dict[str, StagePrior]] = None, clock=time.monotonic):
+        self.budget_s = budget_s                  # 0 = 마감 없음
+        self.research_share = research_share
+        self.safety = safety                      # 예측 지연 여유 배수
+        self.min_output_tokens = min_output_tokens
+        self.reserve_s = reserve_s                # 파싱/렌더링 몫
+        self.priors = dict(DEFAULT_PRIORS if priors is None else priors)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._models: Dict[str, LatencyModel] = {}
+        self._runs: Deque[Dict[str, Any]] = deque(maxlen=200)
+        self._skips: Dict[str, int] = {}
+        self.probe_every = probe_every
+        self.totals = {"runs": 0, "met": 0}
+
+    @classmethod
+    def from_env(cls) -> "SloController":
+        return cls(budget_s=float(os.environ.get("IDEAMAKER_DEADLINE_S", "0")),
+                   research_share=float(os.environ.get("IDEAMAKER_RESEARCH_SHARE", "0.4")))
+
+    def _model(self, stage: str) -> LatencyModel:
+        if stage not in self._models:
+            self._models[stage] = LatencyModel(self.priors.get(stage, _FALLBACK_PRIOR))
+        return self._models[stage]
+
+    # ---- 관측 ----
+    def observe(self, stage: str, latency_s: float, output_tokens: int, n_items: int = 0) -> None:
+        """마감으로 끊기지 않고 끝난 호출만 기록(끊긴 호출의 지연은 하한값일 뿐)."""
+        with self._lock:
+            self._model(stage).add(latency_s, output_tokens, n_items)
+
+    # ---- 예측/계획 ----
+    def expected_s(self, stage: str, output_tokens: float) -> float:
+        with self._lock:
+            a, b = self._model(stage).fit()
+        return (a + b * output_tokens) * self.safety
+
+    def tokens_within(self, stage: str, seconds: float) -> int:
+        with self._lock:
+            a, b = self._model(stage).fit()
+        return max(0, int((seconds / self.safety - a) / b)) if b > 0 else 0
+
+    def plan_call(self, stage: str, dl: RunDeadline, route_max_tokens: Optional[int],
+                  route_thinking: Optional[int]) -> CallBudget:
+        """남은 시간 안에 끝날 출력 상한. thinking 은 상한 출력까지 다 쓰고도 시간이 남을 때만 유지."""
+        left = dl.remaining(stage) - self.reserve_s
+        fit = self.tokens_within(stage, left)
+        cap = route_max_tokens or fit
+        max_out = max(self.min_output_tokens, min(cap, fit))
+        think = route_thinking
+        if think is None or think > 0:
+            need = think if think else 1024   # None(모델 자동)은 1024 토큰으로 가정
+            if fit < cap + need:
+                think = 0
+        return CallBudget(max_out, think, dl.at(stage))
+
+    def plan_items(self, stage: str, dl: RunDeadline, wanted: int, minimum: int = 1) -> int:
+        """남은 시간 안에 생성 가능한 항목 수(요청 수 n_req)."""
+        with self._lock:
+            per_item = self._model(stage).tokens_per_item()
+        fit = int(self.tokens_within(stage, dl.remaining(stage) - self.reserve_s) // max(1.0, per_item))
+        return max(minimum, min(wanted, fit))
+
+    def research_fits(self, dl: RunDeadline, stage: str = "research") -> bool:
+        """최근 완료 호출 p95 가 리서치 몫의 남은 시간 안에 드는지.
+        표본이 부족하면 시도(스트리밍 중단이 몫을 지킴), 연속 probe_every 번 건너뛰면 한 번은 시도해 통계를 갱신."""
+        with self._lock:
+            m = self._model(stage)
+            if len(m.samples) < m.min_samples or m.p95() <= dl.remaining(stage):
+                return True
+            self._skips[stage] = self._skips.get(stage, 0) + 1
+            if self._skips[stage] >= self.probe_every:
+                self._skips[stage] = 0
+                return True
+            return False
+
+    # ---- 실행 단위 ----
+    @contextmanager
+    def run(self, kind: str) -> Iterator[Optional[RunDeadline]]:
+        """블록 = 실행 1회. 마감이 꺼져 있으면 None. 블록 종료 시(예외 포함) 달성 여부 기록."""
+        if self.budget_s <= 0:
+            yield None
+            return
+        dl = RunDeadline(kind, self.budget_s, self.research_share, clock=self._clock)
+        tok = run_deadline.set(dl)
+        failed = False
+        try:
+            yield dl
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            run_deadline.reset(tok)
+            self._finish(dl, failed)
+
+    def _finish(self, dl: RunDeadline, failed: bool) -> None:
+        elapsed = dl.elapsed()
+        met = not failed and elapsed <= dl.budget_s and not dl.info.get("failed")
+        rec = {"kind": dl.kind, "budget_s": dl.budget_s, "elapsed_s": round(elapsed, 3), "met": met,
+               "events": dict(dl.events), **dl.info}
+        with self._lock:
+            self._runs.append(rec)
+            self.totals["runs"] += 1; self.totals["met"] += int(met)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            runs = list(self._runs)
+            models = {s: {"fit_overhead_s": round(m.fit()[0], 3), "fit_tokens_per_s": round(1 / m.fit()[1], 1),
+                          "tokens_per_item": round(m.tokens_per_item(), 1), "p95_s": round(m.p95(), 3),
+                          "samples": len(m.samples)} for s, m in self._models.items()}
+            totals = dict(self.totals)
+        el = [r["elapsed_s"] for r in runs]
+        return {
+            "deadline_s": self.budget_s, "research_share": self.research_share,
+            "runs": totals["runs"], "met": totals["met"],
+            "attainment": round(totals["met"] / totals["runs"], 4) if totals["runs"] else None,
+            "elapsed_p50_s": round(_pct(el, 0.50), 3), "elapsed_p95_s": round(_pct(el, 0.95), 3),
+            "runs_with_cutoff": sum(1 for r in runs if r["events"].get("cutoff")),
+            "runs_with_research_fallback": sum(1 for r in runs if r["events"].get("research_fallback")),
+            "latency_models": models,
+            "recent": runs[-5:],
+        }
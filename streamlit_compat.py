@@ -0,0 +1,74 @@
+# streamlit_compat.py
+# -----------------------------------------------------------------------------
+# Streamlit 비공개 내부 의존을 한곳에 격리 (부하 테스트의 AppTest 동시 실행 보정)
+#   - AppTest 는 단일 스레드 사용을 전제로 전역 상태를 실행마다 교체/복원 → 동시 세션에서 서로 덮어씀
+#   - 여기서만 streamlit 내부(magic.add_magic, Runtime.instance, config.get_option,
+#     app_test.patch_config_options)를 건드린다. 앱 코드는 이 모듈을 import 하지 않는다.
+#   - 검증한 Streamlit 버전(TESTED_STREAMLIT) 밖이면 경고, 필요한 내부가 없으면 바로 실패(조용한 오동작 방지)
+# -----------------------------------------------------------------------------
+
+import threading
+import warnings
+from contextlib import contextmanager
+
+TESTED_STREAMLIT = ("1.66",)   # 이 버전 접두사에서 보정 동작을 확인함 — Streamlit 올릴 때 loadtest 로 재확인 후 추가
+
+_compile_lock = threading.Lock()
+_applied = False
+
+def _check_version() -> None:
+    import streamlit
+    ver = getattr(streamlit, "__version__", "")
+    if not any(ver == v or ver.startswith(v + ".") for v in TESTED_STREAMLIT):
+        warnings.warn(f"streamlit {ver}: AppTest 동시 실행 보정은 {', '.join(TESTED_STREAMLIT)} 에서만 검증됨", RuntimeWarning)
+
+def _require(obj, name: str):
+    if not hasattr(obj, name):
+        raise RuntimeError(f"streamlit 내부 API 변경: {getattr(obj, '__name__', obj)}.{name} 없음 — streamlit_compat 갱신 필요")
+    return getattr(obj, name)
+
+def patch_apptest_for_threads() -> None:
+    """프로세스 전체에 1회 적용. 이후 같은 프로세스의 AppTest 는 여러 스레드에서 동시에 run 가능."""
+    global _applied
+    if _applied:
+        return
+    _check_version()
+    from streamlit import config
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner import magic
+    from streamlit.testing.v1 import app_test, util
+
+    # CPython 3.11 의 ast.parse 는 스레드 동시 호출 시 "AST constructor recursion depth mismatch"
+    # 로 실패할 수 있음 → Streamlit 의 스크립트 컴파일(magic 변환)만 직렬화. 스크립트 실행은 병렬 유지.
+    orig = _require(magic, "add_magic")
+
+    def locked(code, script_path):
+        with _compile_lock:
+            return orig(code, script_path)
+    magic.add_magic = locked
+
+    # AppTest 는 실행마다 전역 Runtime._instance 를 mock 으로 설정했다가 끝나면 None 으로 되돌림
+    # → 다른 세션 실행 도중 None 이 되면 "Runtime hasn't been created!" 발생. 마지막 mock 을 계속 제공.
+    _require(Runtime, "_instance"); _require(Runtime, "instance")
+    last = {"rt": None}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["rt"] = cls._instance
+            return cls._instance
+        if last["rt"] is not None:
+            return last["rt"]
+        raise RuntimeError("Runtime hasn't been created!")
+    Runtime.instance = classmethod(instance)
+
+    # AppTest.run 은 실행 동안 config.get_option 을 mock.patch 로 교체(global.appTest=True)
+    # → 다른 세션 실행이 먼저 끝나며 원래 함수로 되돌리면 이 세션의 위젯 format_func 가 저장되지 않아
+    #   KeyError('$$ID-...') 발생. 프로세스 전체에 한 번만 적용하고 실행별 패치는 무효화.
+    _require(config, "get_option"); _require(app_test, "patch_config_options")
+    config.get_option = _require(util, "build_mock_config_get_option")({"global.appTest": True})
+
+    @contextmanager
+    def _noop_patch(_overrides):
+        yield
+    app_test.patch_config_options = _noop_patch
+    _applied = True
@@ -0,0 +1,5 @@
+# 저장소 루트의 모듈(app 제외)을 직접 import 해 단위 테스트
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
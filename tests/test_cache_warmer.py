@@ -0,0 +1,48 @@
+from datetime import date
+
+import pytest
+
+from cache_warmer import CacheWarmer, SharedResultCache, WarmConfig
+
+TODAY = date(2026, 3, 2)
+GROUPS = [["PublicHoliday", "Religion", "Cultural"], ["Commercial", "School", "WeatherEnv"],
+          ["Sports", "MediaEnt"], ["WorldDays", "Gimmick"]]
+
+def _run(config, groups):
+    seen = []
+    def fn(task):
+        seen.append(task)
+        return {}, None
+    w = CacheWarmer(SharedResultCache(), config, fn, fn, category_groups=groups, today_fn=lambda: TODAY)
+    w.run_once()
+    return seen
+
+@pytest.mark.parametrize("groups", [None, GROUPS])
+def test_default_budget_reaches_every_task_type(groups):
+    cfg = WarmConfig(pace_s=0)
+    seen = _run(cfg, groups)
+    assert len(seen) <= cfg.budget_calls
+    assert {t.kind for t in seen} == {"research", "year"}
+    assert {t.country for t in seen if t.kind == "year"} == set(cfg.countries)
+    assert {t.country for t in seen if t.kind == "research" and t.day == TODAY} == set(cfg.countries)
+
+def test_plan_puts_today_then_year_then_later_days():
+    w = CacheWarmer(SharedResultCache(), WarmConfig(), None, None, category_groups=GROUPS)
+    tasks = w.plan(TODAY)
+    kinds = [t.kind for t in tasks]
+    first_year, last_year = kinds.index("year"), len(kinds) - 1 - kinds[::-1].index("year")
+    assert all(t.day == TODAY for t in tasks[:first_year])
+    assert all(t.day > TODAY for t in tasks[last_year + 1:])
+    assert len(tasks) == 7 * 3 * len(GROUPS) + 3
+
+def test_fresh_entries_are_not_rewarmed():
+    cfg = WarmConfig(pace_s=0, days_ahead=1, countries=["Japan"])
+    cache = SharedResultCache()
+    calls = []
+    def fn(task):
+        calls.append(task)
+        cache.put(w._key(task), {"ok": True}, ttl_s=cfg.interval_s * 2)
+        return {}, None
+    w = CacheWarmer(cache, cfg, fn, fn, today_fn=lambda: TODAY)
+    w.run_once(); w.run_once()
+    assert len(calls) == 2   # research 1 + year 1, 두 번째 사이클은 모두 신선
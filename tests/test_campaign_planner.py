@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import pytest
+
+from campaign_planner import assign_events, campaign_days, summarize, sweep_window
+
+DAYS = campaign_days(date(2026, 2, 1), date(2026, 2, 14))
+
+def _ev(name, d, conf=0.5, cat="Cultural"):
+    return {"name": name, "category": cat, "date": d, "confidence": conf}
+
+def test_events_outside_the_range_are_dropped_not_clamped():
+    plan, stats = assign_events([_ev("before", "2026-01-28"), _ev("after", "2026-02-20"),
+                                 _ev("inside", "2026-02-03")], DAYS)
+    placed = {e["name"]: d for d, es in plan.items() for e in es}
+    assert placed == {"inside": date(2026, 2, 3)}
+    assert stats["out_of_range"] == 2 and stats["assigned"] == 1 and stats["overflow"] == 0
+
+def test_multi_day_holiday_keeps_first_in_range_entry():
+    # 1/30~2/2 연휴: 기간 시작 전 항목 때문에 기간 안 항목까지 버려지지 않음
+    evs = [_ev("설 연휴", f"2026-0{m}-{d:02d}", cat="PublicHoliday") for m, d in [(1, 30), (1, 31), (2, 1), (2, 2)]]
+    plan, stats = assign_events(evs, DAYS)
+    assert [e["date"] for e in plan[date(2026, 2, 1)]] == ["2026-02-01"]
+    assert (stats["out_of_range"], stats["duplicates"], stats["assigned"]) == (2, 1, 1)
+
+def test_daily_cap_spreads_by_confidence_and_counts_overflow():
+    evs = [_ev(f"e{i}", "2026-02-07", conf=i / 10) for i in range(10)]
+    plan, stats = assign_events(evs, DAYS, window_days=1, max_per_day=2)
+    assert [len(plan[date(2026, 2, d)]) for d in (6, 7, 8)] == [2, 2, 2]
+    assert {e["name"] for e in plan[date(2026, 2, 7)]} == {"e9", "e8"}
+    assert stats["assigned"] == 6 and stats["overflow"] == 4
+
+def test_undated_and_summary():
+    plan, stats = assign_events([_ev("x", None), _ev("y", "someday")], DAYS)
+    assert stats["undated"] == 2 and not any(plan.values())
+    text = summarize({"start": "2026-02-01", "end": "2026-02-14", "source": "sweep", "days": [{}], "stats": stats})
+    assert "기간 밖 0건" in text
+
+@pytest.mark.parametrize("start,end", [(date(2026, 2, 1), date(2026, 2, 14)), (date(2026, 2, 1), date(2026, 2, 15)),
+                                       (date(2026, 3, 5), date(2026, 3, 5))])
+def test_sweep_window_covers_only_the_range_by_default(start, end):
+    center, wdays = sweep_window(start, end)
+    lo, hi = center - timedelta(days=wdays), center + timedelta(days=wdays)
+    assert lo <= start and end <= hi
+    assert (start - lo).days + (hi - end).days <= 1   # 기간 밖 리서치 없음(홀수 길이 반올림 1일만)
+    assert sweep_window(start, end, pad_days=3) == (center, wdays + 3)
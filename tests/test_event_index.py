@@ -0,0 +1,103 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from event_index import EventIndex, month_histogram, parse_days, window_mask
+
+CATS = ["Commercial", "Cultural", "PublicHoliday", "Sports", "WorldDays"]
+
+def _events(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        d = date(2025, 11, 1) + timedelta(days=rng.randrange(500))
+        out.append({"name": f"e{i}", "category": rng.choice(CATS), "date": d.isoformat(),
+                    "confidence": round(rng.random(), 2)})
+    out += [{"name": "no-date", "category": "Sports", "date": None},
+            {"name": "bad-date", "category": "Sports", "date": "soon"},
+            {"name": "bad-cat", "category": "Astrology", "date": "2026-03-01"}]
+    rng.shuffle(out)
+    return out
+
+def _brute(events, start, end, categories=None, min_confidence=0.0):
+    rows = [e for e in events
+            if e["category"] in CATS and e.get("date") and e["date"][:4].isdigit()
+            and start.isoformat() <= e["date"] <= end.isoformat()
+            and (not categories or e["category"] in categories)
+            and float(e.get("confidence", 0.0) or 0.0) >= min_confidence]
+    return sorted((e["date"], e["name"]) for e in rows)
+
+@pytest.fixture(scope="module")
+def events():
+    return _events(400)
+
+@pytest.fixture(scope="module")
+def index(events):
+    idx = EventIndex(CATS)
+    assert idx.add_events("KR", events) == 400
+    idx.add_events("EMPTY", [{"name": "x", "category": "Sports", "date": None}])
+    return idx
+
+@pytest.mark.parametrize("start,end,cats,conf", [
+    (date(2026, 1, 1), date(2026, 12, 31), None, 0.0),
+    (date(2026, 2, 10), date(2026, 2, 10), None, 0.0),
+    (date(2026, 5, 1), date(2026, 6, 15), ["Sports", "WorldDays"], 0.0),
+    (date(2025, 1, 1), date(2027, 12, 31), ["Cultural"], 0.5),
+    (date(2024, 1, 1), date(2024, 12, 31), None, 0.0),          # 범위 밖
+    (date(2026, 3, 1), date(2026, 2, 1), None, 0.0),            # 역순 구간
+])
+def test_query_matches_brute_force(index, events, start, end, cats, conf):
+    got = [(e["date"], e["name"]) for e in index.query("KR", start, end, cats, min_confidence=conf)]
+    want = _brute(events, start, end, cats, conf)
+    assert sorted(got) == want
+    assert [d for d, _ in got] == sorted(d for d, _ in got)   # 날짜순
+    assert index.count("KR", start, end, cats, min_confidence=conf) == len(want)
+
+def test_query_limit_and_copies(index):
+    rows = index.query("KR", date(2026, 1, 1), date(2026, 12, 31), limit=5)
+    assert len(rows) == 5
+    rows[0]["name"] = "changed"
+    assert index.query("KR", date(2026, 1, 1), date(2026, 12, 31), limit=1)[0]["name"] != "changed"
+
+def test_replace_range(events):
+    idx = EventIndex(CATS)
+    idx.add_events("KR", events)
+    new = [{"name": "only", "category": "Sports", "date": "2026-07-04"}]
+    idx.add_events("KR", new, replace=(date(2026, 7, 1), date(2026, 7, 31)))
+    assert [e["name"] for e in idx.query("KR", date(2026, 7, 1), date(2026, 7, 31))] == ["only"]
+    assert idx.count("KR", date(2026, 6, 1), date(2026, 6, 30)) == len(_brute(events, date(2026, 6, 1), date(2026, 6, 30)))
+
+def test_empty_and_unknown_country(index):
+    assert "EMPTY" in index.countries()
+    for c in ("EMPTY", "nowhere", ""):
+        assert index.query(c, date(2026, 1, 1), date(2026, 12, 31)) == []
+        assert index.count(c, date(2026, 1, 1), date(2026, 12, 31)) == 0
+        assert index.span(c) is None
+        assert index.month_counts(c, 2026).tolist() == [0] * 12
+    assert index.span("KR")[0] <= index.span("KR")[1]
+
+def test_month_counts_and_histogram_match_brute_force(index, events):
+    want = [0] * 12
+    for d, _ in _brute(events, date(2026, 1, 1), date(2026, 12, 31)):
+        want[int(d[5:7]) - 1] += 1
+    assert index.month_counts("KR", 2026).tolist() == want
+    valid = [e["date"] for e in events if e["category"] in CATS]
+    assert month_histogram(valid, 2026).tolist() == want
+    assert month_histogram([], 2026).tolist() == [0] * 12
+
+@pytest.mark.parametrize("center,window", [(date(2026, 2, 17), 7), (date(2026, 2, 17), 0), (date(2030, 1, 1), 30)])
+def test_window_mask_matches_brute_force(events, center, window):
+    dates = [e.get("date") for e in events]
+    mask = window_mask(dates, center, window)
+    want = []
+    for d in dates:
+        try: want.append(abs((date.fromisoformat(d) - center).days) <= window)
+        except (TypeError, ValueError): want.append(False)
+    assert mask.tolist() == want
+
+def test_parse_days_marks_missing_and_bad():
+    days = parse_days(["2026-01-01", None, "soon", "2026-01-02T09:00"])
+    assert days[0] + 1 == days[3]
+    assert (days[1:3] == np.iinfo(np.int32).min).all()
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from fake_gemini import FakeClient, LatencyProfile
+from llm_router import ModelRouter, Route, StageConfig
+from llm_types import UsageMetadata
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, s: float):
+        self.t += s
+
+# 지터 없는 가짜 지연 프로파일: 지연 = TTFT + 출력 토큰 / 처리량
+PROFILES = {
+    "fast": LatencyProfile(ttft_s=0.2, tokens_per_s=1000.0, sigma=0.0),
+    "slow": LatencyProfile(ttft_s=3.0, tokens_per_s=1000.0, sigma=0.0),
+    "slower": LatencyProfile(ttft_s=5.0, tokens_per_s=1000.0, sigma=0.0),
+}
+A, B, C = Route("a"), Route("b"), Route("c")
+
+@pytest.fixture
+def env():
+    clock = FakeClock()
+    router = ModelRouter({"cards": StageConfig(slo_p95_s=2.0, routes=[A, B, C])},
+                         window=20, min_samples=5, cooldown_s=60.0, clock=clock)
+    fake = FakeClient(profiles=PROFILES)
+    rng = random.Random(0)
+    def run(route: Route, profile: str, n: int = 5, ok: bool = True):
+        for _ in range(n):
+            router.record("cards", route, fake.sample_latency(profile, 1000, rng), ok=ok)
+    return router, clock, run
+
+def test_slo_breach_demotes_and_falls_back(env):
+    router, _, run = env
+    assert router.plan("cards") == [A, B, C]
+    run(A, "fast", n=4); run(A, "slow", n=1)   # 표본 5개 중 p95 만 초과 → 강등
+    assert router.plan("cards") == [B, C, A]
+    assert router.snapshot()["cards"][0]["demoted"] is True
+
+def test_demoted_routes_keep_order_by_p95_at_demotion(env):
+    router, _, run = env
+    run(A, "slower"); run(B, "slow")
+    assert router.plan("cards") == [C, B, A]
+    run(C, "slower", n=4); run(C, "slow", n=1)
+    # 창을 비워도 강등 시점 p95(B 4.0 < A·C 6.0)로 정렬 — 방금 강등된 C 가 0 으로 앞서지 않음
+    assert router.plan("cards") == [B, A, C]
+    run(C, "slower", n=4, ok=False)   # 강등 중에도 호출은 기록됨(정렬 키는 강등 시점 아래로 안 내려감)
+    assert router.plan("cards")[0] == B
+
+def test_error_demotion_sorts_last(env):
+    router, _, run = env
+    run(A, "fast", ok=False)
+    run(B, "slower")
+    assert router.plan("cards") == [C, B, A]
+
+def test_recovery_after_cooldown(env):
+    router, clock, run = env
+    run(A, "slow")
+    assert router.plan("cards")[0] == B
+    clock.advance(61)
+    assert router.plan("cards") == [A, B, C]   # 쿨다운 뒤 복귀, 예전 관측값 없이 다시 평가
+    run(A, "fast", n=20)
+    assert router.plan("cards") == [A, B, C]
+    run(A, "slow", n=1)   # 창 20개 중 1개 초과는 p95 에 안 걸림
+    assert router.plan("cards")[0] == A
+    run(A, "slow", n=1)
+    assert router.plan("cards") == [B, C, A]
+
+def test_cost_accounts_cached_and_thinking_tokens():
+    router = ModelRouter({"cards": StageConfig(slo_p95_s=10.0, routes=[Route("gemini-2.5-flash")])})
+    usage = UsageMetadata(1_000_000, 100_000, 1_100_000, cached_content_token_count=400_000, thoughts_token_count=100_000)
+    router.record("cards", Route("gemini-2.5-flash"), 1.0, ok=True, usage=usage)
+    row = router.snapshot()["cards"][0]
+    assert (row["input_tokens"], row["output_tokens"], row["cached_tokens"]) == (1_000_000, 200_000, 400_000)
+    assert row["cost_usd"] == pytest.approx(0.6 * 0.30 + 0.4 * 0.30 * 0.25 + 0.2 * 2.50)
+
+def test_unknown_stage_uses_default_model():
+    assert ModelRouter().plan("nope", default_model="m") == [Route("m")]
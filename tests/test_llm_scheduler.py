@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import BULK, INTERACTIVE, AdmissionScheduler, AdmissionTimeout, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, s: float):
+        self.t += s
+
+def _drain(s: AdmissionScheduler):
+    """대기열 앞에서부터 하나씩 수락·즉시 종료 → 수락된 (사용자, 단계) 순서."""
+    order = []
+    with s._cond:
+        while s._queue:
+            head = min(s._queue, key=lambda t: t.order)
+            assert s._try_admit(head) == 0.0
+            s._release(head)
+            order.append((head.user, head.stage))
+    return order
+
+# ===============================
+# 토큰 버킷
+# ===============================
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    b = TokenBucket(rate_per_s=1.0, burst=2, clock=clock)
+    assert b.try_take() == 0.0 and b.try_take() == 0.0
+    assert b.try_take() == pytest.approx(1.0)
+    clock.advance(0.5)
+    assert b.try_take() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert b.try_take() == 0.0
+    clock.advance(100)   # 버스트 이상으로는 쌓이지 않음
+    assert [b.try_take() == 0.0 for _ in range(3)] == [True, True, False]
+
+def test_token_bucket_zero_rate_is_unlimited():
+    b = TokenBucket(rate_per_s=0.0, burst=1, clock=FakeClock())
+    assert all(b.try_take() == 0.0 for _ in range(1000))
+
+def test_scheduler_rate_limits_admission():
+    clock = FakeClock()
+    s = AdmissionScheduler(rpm=60, burst=1, max_inflight=8, clock=clock)
+    with s._cond:
+        a, b = s._enqueue("u1", "cards", INTERACTIVE, 1.0), s._enqueue("u1", "cards", INTERACTIVE, 1.0)
+        assert s._try_admit(a) == 0.0
+        assert s._try_admit(b) == pytest.approx(1.0)
+        clock.advance(1.0)
+        assert s._try_admit(b) == 0.0
+    assert s.rate_limited == 1
+
+# ===============================
+# 공정 큐잉
+# ===============================
+def test_fair_queuing_interleaves_users():
+    s = AdmissionScheduler(rpm=0, max_inflight=1, clock=FakeClock())
+    with s._cond:
+        for _ in range(6): s._enqueue("heavy", "cards", INTERACTIVE, 1.0)
+        for _ in range(2): s._enqueue("light", "cards", INTERACTIVE, 1.0)
+    users = [u for u, _ in _drain(s)]
+    # 먼저 6건을 넣은 사용자가 있어도 나중 사용자는 번갈아 수락
+    assert users[:4] == ["heavy", "light", "heavy", "light"]
+    assert users[4:] == ["heavy"] * 4
+
+def test_fair_queuing_weights_cost_and_priority():
+    s = AdmissionScheduler(rpm=0, max_inflight=1, clock=FakeClock())
+    with s._cond:
+        s._enqueue("a", "year", BULK, 4.0)
+        for _ in range(3): s._enqueue("a", "cards", INTERACTIVE, 1.0)
+        for _ in range(3): s._enqueue("b", "cards", INTERACTIVE, 1.0)
+        s._enqueue("b", "year", BULK, 4.0); s._enqueue("b", "year", BULK, 4.0)
+    order = _drain(s)
+    assert [st for _, st in order[:6]] == ["cards"] * 6   # 대화형 등급 먼저
+    assert [u for u, _ in order[:6]] == ["a", "b"] * 3
+    assert [u for u, _ in order[6:]] == ["a", "b", "b"]
+
+def test_slot_threads_share_between_users():
+    s = AdmissionScheduler(rpm=0, max_inflight=1)
+    order, gate = [], threading.Event()
+    def call(user):
+        with s.slot("cards", user=user):
+            order.append(user)
+            gate.wait(1.0)
+    first = threading.Thread(target=call, args=("heavy",)); first.start()
+    while not order: time.sleep(0.001)
+    threads = [threading.Thread(target=call, args=(u,)) for u in ["heavy"] * 3 + ["light"]]
+    for th in threads: th.start()
+    while len(s._queue) < 4: time.sleep(0.001)
+    gate.set()
+    for th in [first] + threads: th.join(5)
+    assert order.index("light") <= 2
+    assert s.snapshot()["wait_by_stage"]["cards"]["admitted"] == 5
+
+def test_slot_times_out_when_saturated():
+    s = AdmissionScheduler(rpm=0, max_inflight=1)
+    with s.slot("cards", user="a"):
+        with pytest.raises(AdmissionTimeout):
+            with s.slot("cards", user="b", timeout_s=0.05):
+                pass
+    assert s.snapshot()["queued"] == 0 and s.snapshot()["wait_by_stage"]["cards"]["timeouts"] == 1
+
+def test_finish_tags_are_pruned_under_continuous_load():
+    s = AdmissionScheduler(rpm=0, max_inflight=1, clock=FakeClock())
+    with s._cond:
+        for _ in range(3): s._enqueue("steady", "cards", INTERACTIVE, 1.0)
+        for i in range(50): s._enqueue(f"once-{i}", "cards", INTERACTIVE, 1.0)
+        while len(s._queue) > 1:   # 한 건은 대기 중으로 남겨 유휴가 되지 않게
+            head = min(s._queue, key=lambda t: t.order)
+            s._try_admit(head); s._release(head)
+    assert len(s._finish) <= 2
+
+def test_finish_tags_of_idle_users_are_pruned():
+    s = AdmissionScheduler(rpm=0, max_inflight=1, clock=FakeClock())
+    for i in range(200):
+        with s._cond: s._enqueue(f"user-{i}", "cards", INTERACTIVE, 1.0)
+        _drain(s)
+    assert len(s._finish) == 0
+    # 가지치기 후에도 새 요청은 가상 시각부터 시작(공정성 유지)
+    with s._cond:
+        t = s._enqueue("user-0", "cards", INTERACTIVE, 1.0)
+    assert t.tag == s._vtime
@@ -0,0 +1,106 @@
+import pytest
+
+from llm_schemas import (
+    EVENT_LIST_SCHEMA, IDEA_CARD_FIELDS, IDEA_CARD_OBJECT_SCHEMA, caption_len, validate_caption_sets, validate_card, validate_cards, validate_events,
+)
+
+# ===============================
+# 이벤트
+# ===============================
+def test_events_coerce_loose_model_output():
+    ok, rejected = validate_events([{
+        "category": "publicholiday", "name": " 설날 ", "date": "2026/02/17",
+        "confidence": "85%", "specific_confidence": 70, "sources": "news, wiki", "note": None,
+    }])
+    assert rejected == 0
+    e = ok[0]
+    assert (e["category"], e["name"], e["date"]) == ("PublicHoliday", "설날", "2026-02-17")
+    assert e["confidence"] == pytest.approx(0.85) and e["specific_confidence"] == pytest.approx(0.7)
+    assert e["sources"] == ["news", "wiki"] and e["note"] == ""
+
+@pytest.mark.parametrize("bad", [
+    {"category": "Astrology", "name": "x"},                      # 목록 밖 카테고리
+    {"category": "Sports", "name": ""},                          # 빈 이름
+    {"category": "Sports", "name": "x", "date": "next friday"},  # 해석 불가 날짜
+    {"category": "Sports", "name": "x", "confidence": "high"},   # 숫자 아님
+    "not an event",
+])
+def test_events_drop_bad_items_individually(bad):
+    good = {"category": "Sports", "name": "K리그 개막", "date": "2026-03-01"}
+    ok, rejected = validate_events([good, bad, good])
+    assert rejected == 1
+    assert [e["name"] for e in ok] == ["K리그 개막", "K리그 개막"]
+
+def test_events_accept_legacy_shapes():
+    by_cat = {"Sports": [{"name": "A"}], "WorldDays": [{"name": "B", "date": "TBD"}]}
+    ok, _ = validate_events(by_cat)
+    assert [(e["category"], e["name"], e["date"]) for e in ok] == [("Sports", "A", None), ("WorldDays", "B", None)]
+    ok, _ = validate_events({"events": [{"category": "Gimmick", "name": "C"}]})
+    assert ok[0]["name"] == "C"
+    assert validate_events("garbage") == ([], 0)
+
+def test_event_schema_is_gemini_subset():
+    item = EVENT_LIST_SCHEMA["items"]
+    assert EVENT_LIST_SCHEMA["type"] == "ARRAY" and item["type"] == "OBJECT"
+    assert "PublicHoliday" in item["properties"]["category"]["enum"]
+    assert item["properties"]["date"].get("nullable") is True
+    assert "default" not in item["properties"]["note"] and "title" not in item
+
+# ===============================
+# 카드
+# ===============================
+def _card(**kw):
+    return {"title": "설 선물 세트", "image_concept": "한옥 마루 위 선물 상자", **kw}
+
+def test_cards_normalize_channels_and_ids():
+    cards, rejected = validate_cards([
+        _card(id="a", recommended_channels="ig, twitter, tiktok, Instagram"),
+        _card(id="a", copy_draft="구형 캡션"),
+        _card(id=None),
+    ])
+    assert rejected == 0
+    assert cards[0]["recommended_channels"] == ["Instagram", "X(Twitter)"]
+    assert cards[1]["copy_draft_ko"] == "구형 캡션"
+    assert len({c["id"] for c in cards}) == 3
+
+def test_cards_drop_bad_items_and_bad_targeted_events():
+    cards, rejected = validate_cards({"cards": [
+        _card(targeted_events=[{"category": "Sports", "name": "ok"}, {"category": "Nope", "name": "bad"}]),
+        {"title": "", "image_concept": "x"},
+        {"image_concept": "제목 없음"},
+    ]})
+    assert rejected == 2
+    assert [e["name"] for e in cards[0]["targeted_events"]] == ["ok"]
+    assert validate_card([_card()])["title"] == "설 선물 세트"
+    assert validate_card({"title": "x"}) is None
+
+def test_card_fields_are_schema_allow_list():
+    assert list(IDEA_CARD_FIELDS) == list(IDEA_CARD_OBJECT_SCHEMA["properties"])
+    assert not {"visual_assets", "caption_variants"} & set(IDEA_CARD_FIELDS)   # 앱 전용 필드는 프롬프트 제외
+
+# ===============================
+# 플랫폼별 캡션
+# ===============================
+def test_caption_sets_keep_only_allowed_cards_and_channels():
+    raw = {"cards": [
+        {"card_id": "c1", "variants": [
+            {"channel": "ig", "caption_ko": "본문", "hashtags": "#설날 #선물 #설날"},
+            {"channel": "Facebook", "caption_ko": "페북"},      # 허용 채널 아님
+            {"channel": "X", "caption_ko": ""},                # 빈 본문 → 제외(개별)
+        ]},
+        {"card_id": "zz", "variants": [{"channel": "X", "caption_ko": "x"}]},   # 목록 밖 카드
+    ]}
+    out, rejected = validate_caption_sets(raw, {"c1": ["Instagram", "X(Twitter)"]})
+    assert set(out) == {"c1"} and set(out["c1"]) == {"Instagram"}
+    assert out["c1"]["Instagram"]["ko"] == "본문\n\n#설날 #선물"
+    assert rejected == 2
+
+def test_caption_sets_fit_x_weighted_length():
+    raw = [{"card_id": "c1", "variants": [
+        {"channel": "X(Twitter)", "caption_ko": "가" * 300 + " https://example.com/" + "p" * 80, "hashtags": ["설날"]},
+    ]}]
+    out, _ = validate_caption_sets(raw, {"c1": ["X(Twitter)"]})
+    ko = out["c1"]["X(Twitter)"]["ko"]
+    assert len(ko) < 280 and caption_len(ko, "X(Twitter)") <= 280   # 한글 2, URL 23 가중
+    assert ko.endswith("… #설날") and "https://" not in ko
+    assert caption_len("a https://example.com/" + "p" * 80, "X(Twitter)") == 2 + 23
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from google.genai import types
+
+import llm_transport
+from fake_gemini import FakeClient
+from llm_transport import CassetteMiss, RecordingClient, ReplayClient, load_cassette, prompt_key
+
+SYSTEM = "당신은 입력 국가 시장의 소셜마케팅 리서처다.\n반환: 이벤트 JSON 배열."
+SUFFIX = "[입력]\n- 국가: 대한민국\n- 기간: 2026-02-10~2026-02-24"
+
+def _cfg(system: str = SYSTEM, **kw) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(system_instruction=system, temperature=0.3, **kw)
+
+@pytest.fixture
+def cassette(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    rec = RecordingClient(FakeClient(latency_scale=0, seed=1), path)
+    resp = rec.models.generate_content(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg())
+    chunks = list(rec.models.generate_content_stream(model="gemini-2.5-flash", contents=SUFFIX + " (stream)", config=_cfg()))
+    assert rec.recorded == 2
+    return path, resp, chunks
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(llm_transport.time, "sleep", out.append)
+    return out
+
+# ===============================
+# 기록 → 재생
+# ===============================
+def test_round_trip_returns_recorded_text_and_usage(cassette):
+    path, resp, _ = cassette
+    replay = ReplayClient(path, latency_scale=0)
+    got = replay.models.generate_content(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg())
+    assert got.text == resp.text and got.model_version == "gemini-2.5-flash"
+    assert got.usage_metadata.prompt_token_count == resp.usage_metadata.prompt_token_count
+    assert got.usage_metadata.candidates_token_count == resp.usage_metadata.candidates_token_count
+    assert replay.stats == {"hits": 1, "misses": 0}
+    rec = load_cassette(path)[0]
+    assert rec["key"] == prompt_key(SYSTEM, SUFFIX) and rec["config"]["temperature"] == 0.3
+
+def test_stream_round_trip_keeps_chunks_and_final_usage(cassette):
+    path, _, chunks = cassette
+    replay = ReplayClient(path, latency_scale=0)
+    got = list(replay.models.generate_content_stream(model="gemini-2.5-flash", contents=SUFFIX + " (stream)", config=_cfg()))
+    assert [c.text for c in got] == [c.text for c in chunks]
+    assert [c.usage_metadata is not None for c in got] == [False] * (len(got) - 1) + [True]
+    # 비스트리밍 기록도 스트림으로 재생(1청크)
+    one = list(replay.models.generate_content_stream(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg()))
+    assert len(one) == 1 and json.loads(one[0].text)
+
+def test_partial_stream_is_not_replayed(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    rec = RecordingClient(FakeClient(latency_scale=0, seed=1), path)
+    stream = rec.models.generate_content_stream(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg())
+    next(stream); stream.close()   # 소비자가 중간에 끊음(마감)
+    assert load_cassette(path)[0]["partial"] is True
+    with pytest.raises(CassetteMiss):
+        ReplayClient(path, latency_scale=0).models.generate_content(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg())
+
+# ===============================
+# 매칭
+# ===============================
+def test_key_is_whitespace_normalized(cassette):
+    path, resp, _ = cassette
+    replay = ReplayClient(path, latency_scale=0)
+    spaced = "  " + SUFFIX.replace("\n", "\n\n  ").replace(" ", "   ") + "\n"
+    got = replay.models.generate_content(model="gemini-2.5-flash", contents=spaced,
+                                         config=_cfg(SYSTEM.replace("\n", " \r\n ")))
+    assert got.text == resp.text
+    assert prompt_key(SYSTEM, SUFFIX) != prompt_key(SYSTEM, SUFFIX.replace("대한민국", "일본"))
+    assert prompt_key(SYSTEM, [{"b": 1, "a": 2}]) == prompt_key(SYSTEM, [{"a": 2, "b": 1}])
+
+def test_miss_without_fallback_raises(cassette):
+    path, _, _ = cassette
+    replay = ReplayClient(path, latency_scale=0)
+    with pytest.raises(CassetteMiss):
+        replay.models.generate_content(model="gemini-2.5-flash", contents=SUFFIX + " 다른 입력", config=_cfg())
+    with pytest.raises(CassetteMiss):
+        list(replay.models.generate_content_stream(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg("다른 지시문")))
+    assert replay.stats == {"hits": 0, "misses": 2}
+
+def test_miss_with_fallback_delegates(cassette):
+    path, _, _ = cassette
+    fallback = FakeClient(latency_scale=0, seed=2)
+    replay = ReplayClient(path, latency_scale=0, fallback=fallback)
+    got = replay.models.generate_content(model="gemini-2.5-flash", contents=SUFFIX + " 다른 입력", config=_cfg())
+    assert got.text and fallback.calls == 1
+    streamed = list(replay.models.generate_content_stream(model="gemini-2.5-flash", contents="x", config=_cfg()))
+    assert streamed and fallback.calls == 2
+    replay.models.generate_content(model="gemini-2.5-flash", contents=SUFFIX, config=_cfg())
+    assert fallback.calls == 2 and replay.stats == {"hits": 1, "misses": 2}
+
+# ===============================
+# 지연 배율
+# ===============================
+def _write(path, *recs):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in recs: f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 0.0])
+def test_latency_is_scaled(tmp_path, sleeps, scale):
+    path = str(tmp_path / "llm.jsonl")
+    _write(path,
+           {"key": prompt_key(SYSTEM, "a"), "model": "m", "text": "[1]", "latency_s": 2.0, "usage": {}},
+           {"key": prompt_key(SYSTEM, "b"), "model": "m", "text": "[1,2]", "latency_s": 3.0, "usage": {},
+            "chunks": [{"t": 1.0, "text": "[1,"}, {"t": 3.0, "text": "2]"}]})
+    replay = ReplayClient(path, latency_scale=scale)
+    replay.models.generate_content(model="m", contents="a", config=_cfg())
+    list(replay.models.generate_content_stream(model="m", contents="b", config=_cfg()))
+    want = [2.0 * scale, 1.0 * scale, 2.0 * scale]   # 청크 간격 유지
+    assert sleeps == [d for d in want if d > 0]
+
+def test_recorded_error_is_replayed_after_its_latency(tmp_path, sleeps):
+    path = str(tmp_path / "llm.jsonl")
+    _write(path, {"key": prompt_key(SYSTEM, "a"), "model": "m", "latency_s": 1.5, "error": "503 UNAVAILABLE"})
+    replay = ReplayClient(path, latency_scale=1.0)
+    with pytest.raises(RuntimeError, match="503"):
+        replay.models.generate_content(model="m", contents="a", config=_cfg())
+    assert sleeps == [1.5]
+
+def test_repeated_prompt_cycles_records_in_order(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+    _write(path, *({"key": prompt_key(SYSTEM, "a"), "model": "m", "text": t, "latency_s": 0} for t in ("1", "2")))
+    replay = ReplayClient(path, latency_scale=0)
+    assert [replay.models.generate_content(model="m", contents="a", config=_cfg()).text for _ in range(3)] == ["1", "2", "1"]
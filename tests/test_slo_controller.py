@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from slo_controller import RunDeadline, SloController, complete_array_items, run_deadline
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, s: float):
+        self.t += s
+
+# ===============================
+# 끊긴 JSON 배열 복원
+# ===============================
+ITEMS = [{"name": "설날", "date": "2026-02-17"}, {"name": "a, ] {b}", "n": [1, 2]}, 3, "x"]
+
+def test_complete_array_items_full_and_every_prefix():
+    text = json.dumps(ITEMS, ensure_ascii=False, indent=2)
+    assert complete_array_items(text) == ITEMS
+    for i in range(len(text)):
+        got = complete_array_items(text[:i])
+        assert got == ITEMS[:len(got)]   # 항상 앞쪽 완결 원소만(부분 원소는 버림)
+
+@pytest.mark.parametrize("text,want", [
+    ("", []), (None, []), ("no array", []), ("[", []), ("[]", []),
+    ('```json\n[{"a": 1}, {"a": 2}]\n```', [{"a": 1}, {"a": 2}]),   # 코드 펜스
+    ('[{"a": 1},\n  {"a": tru', [{"a": 1}]),
+    ('[{"a": 1}, , {"a": 2}', [{"a": 1}, {"a": 2}]),
+])
+def test_complete_array_items_edge_cases(text, want):
+    assert complete_array_items(text) == want
+
+# ===============================
+# 호출 계획
+# ===============================
+def _ctl(clock, **kw):
+    return SloController(budget_s=20.0, research_share=0.4, clock=clock, **kw)
+
+def test_plan_call_fits_output_to_remaining_time():
+    clock = FakeClock(); ctl = _ctl(clock)
+    dl = RunDeadline("submit", 20.0, 0.4, clock=clock)
+    # 사전값(고정 1초 + 200 토큰/초) · 여유 1.25 · 예비 0.5초
+    plan = ctl.plan_call("cards", dl, None, None)
+    assert plan.max_output_tokens == int((19.5 / 1.25 - 1.0) * 200)
+    assert plan.thinking_budget == 0 and plan.cutoff_at == dl.at("cards")
+    # 리서치는 예산의 40% 몫만 → 약 1000 토큰
+    plan = ctl.plan_call("research", dl, 8192, None)
+    assert plan.max_output_tokens == 1000 and plan.cutoff_at == pytest.approx(1008.0)
+
+def test_plan_call_keeps_route_caps_and_thinking_when_time_allows():
+    clock = FakeClock(); ctl = _ctl(clock)
+    dl = RunDeadline("submit", 20.0, 0.4, clock=clock)
+    plan = ctl.plan_call("cards", dl, 1000, 512)
+    assert (plan.max_output_tokens, plan.thinking_budget) == (1000, 512)
+    plan = ctl.plan_call("cards", dl, 2500, 1024)   # 상한 + thinking 이 남은 시간 초과 → thinking 끔
+    assert (plan.max_output_tokens, plan.thinking_budget) == (2500, 0)
+    assert ctl.plan_call("cards", dl, 1000, 0).thinking_budget == 0
+
+def test_plan_call_floor_near_deadline():
+    clock = FakeClock(); ctl = _ctl(clock, min_output_tokens=256)
+    dl = RunDeadline("submit", 20.0, 0.4, clock=clock)
+    clock.advance(25)   # 이미 마감 지남
+    plan = ctl.plan_call("cards", dl, 4096, None)
+    assert (plan.max_output_tokens, plan.thinking_budget) == (256, 0)
+
+def test_plan_call_uses_observed_latency():
+    clock = FakeClock(); ctl = _ctl(clock)
+    for t in (200, 400, 800, 1600, 3200):   # 고정 0.5초 + 100 토큰/초 (사전값보다 느림)
+        ctl.observe("cards", 0.5 + t / 100, t, n_items=t // 400)
+    dl = RunDeadline("submit", 20.0, 0.4, clock=clock)
+    assert ctl.plan_call("cards", dl, None, 0).max_output_tokens == pytest.approx((19.5 / 1.25 - 0.5) * 100, abs=2)
+    assert ctl.plan_items("cards", dl, wanted=10) == 3    # ≈1510 토큰 / 카드당 400 토큰
+
+def test_plan_items_caps_wanted_and_keeps_minimum():
+    clock = FakeClock(); ctl = _ctl(clock)
+    dl = RunDeadline("submit", 20.0, 0.4, clock=clock)
+    assert ctl.plan_items("cards", dl, wanted=6) == 6       # 2920 토큰 / 380 → 7장까지 가능
+    assert ctl.plan_items("cards", dl, wanted=12) == 7
+    clock.advance(20)
+    assert ctl.plan_items("cards", dl, wanted=6, minimum=2) == 2
+
+# ===============================
+# 실행 단위
+# ===============================
+def test_deadline_off_by_default(monkeypatch):
+    monkeypatch.delenv("IDEAMAKER_DEADLINE_S", raising=False)
+    ctl = SloController.from_env()
+    assert ctl.budget_s == 0
+    with ctl.run("submit") as dl:
+        assert dl is None and run_deadline.get() is None
+    assert ctl.snapshot()["runs"] == 0
+
+def test_run_records_attainment():
+    clock = FakeClock(); ctl = _ctl(clock)
+    with ctl.run("submit") as dl:
+        assert run_deadline.get() is dl
+        dl.note("cutoff"); clock.advance(5)
+    with pytest.raises(RuntimeError):
+        with ctl.run("submit"):
+            raise RuntimeError("boom")
+    with ctl.run("submit"):
+        clock.advance(30)
+    snap = ctl.snapshot()
+    assert (snap["runs"], snap["met"], snap["runs_with_cutoff"]) == (3, 1, 1)
+    assert run_deadline.get() is None
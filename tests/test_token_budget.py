@@ -0,0 +1,78 @@
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from token_budget import SHARED_USER, TokenLedger, load_user_budgets, usage_tokens
+
+def _usage(tin, tout, thoughts=0, cached=0):
+    return SimpleNamespace(prompt_token_count=tin, candidates_token_count=tout,
+                           thoughts_token_count=thoughts, cached_content_token_count=cached)
+
+class Today:
+    def __init__(self, d: date):
+        self.d = d
+
+    def __call__(self):
+        return self.d
+
+def _ledger(tmp_path, budget=1000, today=None, **kw):
+    return TokenLedger(str(tmp_path / "usage.json"), daily_budget=budget, today_fn=today or Today(date(2026, 3, 2)), **kw)
+
+def test_usage_tokens_counts_thinking_as_output():
+    assert usage_tokens(_usage(100, 50, thoughts=30, cached=200)) == {
+        "calls": 1, "input_tokens": 100, "output_tokens": 80, "cached_tokens": 100, "total_tokens": 180}
+
+def test_lean_then_minimal_then_hard_stop(tmp_path):
+    led = _ledger(tmp_path)
+    assert led.mode("u").name == "normal"
+    led.record("u", "cards", _usage(590, 0))
+    assert led.mode("u").name == "normal"
+    led.record("u", "cards", _usage(10, 0))       # 60%
+    assert led.mode("u").name == "lean"
+    led.record("u", "cards", _usage(250, 0))      # 85%
+    assert led.mode("u").name == "minimal" and led.mode("u").research_cache_only
+    led.record("u", "cards", _usage(150, 0))      # 100%
+    m = led.mode("u")
+    assert m.name == "exhausted" and not m.allow_llm
+    assert led.status("u")["remaining"] == 0
+    assert led.mode("other").name == "normal"     # 사용자별 독립
+
+def test_daily_rollover(tmp_path):
+    today = Today(date(2026, 3, 2))
+    led = _ledger(tmp_path, today=today)
+    led.record("u", "cards", _usage(1000, 0))
+    assert led.mode("u").name == "exhausted"
+    today.d += timedelta(days=1)
+    assert led.mode("u").name == "normal" and led.used("u") == 0
+    assert led.used("u", "2026-03-02") == 1000
+
+def test_default_budget_is_unlimited_and_shared_bucket_exempt(tmp_path, monkeypatch):
+    monkeypatch.delenv("IDEAMAKER_TOKEN_BUDGET", raising=False)
+    monkeypatch.delenv("IDEAMAKER_TOKEN_BUDGETS", raising=False)
+    monkeypatch.setenv("IDEAMAKER_TOKEN_LEDGER", str(tmp_path / "usage.json"))
+    led = TokenLedger.from_env()
+    led.record("alice", "cards", _usage(10**7, 0))
+    assert led.mode("alice").allow_llm and led.status("alice")["remaining"] is None
+
+    led = _ledger(tmp_path, budget=1000, user_budgets=load_user_budgets(None))
+    for sid in ("a1", "b2"):   # 세션별 큐 키 → 집계는 공용 버킷 하나
+        led.record(f"{SHARED_USER}:{sid}", "cards", _usage(5000, 0))
+    assert led.used(SHARED_USER) == 10000 and led.used(f"{SHARED_USER}:zz") == 10000
+    assert led.mode(f"{SHARED_USER}:zz").name == "normal"
+    assert [r["user"] for r in led.report()] == [SHARED_USER]
+
+def test_shared_bucket_can_be_capped_explicitly(tmp_path):
+    p = tmp_path / "budgets.json"
+    p.write_text(json.dumps({SHARED_USER: 100, "vip": 5000}))
+    led = _ledger(tmp_path, budget=1000, user_budgets=load_user_budgets(str(p)))
+    led.record(f"{SHARED_USER}:s1", "cards", _usage(100, 0))
+    assert led.mode(f"{SHARED_USER}:s2").name == "exhausted"
+    assert led.budget_for("vip") == 5000 and led.budget_for("__warmer__") == 0
+
+def test_ledger_persists_atomically(tmp_path):
+    led = _ledger(tmp_path)
+    led.record("u", "research", _usage(30, 20))
+    led.flush(force=True)
+    again = _ledger(tmp_path)
+    assert again.used("u") == 50
+    assert again.report()[0]["by_stage"] == {"research": 50}
@@ -0,0 +1,235 @@
+# token_budget.py
+# -----------------------------------------------------------------------------
+# 사용자 × 일자별 토큰 사용량 집계(응답 usage_metadata 기준) + 예산 기반 단계적 절약 모드
+#   - TokenLedger: 프로세스 공유 집계, 로컬 JSON 파일에 원자적 저장(재시작 후에도 유지)
+#   - 예산 대비 사용률에 따라 DegradeMode 선택:
+#       normal → lean(후보 여유분 없음·컨텍스트 축약·출력 상한 축소)
+#              → minimal(카드 수 제한·리서치는 캐시/로컬 인덱스만)
+#              → exhausted(LLM 호출 차단, 규칙 기반 폴백만)
+#   - 한도는 기본 무제한(IDEAMAKER_TOKEN_BUDGET=0). 사용자별 한도는 사용자 식별(Streamlit 인증 또는
+#     IDEAMAKER_USER_HEADER 신뢰 헤더)이 있을 때만 설정할 것 — 없으면 모두 공용 버킷(면제)으로 집계됨
+#   python token_budget.py [--day YYYY-MM-DD] [--file PATH] [--budgets PATH]  → 관리자 리포트 출력
+# -----------------------------------------------------------------------------
+
+import argparse
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ideamaker_usage.json")
+
+# ===============================
+# 절약 모드
+# ===============================
+@dataclass(frozen=True)
+class DegradeMode:
+    name: str
+    min_used_ratio: float              # 이 사용률 이상이면 적용
+    oversample: int                    # 카드 후보 여유분 상한
+    max_cards: int                     # 생성 카드 수 상한
+    context_per_category: int          # 카드 프롬프트에 넣을 카테고리별 이벤트 수
+    note_chars: int                    # 이벤트 메모 최대 길이(0=제한 없음)
+    output_scale: float                # 라우트 최대 출력 토큰 배율
+    research_cache_only: bool          # 리서치는 캐시/로컬 인덱스만
+    allow_llm: bool = True
+
+DEGRADE_MODES: List[DegradeMode] = [
+    DegradeMode("normal",    0.00, oversample=3, max_cards=12, context_per_category=3, note_chars=0,
+                output_scale=1.0, research_cache_only=False),
+    DegradeMode("lean",      0.60, oversample=0, max_cards=12, context_per_category=2, note_chars=80,
+                output_scale=0.6, research_cache_only=False),
+    DegradeMode("minimal",   0.85, oversample=0, max_cards=3,  context_per_category=1, note_chars=40,
+                output_scale=0.4, research_cache_only=True),
+    DegradeMode("exhausted", 1.00, oversample=0, max_cards=3,  context_per_category=1, note_chars=40,
+                output_scale=0.4, research_cache_only=True, allow_llm=False),
+]
+NORMAL = DEGRADE_MODES[0]
+
+def mode_for_ratio(used_ratio: float) -> DegradeMode:
+    mode = NORMAL
+    for m in DEGRADE_MODES:
+        if used_ratio >= m.min_used_ratio: mode = m
+    return mode
+
+# ===============================
+# 집계
+# ===============================
+_FIELDS = ("calls", "input_tokens", "output_tokens", "cached_tokens", "total_tokens")
+
+def usage_tokens(usage: Any) -> Dict[str, int]:
+    """usage_metadata → 집계 필드. 출력 토큰은 thinking 토큰 포함."""
+    tin = int(getattr(usage, "prompt_token_count", 0) or 0)
+    tout = int(getattr(usage, "candidates_token_count", 0) or 0) + int(getattr(usage, "thoughts_token_count", 0) or 0)
+    cached = min(tin, int(getattr(usage, "cached_content_token_count", 0) or 0))
+    return {"calls": 1, "input_tokens": tin, "output_tokens": tout, "cached_tokens": cached, "total_tokens": tin + tout}
+
+def approx_tokens(text: str) -> int:
+    """토큰 수 상한 근사: ASCII 4자당 1, 그 외(한글 등) 1자당 1."""
+    ascii_n = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_n // 4 + (len(text) - ascii_n)
+
+def estimate_usage(prompt_text: str, output_text: str) -> Any:
+    """usage_metadata 를 받지 못한 호출(마감으로 끊은 스트림 등) → 받은 글자 수 기준 추정 사용량.
+    thinking 토큰은 알 수 없어 제외(과소 추정)."""
+    tin, tout = approx_tokens(prompt_text or ""), approx_tokens(output_text or "")
+    return SimpleNamespace(prompt_token_count=tin, candidates_token_count=tout, total_token_count=tin + tout,
+                           cached_content_token_count=0, thoughts_token_count=0, estimated=True)
+
+# 공용 버킷: 인증/신뢰 헤더로 식별되지 않은 방문자 전체. 사용자별 한도는 식별이 있어야 의미가 있으므로
+# 공용 버킷은 기본 면제(집계만) — 한도를 걸면 한 명이 모두의 LLM 호출을 막게 됨.
+# 세션별 공정 큐잉용 "__shared__:<세션>" 도 집계/한도는 공용 버킷 하나로 합침.
+SHARED_USER = "__shared__"
+EXEMPT_BUDGETS = {"__warmer__": 0, SHARED_USER: 0}   # 캐시 워머·공용 버킷은 집계만, 한도 없음
+
+def ledger_user(user: str) -> str:
+    return SHARED_USER if user.startswith(SHARED_USER + ":") else user
+
+def load_user_budgets(path: Optional[str]) -> Dict[str, int]:
+    """{"user_id": 일일 토큰} JSON 파일 + 기본 면제 사용자. 파일이 없거나 형식 오류면 면제만."""
+    budgets: Dict[str, int] = dict(EXEMPT_BUDGETS)
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                budgets.update({str(k): int(v) for k, v in json.load(f).items()})
+        except Exception:
+            pass
+    return budgets
+
+def _empty() -> Dict[str, Any]:
+    return {**{f: 0 for f in _FIELDS}, "by_stage": {}}
+
+class TokenLedger:
+    """{day: {user: {calls, input_tokens, ..., by_stage: {stage: total_tokens}}}} 를 파일에 유지."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_LEDGER_PATH, daily_budget: int = 0,
+                 user_budgets: Optional[Dict[str, int]] = None, retention_days: int = 35,
+                 flush_interval_s: float = 2.0, today_fn=date.today):
+        self.path = path
+        self.daily_budget = daily_budget          # 0 = 무제한(기본) — 사용자 식별(인증/신뢰 헤더)과 함께 설정
+        self.user_budgets = dict(user_budgets or {})
+        self.retention_days = retention_days
+        self.flush_interval_s = flush_interval_s
+        self._today = today_fn
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+        self._dirty = False
+        self._last_flush = 0.0
+
+    @classmethod
+    def from_env(cls) -> "TokenLedger":
+        return cls(
+            path=os.environ.get("IDEAMAKER_TOKEN_LEDGER", DEFAULT_LEDGER_PATH) or None,
+            daily_budget=int(os.environ.get("IDEAMAKER_TOKEN_BUDGET", "0") or 0),
+            user_budgets=load_user_budgets(os.environ.get("IDEAMAKER_TOKEN_BUDGETS", "").strip()),
+        )
+
+    # ---- 저장 ----
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+            return raw if isinstance(raw, dict) else {}
+        except Exception:
+            return {}
+
+    def flush(self, force: bool = False) -> None:
+        with self._lock:
+            if not self.path or not self._dirty: return
+            if not force and time.monotonic() - self._last_flush < self.flush_interval_s: return
+            cutoff = (self._today() - timedelta(days=self.retention_days)).isoformat()
+            for d in [d for d in self._data if d < cutoff]:
+                del self._data[d]
+            blob = json.dumps(self._data, ensure_ascii=False)
+            self._dirty = False; self._last_flush = time.monotonic()
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp, self.path)   # 원자적 교체
+        except Exception:
+            with self._lock: self._dirty = True
+
+    # ---- 기록/조회 ----
+    def record(self, user: str, stage: Optional[str], usage: Any) -> Dict[str, int]:
+        add = usage_tokens(usage)
+        day = self._today().isoformat()
+        user = ledger_user(user)
+        with self._lock:
+            row = self._data.setdefault(day, {}).setdefault(user, _empty())
+            for f in _FIELDS: row[f] = row.get(f, 0) + add[f]
+            st_ = stage or "-"
+            row["by_stage"][st_] = row["by_stage"].get(st_, 0) + add["total_tokens"]
+            self._dirty = True
+        self.flush()
+        return add
+
+    def budget_for(self, user: str) -> int:
+        return self.user_budgets.get(ledger_user(user), self.daily_budget)
+
+    def used(self, user: str, day: Optional[str] = None) -> int:
+        user = ledger_user(user)
+        with self._lock:
+            return int(self._data.get(day or self._today().isoformat(), {}).get(user, {}).get("total_tokens", 0))
+
+    def status(self, user: str) -> Dict[str, Any]:
+        user = ledger_user(user)
+        budget = self.budget_for(user)
+        used = self.used(user)
+        ratio = used / budget if budget > 0 else 0.0
+        return {"user": user, "used": used, "budget": budget,
+                "remaining": max(0, budget - used) if budget > 0 else None,
+                "used_ratio": round(ratio, 4), "mode": mode_for_ratio(ratio).name}
+
+    def mode(self, user: str) -> DegradeMode:
+        budget = self.budget_for(user)
+        return mode_for_ratio(self.used(user) / budget) if budget > 0 else NORMAL
+
+    def report(self, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """관리자용: 해당 일자 사용자별 사용량(많은 순)."""
+        day = day or self._today().isoformat()
+        with self._lock:
+            rows = json.loads(json.dumps(self._data.get(day, {})))
+        out = []
+        for user, r in rows.items():
+            budget = self.budget_for(user)
+            ratio = r.get("total_tokens", 0) / budget if budget > 0 else 0.0
+            out.append({"user": user, **{f: r.get(f, 0) for f in _FIELDS}, "budget": budget,
+                        "used_ratio": round(ratio, 4), "mode": mode_for_ratio(ratio).name if budget > 0 else NORMAL.name,
+                        "by_stage": r.get("by_stage", {})})
+        return sorted(out, key=lambda r: r["total_tokens"], reverse=True)
+
+# ===============================
+# 관리자 리포트 CLI
+# ===============================
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="사용자별 일일 토큰 사용량 리포트")
+    ap.add_argument("--day", default=None, help="YYYY-MM-DD (기본: 오늘)")
+    ap.add_argument("--file", default=os.environ.get("IDEAMAKER_TOKEN_LEDGER", DEFAULT_LEDGER_PATH))
+    ap.add_argument("--budgets", default=os.environ.get("IDEAMAKER_TOKEN_BUDGETS", ""),
+                    help="사용자별 한도 JSON (기본: IDEAMAKER_TOKEN_BUDGETS)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    # 앱과 같은 한도(사용자별 덮어쓰기 + 면제)로 모드를 계산해야 리포트가 실제와 일치
+    ledger = TokenLedger(args.file, daily_budget=int(os.environ.get("IDEAMAKER_TOKEN_BUDGET", "0") or 0),
+                         user_budgets=load_user_budgets(args.budgets.strip()))
+    rows = ledger.report(args.day)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2)); return 0
+    print(f"{'user':<16} {'calls':>6} {'input':>10} {'output':>10} {'cached':>10} {'total':>10} {'budget':>10} {'used%':>7}  mode")
+    for r in rows:
+        print(f"{r['user'][:16]:<16} {r['calls']:>6} {r['input_tokens']:>10} {r['output_tokens']:>10} "
+              f"{r['cached_tokens']:>10} {r['total_tokens']:>10} {r['budget']:>10} {r['used_ratio']*100:>6.1f}%  {r['mode']}")
+    if not rows:
+        print("(기록 없음)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+# visual_sourcing.py
+# -----------------------------------------------------------------------------
+# 카드 image_concept → 비주얼 소싱 백엔드 비동기 전달 (세션 유지, 페이지 리로드 없음)
+#   - VisualSourcingQueue: 프로세스 공유 작업 큐(워커 스레드), 작업 상태/결과 보관
+#   - 백엔드는 교체 가능:
+#       LocalStandInBackend — 오프라인 대체(컨셉 키워드로 무드 타일 SVG 생성; 테스트/데모용)
+#       HttpBackend         — 외부 Visual Sourcing Agent 에 JSON POST
+#   IDEAMAKER_VISUAL_BACKEND=local(기본) | http(s)://엔드포인트
+# -----------------------------------------------------------------------------
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+@dataclass(frozen=True)
+class VisualRequest:
+    job_id: str
+    card_id: str
+    user: str
+    concept: str
+    brand: str = ""
+    country: str = ""
+
+@dataclass
+class VisualJob:
+    request: VisualRequest
+    status: str = "queued"                 # queued | running | done | error
+    assets: List[Dict[str, Any]] = field(default_factory=list)   # {title, kind, url, source}
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.status in {"queued", "running"}
+
+# ===============================
+# 백엔드
+# ===============================
+_STOP = {"및", "의", "를", "을", "이", "가", "에", "와", "과", "the", "and", "with", "of", "a", "an"}
+_PALETTES = [("#FDE68A", "#F59E0B"), ("#BFDBFE", "#2563EB"), ("#FBCFE8", "#DB2777"),
+             ("#A7F3D0", "#059669"), ("#DDD6FE", "#7C3AED"), ("#FED7AA", "#EA580C")]
+
+def _keywords(text: str, k: int = 3) -> List[str]:
+    words = [w for w in re.split(r"[\s,./()\[\]·:;'\"!?]+", text or "") if len(w) > 1 and w.lower() not in _STOP]
+    out: List[str] = []
+    for w in words:
+        if w not in out: out.append(w)
+        if len(out) >= k: break
+    return out or ["concept"]
+
+def _tile_svg(label: str, bg: str, fg: str) -> str:
+    label = label[:18].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    svg = (f"<svg xmlns='http://www.w3.org/2000/svg' width='240' height='240'>"
+           f"<rect width='240' height='240' rx='16' fill='{bg}'/>"
+           f"<circle cx='180' cy='60' r='36' fill='{fg}' opacity='.35'/>"
+           f"<text x='20' y='210' font-size='22' font-family='sans-serif' fill='{fg}'>{label}</text></svg>")
+    return "data:image/svg+xml;utf8," + quote(svg)
+
+class LocalStandInBackend:
+    """외부 연계 없이 결정적 결과 반환(같은 컨셉 → 같은 타일). latency_s 로 응답 지연 흉내."""
+    name = "local"
+
+    def __init__(self, latency_s: float = 1.5):
+        self.latency_s = latency_s
+
+    def source(self, req: VisualRequest) -> List[Dict[str, Any]]:
+        if self.latency_s > 0: time.sleep(self.latency_s)
+        seed = int(hashlib.sha1(req.concept.encode("utf-8")).hexdigest()[:8], 16)
+        out = []
+        for i, kw in enumerate(_keywords(req.concept)):
+            bg, fg = _PALETTES[(seed + i) % len(_PALETTES)]
+            out.append({"title": f"무드 타일 · {kw}", "kind": "moodboard", "url": _tile_svg(kw, bg, fg), "source": self.name})
+        return out
+
+class HttpBackend:
+    """POST {card_id, concept, brand, country} → {"assets": [{title, kind, url, source}]}"""
+    name = "http"
+
+    def __init__(self, endpoint: str, timeout_s: float = 60.0):
+        self.endpoint = endpoint
+        self.timeout_s = timeout_s
+
+    def source(self, req: VisualRequest) -> List[Dict[str, Any]]:
+        body = json.dumps({"card_id": req.card_id, "concept": req.concept, "brand": req.brand,
+                           "country": req.country}, ensure_ascii=False).encode("utf-8")
+        r = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(r, timeout=self.timeout_s) as resp:
+            data = json.loads(resp.read().decode("utf-8") or "{}")
+        assets = data.get("assets", []) if isinstance(data, dict) else []
+        return [a for a in assets if isinstance(a, dict) and a.get("url")]
+
+def backend_from_env() -> Any:
+    spec = os.environ.get("IDEAMAKER_VISUAL_BACKEND", "local").strip()
+    if spec.startswith(("http://", "https://")):
+        return HttpBackend(spec)
+    return LocalStandInBackend(latency_s=float(os.environ.get("IDEAMAKER_VISUAL_LATENCY", "1.5")))
+
+# ===============================
+# 큐
+# ===============================
+class VisualSourcingQueue:
+    def __init__(self, backend: Any, workers: int = 2, max_jobs: int = 500):
+        self.backend = backend
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ideamaker-visual")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, VisualJob]" = OrderedDict()
+        self._seq = itertools.count(1)
+        self.stats = {"submitted": 0, "deduped": 0, "done": 0, "error": 0}
+
+    def submit(self, card_id: str, concept: str, user: str, brand: str = "", country: str = "") -> str:
+        """작업 id 반환. 같은 사용자·카드·컨셉의 진행 중 작업이 있으면 그 id 재사용."""
+        with self._lock:
+            for job in self._jobs.values():
+                r = job.request
+                if job.pending and r.user == user and r.card_id == card_id and r.concept == concept:
+                    self.stats["deduped"] += 1
+                    return r.job_id
+            req = VisualRequest(f"vis-{next(self._seq)}", card_id, user, concept, brand, country)
+            self._jobs[req.job_id] = VisualJob(req)
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest].pending: break
+                self._jobs.popitem(last=False)
+            self.stats["submitted"] += 1
+        self._pool.submit(self._run, req.job_id)
+        return req.job_id
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None: return
+            job.status = "running"
+        try:
+            assets = self.backend.source(job.request)
+            status, err = "done", None
+        except Exception as e:
+            assets, status, err = [], "error", str(e)
+        with self._lock:
+            job.assets, job.status, job.error, job.finished_at = assets, status, err, time.time()
+            self.stats[status] += 1
+
+    def get(self, job_id: str) -> Optional[VisualJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return VisualJob(job.request, job.status, list(job.assets), job.error, job.submitted_at, job.finished_at) if job else None
+
+    def position(self, job_id: str) -> int:
+        """대기 중이면 앞선 대기 작업 수 + 1, 아니면 0."""
+        with self._lock:
+            ids = [j for j, job in self._jobs.items() if job.status == "queued"]
+        return ids.index(job_id) + 1 if job_id in ids else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            recent = [{**{k: v for k, v in asdict(j.request).items() if k != "concept"},
+                       "status": j.status, "n_assets": len(j.assets), "error": j.error}
+                      for j in list(self._jobs.values())[-5:]]
+        return {"backend": getattr(self.backend, "name", type(self.backend).__name__), **self.stats,
+                "by_status": by_status, "recent": recent}